@@ -0,0 +1,68 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import worker  # noqa: E402
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append((" ".join(sql.split()), params))
+        result = self.conn.results.pop(0) if self.conn.results else []
+        self._rows = list(result)
+        self.rowcount = len(self._rows)
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+class FakeConn:
+    """Records every statement; `results` holds the rows for successive executes."""
+
+    def __init__(self, results=None):
+        self.executed = []
+        self.results = list(results or [])
+        self.commits = 0
+        self.autocommit = False
+        self.closed = False
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def statements(self):
+        return [sql for sql, _ in self.executed]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Route db_connection() to one FakeConn and return it."""
+    conn = FakeConn()
+
+    @contextmanager
+    def db_connection(timeout=None):
+        yield conn
+
+    monkeypatch.setattr(worker, "db_connection", db_connection)
+    monkeypatch.setattr(worker, "PSYCOPG2_AVAILABLE", True)
+    return conn
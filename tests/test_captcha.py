@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+import worker
+
+
+def test_only_recaptcha_with_a_sitekey_goes_to_the_solver():
+    assert worker.captcha_solvable({"provider": "recaptcha", "sitekey": "6Lc"})
+    assert not worker.captcha_solvable({"provider": "recaptcha", "sitekey": None})
+    assert not worker.captcha_solvable({"provider": "hcaptcha", "sitekey": "10000000-ffff"})
+    assert not worker.captcha_solvable({"provider": "turnstile", "sitekey": "0x4AAA"})
+    assert not worker.captcha_solvable(None)
+
+
+def test_detection_recognises_other_providers_before_recaptcha():
+    js = worker.CAPTCHA_DETECT_JS
+    assert js.index("hcaptcha") < js.index("google.com/recaptcha")
+    assert js.index("cf-turnstile") < js.index("google.com/recaptcha")
+    assert "'.g-recaptcha[data-sitekey]'" in js
+    assert ", [data-sitekey]" not in js
+
+
+def test_lane_refuses_jobs_once_drained():
+    lane = worker.CaptchaLane(concurrency=1, buffer=1)
+    assert lane.submit("m1", {"id": 1}) is None
+    assert lane.drain() == [("m1", {"id": 1})]
+    with pytest.raises(RuntimeError):
+        lane.submit("m2", {"id": 2}, handed_off=True)
+    assert lane.drain() == []
+
+
+def test_lane_counters_are_exact_under_concurrent_submits(monkeypatch):
+    monkeypatch.setattr(worker, "defer_job", lambda msg, job, delay: None)
+    lane = worker.CaptchaLane(concurrency=1, buffer=1)
+    threads = [threading.Thread(target=lambda n=n: [lane.submit(f"m{n}", {"id": n}) for _ in range(200)])
+               for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert lane.metrics["routed"] == 1600
+    assert lane.metrics["lane_full"] == 1598
+    assert len(lane.drain()) == 2
@@ -0,0 +1,101 @@
+import sys
+import types
+
+import pytest
+
+import worker
+
+IDLE, IN_TRANSACTION = 0, 2
+
+
+class FakePgConn:
+    def __init__(self, n):
+        self.n, self.closed, self.rollbacks, self.status, self.broken = n, 0, 0, IDLE, False
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def execute(self, sql, params=None):
+                if conn.broken:
+                    raise RuntimeError("server closed the connection unexpectedly")
+
+            def fetchone(self):
+                return (1,)
+        return Cursor()
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    psycopg2 = types.ModuleType("psycopg2")
+    psycopg2.OperationalError = type("OperationalError", (Exception,), {})
+    psycopg2.InterfaceError = type("InterfaceError", (Exception,), {})
+    extensions = types.ModuleType("psycopg2.extensions")
+    extensions.TRANSACTION_STATUS_IDLE = IDLE
+    psycopg2.extensions = extensions
+    monkeypatch.setitem(sys.modules, "psycopg2", psycopg2)
+    monkeypatch.setitem(sys.modules, "psycopg2.extensions", extensions)
+    opened = []
+    monkeypatch.setattr(worker, "_get_db_conn", lambda: opened.append(FakePgConn(len(opened))) or opened[-1])
+    p = worker.DbPool(minconn=1, maxconn=2)
+    p.opened = opened
+    return p
+
+
+def test_connections_are_reused(pool):
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert len(pool.opened) == 1
+
+
+def test_checkout_waits_at_maxconn_and_times_out(pool):
+    a, b = pool.getconn(), pool.getconn()
+    with pytest.raises(TimeoutError):
+        pool.getconn(timeout=0.05)
+    pool.putconn(a)
+    assert pool.getconn(timeout=0.05) is a
+    pool.putconn(b)
+
+
+def test_an_open_transaction_is_rolled_back_on_return(pool):
+    conn = pool.getconn()
+    conn.status = IN_TRANSACTION
+    pool.putconn(conn)
+    assert conn.rollbacks == 1
+
+
+def test_a_broken_idle_connection_is_replaced(pool, monkeypatch):
+    monkeypatch.setattr(worker, "DB_POOL_CHECK_AFTER", 0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.broken = True
+    fresh = pool.getconn()
+    assert fresh is not conn and conn.closed
+    assert pool._open == 1
+
+
+def test_a_failed_connect_frees_its_slot(pool, monkeypatch):
+    monkeypatch.setattr(worker, "_get_db_conn", lambda: None)
+    assert pool.getconn() is None
+    assert pool._open == 0
+
+
+def test_connection_errors_drop_the_connection(pool, monkeypatch):
+    monkeypatch.setattr(worker, "get_db_pool", lambda: pool)
+    with pytest.raises(sys.modules["psycopg2"].OperationalError):
+        with worker.db_connection() as conn:
+            raise sys.modules["psycopg2"].OperationalError("terminating connection")
+    assert conn.closed and pool._idle == [] and pool._open == 0
+    with worker.db_connection() as again:
+        assert again is not conn
@@ -0,0 +1,178 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import worker
+
+
+class FakeDriver:
+    def __init__(self, pid=None):
+        self.service = SimpleNamespace(process=SimpleNamespace(pid=pid))
+        self.quits = 0
+
+    def quit(self):
+        self.quits += 1
+
+
+def test_reaper_leaves_browsers_of_other_pools_alone(monkeypatch):
+    me = os.getpid()
+    trees = {me: [me, 200, 201, 300], 200: [200, 201]}
+    monkeypatch.setattr(worker, "process_tree_pids", lambda pid: trees.get(pid, [pid]))
+    monkeypatch.setattr(worker, "_is_browser_process", lambda pid: True)
+    monkeypatch.setattr(worker, "_browser_process_state", lambda pid: "S")
+    main, captcha = worker.DriverPool(size=1), worker.DriverPool(size=1)
+    captcha._pids[FakeDriver(200)] = {200, 201}
+    reaped = []
+    monkeypatch.setattr(main, "_reap", lambda pids, grace=2.0: reaped.append(set(pids)))
+
+    main.reap_orphans()
+
+    assert reaped == [{300}]
+
+
+def test_no_descendant_sweep_while_any_pool_is_launching(monkeypatch):
+    me = os.getpid()
+    monkeypatch.setattr(worker, "process_tree_pids", lambda pid: [me, 400] if pid == me else [pid])
+    monkeypatch.setattr(worker, "_is_browser_process", lambda pid: True)
+    monkeypatch.setattr(worker, "_browser_process_state", lambda pid: "S")
+    main, captcha = worker.DriverPool(size=1), worker.DriverPool(size=1)
+    captcha._launching = 1
+    reaped = []
+    monkeypatch.setattr(main, "_reap", lambda pids, grace=2.0: reaped.append(set(pids)))
+
+    main.reap_orphans()
+
+    assert reaped == []
+
+
+def test_abandoning_a_job_reaches_every_pool(monkeypatch):
+    monkeypatch.setattr(worker, "_STATUS_JOURNAL", None)
+    monkeypatch.setattr(worker, "get_lease_manager", lambda: SimpleNamespace(release=lambda job_id: None))
+    driver = FakeDriver()
+    lane_pool = worker.DriverPool(size=1)
+    lane_pool._owners[driver] = "job-7"
+
+    worker.abandon_stalled_job("job-7")
+
+    assert driver.quits == 1
+    assert driver in lane_pool._recycle_requested
+    worker._ABORTED_JOBS.discard("job-7")
+
+
+def _pool(monkeypatch, size=2, max_jobs=2, reset_ok=True):
+    pool = worker.DriverPool(size=size, max_jobs=max_jobs)
+    pool.launched = []
+
+    def launch():
+        driver = FakeDriver()
+        pool._jobs_served[driver] = 0
+        pool.launched.append(driver)
+        return driver
+
+    monkeypatch.setattr(pool, "_launch", launch)
+    monkeypatch.setattr(pool, "_is_healthy", lambda driver: not driver.quits)
+    monkeypatch.setattr(pool, "_reset", lambda driver: reset_ok)
+    monkeypatch.setattr(pool, "_session_pids", lambda driver: set())
+    monkeypatch.setattr(pool, "_session_rss", lambda driver: 0)
+    monkeypatch.setattr(pool, "_reap", lambda pids, grace=2.0: None)
+    return pool
+
+
+def test_sessions_are_reused_between_jobs(monkeypatch):
+    pool = _pool(monkeypatch, max_jobs=0)
+    for _ in range(3):
+        with pool.lease() as driver:
+            assert driver is pool.launched[0]
+    assert len(pool.launched) == 1
+
+
+def test_sessions_are_recycled_after_max_jobs(monkeypatch):
+    pool = _pool(monkeypatch, max_jobs=2)
+    for _ in range(3):
+        with pool.lease():
+            pass
+    first, second = pool.launched
+    assert first.quits == 1 and second.quits == 0
+
+
+def test_a_session_that_fails_to_reset_is_retired(monkeypatch):
+    pool = _pool(monkeypatch, max_jobs=0, reset_ok=False)
+    with pool.lease() as driver:
+        pass
+    assert driver.quits == 1
+    assert pool._idle == []
+
+
+def test_an_unhealthy_idle_session_is_replaced_on_acquire(monkeypatch):
+    pool = _pool(monkeypatch, max_jobs=0)
+    with pool.lease() as driver:
+        pass
+    driver.quits = 1  # died while idle
+    with pool.lease() as replacement:
+        assert replacement is not driver
+    assert len(pool.launched) == 2
+
+
+def test_acquire_waits_for_a_free_session(monkeypatch):
+    pool = _pool(monkeypatch, size=1, max_jobs=0)
+    held = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.05)
+    pool.release(held)
+    assert pool.acquire(timeout=0.05) is held
+
+
+def test_warm_fills_the_pool_and_close_retires_idle_sessions(monkeypatch):
+    pool = _pool(monkeypatch, size=3, max_jobs=0)
+    monkeypatch.setattr(pool, "reap_orphans", lambda: None)
+    pool.warm()
+    assert len(pool._idle) == 3
+    pool.close()
+    assert all(d.quits == 1 for d in pool.launched)
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self"), reason="needs Linux /proc")
+def test_process_tree_follows_children_and_sums_their_memory():
+    import subprocess
+    import sys
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+    try:
+        pids = worker.process_tree_pids(os.getpid())
+        assert pids[0] == os.getpid()
+        assert child.pid in pids
+        assert worker.process_tree_rss(child.pid) > 0
+        assert worker.process_tree_rss(os.getpid()) > worker.process_tree_rss(child.pid)
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_memory_check_recycles_idle_sessions_now_and_leased_ones_after_their_job(monkeypatch):
+    monkeypatch.setattr(worker, "CHROME_RSS_LIMIT_MB", 100)
+    pool = _pool(monkeypatch, size=2, max_jobs=0)
+    leased = pool.acquire()
+    idle = pool.acquire()
+    pool.release(idle)
+    monkeypatch.setattr(pool, "_session_rss", lambda driver: 200 * 1024 * 1024)
+
+    pool.check_memory()
+
+    assert idle.quits == 1 and pool._idle == []
+    assert leased.quits == 0 and leased in pool._recycle_requested
+    assert pool.metrics["memory_recycles"] == 2
+    assert pool.metrics["sessions"] == 2
+    pool.release(leased)
+    assert leased.quits == 1
+
+
+def test_zombie_browser_children_are_waited_on(monkeypatch):
+    me = os.getpid()
+    monkeypatch.setattr(worker, "process_tree_pids", lambda pid: [me, 500] if pid == me else [pid])
+    monkeypatch.setattr(worker, "_is_browser_process", lambda pid: False)
+    monkeypatch.setattr(worker, "_browser_process_state", lambda pid: "Z")
+    waited = []
+    monkeypatch.setattr(worker.os, "waitpid", lambda pid, flags: waited.append(pid) or (pid, 0))
+    pool = worker.DriverPool(size=1)
+    pool.reap_orphans()
+    assert waited == [500]
@@ -0,0 +1,37 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+import worker
+
+# Runs FILL_FIELDS_JS against a one-field fake DOM and counts the blur events the field saw.
+HARNESS = """
+function run(focusTakes) {
+    var blurs = 0, active = null;
+    var el = {
+        tagName: 'INPUT', value: '',
+        focus: function () { if (focusTakes) active = el; },
+        blur: function () { if (active === el) { active = null; blurs++; } },
+        dispatchEvent: function (e) { if (e.type === 'blur') blurs++; }
+    };
+    global.document = {
+        querySelector: function () { return el; },
+        get activeElement() { return active; }
+    };
+    global.HTMLInputElement = {prototype: {}};
+    Object.defineProperty(HTMLInputElement.prototype, 'value', {set: function (v) { this.value = v; }});
+    global.Event = global.FocusEvent = function (type) { this.type = type; };
+    var kept = (function () { %s }).call(null, [['h1', 'Ada']]);
+    return {blurs: blurs, kept: kept.h1};
+}
+console.log(JSON.stringify([run(true), run(false)]));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_fill_fires_blur_once_whether_or_not_focus_took():
+    script = HARNESS % worker.FILL_FIELDS_JS
+    out = subprocess.run(["node", "-e", script], capture_output=True, text=True, check=True).stdout
+    assert json.loads(out) == [{"blurs": 1, "kept": True}, {"blurs": 1, "kept": True}]
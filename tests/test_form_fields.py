@@ -0,0 +1,49 @@
+import worker
+
+
+def _field(**kw):
+    field = {"tag": "input", "type": "text", "name": None, "id": None, "placeholder": None,
+             "aria_label": None, "title": None, "class": None, "label": None, "for_label": None}
+    field.update(kw)
+    return field
+
+
+class SnapshotDriver:
+    def __init__(self, snapshot=None, error=None):
+        self.snapshot, self.error, self.calls = snapshot, error, 0
+
+    def execute_script(self, script, *args):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.snapshot
+
+
+def test_keys_come_from_the_label_first_then_attributes_then_type():
+    assert worker.find_best_key_for_field(_field(name="fld_3", label="Your email")) == "email"
+    assert worker.find_best_key_for_field(_field(name="your-name")) == "name"
+    assert worker.find_best_key_for_field(_field(name="x1", type="tel")) == "phone"
+    assert worker.find_best_key_for_field(_field(tag="textarea", name="x2")) == "message"
+    assert worker.find_best_key_for_field(_field(name="zzz")) is None
+
+
+def test_label_beats_a_misleading_attribute():
+    field = _field(name="contact-name", label="Company")
+    assert worker.find_best_key_for_field(field) == "company"
+
+
+def test_fields_are_extracted_from_one_script_call():
+    driver = SnapshotDriver([
+        _field(name="email", id="e", type="email", for_label="Email"),
+        _field(tag="textarea", name="msg", for_label=""),
+    ])
+    fields = worker.extract_form_fields(driver)
+    assert driver.calls == 1
+    assert fields == [
+        {"tag": "input", "name": "email", "id": "e", "placeholder": None, "type": "email", "label": "Email"},
+        {"tag": "textarea", "name": "msg", "id": None, "placeholder": None, "type": "text", "label": None},
+    ]
+
+
+def test_a_failed_snapshot_yields_no_fields():
+    assert worker.snapshot_form_fields(SnapshotDriver(error=RuntimeError("no such window"))) == []
@@ -0,0 +1,90 @@
+import sys
+import types
+from types import SimpleNamespace
+
+import pytest
+
+import worker
+
+
+def _fake_module(monkeypatch, name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    monkeypatch.setitem(sys.modules, name, module)
+    return module
+
+
+class FakeOptions:
+    def __init__(self):
+        self.arguments, self.capabilities, self.experimental = [], {}, {}
+        self.page_load_strategy = None
+
+    def add_argument(self, arg):
+        self.arguments.append(arg)
+
+    def set_capability(self, key, value):
+        self.capabilities[key] = value
+
+    def add_experimental_option(self, key, value):
+        self.experimental[key] = value
+
+
+@pytest.fixture
+def fake_options(monkeypatch):
+    for name in ("selenium", "selenium.webdriver", "selenium.webdriver.chrome"):
+        _fake_module(monkeypatch, name)
+    _fake_module(monkeypatch, "selenium.webdriver.chrome.options", Options=FakeOptions)
+
+
+def test_unknown_profile_falls_back_to_full(caplog):
+    assert worker.get_launch_profile("turbo") is worker.LAUNCH_PROFILES["full"]
+    assert "turbo" in caplog.text
+
+
+def test_each_profile_only_adds_switches_to_the_one_before():
+    full, lean, minimal = (set(worker.LAUNCH_PROFILES[n]["args"]) for n in ("full", "lean", "minimal"))
+    assert full < lean < minimal
+    assert worker.LAUNCH_PROFILES["minimal"]["page_load_strategy"] == "eager"
+
+
+def test_options_keep_the_last_value_of_a_repeated_switch(fake_options, monkeypatch):
+    monkeypatch.setitem(worker.LAUNCH_PROFILES, "test", {
+        "args": ["--headless=new", "--window-position=0,0", "--headless=old"],
+        "page_load_strategy": "eager",
+        "window_size": (800, 600),
+    })
+    options = worker._setup_chrome_options("test")
+    assert options.arguments == ["--headless=old", "--window-position=0,0", "--window-size=800,600"]
+    assert options.page_load_strategy == "eager"
+
+
+def test_benchmark_reports_averages_per_profile(monkeypatch, capsys):
+    launched = []
+
+    class FakeChrome:
+        def __init__(self, service, options):
+            self.service = SimpleNamespace(process=SimpleNamespace(pid=1))
+            self.quit_calls = 0
+            launched.append(self)
+
+        def get(self, url):
+            self.url = url
+
+        def quit(self):
+            self.quit_calls += 1
+
+    for name in ("selenium", "selenium.webdriver.chrome"):
+        _fake_module(monkeypatch, name)
+    sys.modules["selenium"].webdriver = _fake_module(monkeypatch, "selenium.webdriver", Chrome=FakeChrome)
+    _fake_module(monkeypatch, "selenium.webdriver.chrome.service", Service=lambda path: None)
+    monkeypatch.setattr(worker, "_setup_chrome_options", lambda name: SimpleNamespace())
+    monkeypatch.setattr(worker, "apply_resource_blocking", lambda driver: None)
+    monkeypatch.setattr(worker, "wait_for_ready_state", lambda driver, timeout, state: True)
+    monkeypatch.setattr(worker, "process_tree_rss", lambda pid: 300 * 1024 * 1024)
+
+    results = worker.benchmark_launch_profiles("https://example.test", runs=2, profiles=["lean", "minimal"])
+
+    assert list(results) == ["lean", "minimal"]
+    assert results["lean"]["rss_mb"] == 300.0
+    assert len(launched) == 4 and all(d.quit_calls == 1 and d.url == "https://example.test" for d in launched)
+    assert "minimal" in capsys.readouterr().out
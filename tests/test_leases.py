@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+
+import worker
+from conftest import FakeConn
+
+
+def test_heartbeat_connection_wait_is_well_below_the_lease():
+    assert worker.HEARTBEAT_DB_TIMEOUT <= worker.LEASE_SECONDS / 4
+
+
+def test_heartbeat_waits_briefly_and_stops_renewing_lost_leases(monkeypatch):
+    conn = FakeConn(results=[[], [("1",)]])  # workers upsert, then the renewed ids
+    timeouts = []
+
+    @contextmanager
+    def db_connection(timeout=None):
+        timeouts.append(timeout)
+        yield conn
+
+    monkeypatch.setattr(worker, "db_connection", db_connection)
+    monkeypatch.setattr(worker, "_MIGRATIONS_VERIFIED", {"leases"})
+    monkeypatch.setattr(worker, "contact_id_array_sql", lambda: "%s::int8[]")
+    monkeypatch.setattr(worker, "get_instance_private_ip", lambda: "10.0.0.1")
+    leases = worker.LeaseManager()
+    leases.hold("1")
+    leases.hold("2")
+    leases.heartbeat()
+    assert timeouts == [worker.HEARTBEAT_DB_TIMEOUT]
+    assert leases.held() == ["1"]
+    assert leases.metrics["leases_lost"] == 1
+    assert not any(sql.startswith(("ALTER", "CREATE")) for sql in conn.statements())
+
+
+def _placeholders_match(conn):
+    return all(sql.count("%s") == len(params or ()) for sql, params in conn.executed)
+
+
+def test_release_jobs_resets_both_status_columns_and_drops_the_lease(fake_db, monkeypatch):
+    leases = worker.LeaseManager()
+    leases.hold(5)
+    monkeypatch.setattr(worker, "get_lease_manager", lambda: leases)
+    monkeypatch.setattr(worker, "contact_id_array_sql", lambda: "%s::int8[]")
+    fake_db.results = [[(5,)]]
+    assert worker.release_jobs([5]) == 1
+    sql = fake_db.statements()[0]
+    assert "form_status = 'Queued', status = 'Queued'" in sql
+    assert "AND worker_id = %s AND form_status = 'PROCESSING'" in sql
+    assert _placeholders_match(fake_db)
+    assert leases.held() == []
+
+
+def test_reaper_and_mark_failed_requeue_status_too(fake_db, monkeypatch):
+    monkeypatch.setattr(worker, "_MIGRATIONS_VERIFIED", {"leases"})
+    fake_db.results = [[], [], [("Queued", 1)]]  # reaped rows, stale workers, mark_failed row
+    worker.reap_expired_leases(batch=10)
+    assert worker.mark_failed(9, "boom") == ("Queued", 1)
+    requeues = [sql for sql in fake_db.statements() if "form_status = CASE" in sql]
+    assert len(requeues) == 2
+    assert all("status = CASE WHEN" in sql for sql in requeues)
+    assert _placeholders_match(fake_db)
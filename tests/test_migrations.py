@@ -0,0 +1,40 @@
+import pytest
+
+import worker
+from conftest import FakeConn
+
+
+def test_migrations_run_on_an_autocommit_connection_with_a_lock_timeout(monkeypatch):
+    conn = FakeConn()
+    monkeypatch.setattr(worker, "_get_db_conn", lambda: conn)
+    worker.run_migrations()
+    statements = conn.statements()
+    assert conn.autocommit and conn.closed
+    assert statements[0].startswith("SELECT set_config('lock_timeout'")
+    assert any("ADD COLUMN IF NOT EXISTS screenshot_ref" in sql for sql in statements)
+
+
+def test_invalid_concurrent_index_is_dropped_and_rebuilt(monkeypatch):
+    monkeypatch.setitem(worker.SCHEMA_MIGRATIONS, "test", {
+        "statements": [],
+        "indexes": {"test_idx": "CREATE INDEX CONCURRENTLY IF NOT EXISTS test_idx ON t (c)"},
+        "check": "SELECT true",
+    })
+    conn = FakeConn(results=[[], [(False,)]])  # set_config, then indisvalid = false
+    monkeypatch.setattr(worker, "_get_db_conn", lambda: conn)
+    worker.run_migrations(["test"])
+    assert conn.statements()[-2:] == [
+        "DROP INDEX CONCURRENTLY IF EXISTS test_idx",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS test_idx ON t (c)",
+    ]
+
+
+def test_require_migration_raises_when_missing_and_caches_success(monkeypatch):
+    monkeypatch.setattr(worker, "_MIGRATIONS_VERIFIED", set())
+    with pytest.raises(RuntimeError, match="worker.py migrate"):
+        worker.require_migration(FakeConn(results=[[(False,)]]), "screenshots")
+    conn = FakeConn(results=[[(True,)]])
+    worker.require_migration(conn, "screenshots")
+    worker.require_migration(conn, "screenshots")
+    assert len(conn.executed) == 1
+    assert not any(sql.startswith(("ALTER", "CREATE")) for sql in conn.statements())
@@ -0,0 +1,78 @@
+import json
+import time
+
+import pytest
+
+import worker
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return worker.MemoryQueue()
+    return worker.SqliteQueue(str(tmp_path / "queue.db"))
+
+
+def test_send_receive_delete_round_trip(backend):
+    ids = backend.send_batch([(json.dumps({"job_id": n}), 0) for n in range(3)])
+    got = backend.receive(10, 0, 30)
+    assert [m["MessageId"] for m in got] == ids
+    assert [json.loads(m["Body"])["job_id"] for m in got] == [0, 1, 2]
+    assert backend.delete_batch([m["ReceiptHandle"] for m in got]) == []
+    assert backend.receive(10, 0, 30) == []
+
+
+def test_received_messages_stay_hidden_until_their_visibility_lapses(backend):
+    backend.send_batch([("a", 0)])
+    first = backend.receive(10, 0, 0.2)
+    assert len(first) == 1
+    assert backend.receive(10, 0, 0.2) == []
+    time.sleep(0.25)
+    again = backend.receive(10, 1, 30)
+    assert [m["MessageId"] for m in again] == [first[0]["MessageId"]]
+    # A redelivery invalidates the old receipt handle, as on SQS.
+    assert backend.delete_batch([first[0]["ReceiptHandle"]]) == [first[0]["ReceiptHandle"]]
+    assert backend.delete_batch([again[0]["ReceiptHandle"]]) == []
+
+
+def test_change_visibility_returns_a_message_early(backend):
+    backend.send_batch([("a", 0)])
+    (msg,) = backend.receive(1, 0, 300)
+    assert backend.change_visibility_batch([(msg["ReceiptHandle"], 0), ("bogus", 0)]) == ["bogus"]
+    assert [m["MessageId"] for m in backend.receive(1, 1, 30)] == [msg["MessageId"]]
+
+
+def test_delayed_sends_are_not_visible_yet(backend):
+    backend.send_batch([("later", 60), ("now", 0)])
+    assert [m["Body"] for m in backend.receive(10, 0, 30)] == ["now"]
+
+
+def test_receive_respects_max_messages(backend):
+    backend.send_batch([(str(n), 0) for n in range(5)])
+    assert len(backend.receive(2, 0, 30)) == 2
+    assert len(backend.receive(10, 0, 30)) == 3
+
+
+class FakeSqsClient:
+    def __init__(self):
+        self.calls = []
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        self.calls.append(len(Entries))
+        return {"Failed": [{"Id": e["Id"]} for e in Entries if e["ReceiptHandle"] == "bad"]}
+
+
+def test_sqs_deletes_in_chunks_of_ten_and_maps_failures_back():
+    sqs = worker.SqsQueue(url="https://sqs.example/q")
+    sqs._client = FakeSqsClient()
+    receipts = [f"r{n}" for n in range(23)]
+    receipts[12] = "bad"
+    assert sqs.delete_batch(receipts) == ["bad"]
+    assert sqs._client.calls == [10, 10, 3]
+
+
+def test_unknown_backend_is_rejected(monkeypatch):
+    monkeypatch.setattr(worker, "_QUEUE", None)
+    monkeypatch.setattr(worker, "QUEUE_BACKEND", "kafka")
+    with pytest.raises(ValueError, match="kafka"):
+        worker.get_queue()
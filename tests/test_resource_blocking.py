@@ -0,0 +1,30 @@
+import worker
+
+
+def test_allowlisted_hosts_and_path_prefixes_are_exempt():
+    assert worker.resource_allowed("https://www.gstatic.com/recaptcha/releases/x/logo_48.png")
+    assert worker.resource_allowed("https://www.recaptcha.net/anything.woff2")
+    assert worker.resource_allowed("https://js.hsforms.net/forms/img.png")
+    assert not worker.resource_allowed("https://www.gstatic.com/images/logo.png")
+    assert not worker.resource_allowed("https://example.com/hero.jpg")
+
+
+def test_extension_patterns_only_when_asked_for():
+    assert not any(p.startswith("*.") for p in worker.resource_block_patterns())
+    assert "*.png" in worker.resource_block_patterns(with_extensions=True)
+
+
+def test_host_patterns_skip_hosts_covering_an_allowlisted_one(monkeypatch):
+    monkeypatch.setattr(worker, "BLOCKED_HOSTS", ["google.com", "doubleclick.net"])
+    patterns = worker.resource_block_patterns()
+    assert "*://*.doubleclick.net/*" in patterns
+    assert not any("google.com" in p for p in patterns)
+
+
+def test_fetch_blocked_requests_count_as_blocked():
+    stats = worker.update_network_stats(worker.new_network_stats(), [
+        ("Network.requestWillBeSent", {"requestId": "1", "type": "Image"}),
+        ("Network.loadingFailed", {"requestId": "1", "errorText": "net::ERR_BLOCKED_BY_CLIENT"}),
+    ])
+    assert stats["blocked_requests"] == 1
+    assert stats["blocked_bytes_estimate"] == worker.BLOCKED_BYTES_ESTIMATE["Image"]
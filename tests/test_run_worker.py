@@ -0,0 +1,48 @@
+import json
+import threading
+import time
+
+import worker
+
+
+def test_executors_run_jobs_concurrently_up_to_the_limit(monkeypatch):
+    queue = worker.MemoryQueue()
+    queue.send_batch([(json.dumps({"job_id": n}), 0) for n in range(6)])
+    monkeypatch.setattr(worker, "_QUEUE", queue)
+    monkeypatch.setattr(worker, "SHUTDOWN", False)
+    monkeypatch.setattr(worker, "SQS_WAIT_SECONDS", 0.1)
+    monkeypatch.setattr(worker, "CAPTCHA_LANE_CONCURRENCY", 0)
+    monkeypatch.setattr(worker, "DOMAIN_MAX_CONCURRENCY", 10)
+    monkeypatch.setattr(worker, "DOMAIN_RATE_PER_MINUTE", 0)
+    monkeypatch.setattr(worker, "_DRIVER_POOL", None)
+    monkeypatch.setattr(worker, "claim_sqs_messages", lambda messages: [
+        (msg, {"id": json.loads(msg["Body"])["job_id"], "contact_us_url": "https://example.com"})
+        for msg in messages
+    ])
+    lock = threading.Lock()
+    running, peak, done = [0], [0], []
+
+    def run_claimed_job(msg, job):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.15)
+        with lock:
+            running[0] -= 1
+            done.append(job["id"])
+        queue.delete_batch([msg["ReceiptHandle"]])
+        return {"success": True}
+
+    monkeypatch.setattr(worker, "run_claimed_job", run_claimed_job)
+    loop = threading.Thread(target=worker.run_worker, kwargs={"concurrency": 3, "drain_timeout": 2}, daemon=True)
+    loop.start()
+    deadline = time.monotonic() + 5
+    while len(done) < 6 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    monkeypatch.setattr(worker, "SHUTDOWN", True)
+    loop.join(5)
+
+    assert not loop.is_alive()
+    assert sorted(done) == list(range(6))
+    assert peak[0] == 3
+    assert queue.receive(10, 0, 30) == []
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import worker
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_naive_times_are_local_to_the_job_timezone():
+    job = {"scheduled_time": "2030-01-15T09:00:00", "time_zone": "America/New_York"}
+    assert worker.job_due_at(job) == _utc(2030, 1, 15, 14, 0)
+    summer = {"scheduled_time": "2030-07-15T09:00:00", "time_zone": "America/New_York"}
+    assert worker.job_due_at(summer) == _utc(2030, 7, 15, 13, 0)
+
+
+def test_aware_times_keep_their_offset_and_missing_zones_mean_utc():
+    aware = datetime(2030, 1, 15, 9, 0, tzinfo=timezone(timedelta(hours=2)))
+    assert worker.job_due_at({"scheduled_time": aware, "time_zone": "Asia/Tokyo"}) == _utc(2030, 1, 15, 7, 0)
+    assert worker.job_due_at({"scheduled_time": "2030-01-15T09:00:00"}) == _utc(2030, 1, 15, 9, 0)
+    assert worker.job_due_at({"scheduled_time": "2030-01-15T09:00:00", "time_zone": "Mars/Olympus"}) == \
+        _utc(2030, 1, 15, 9, 0)
+
+
+def test_unusable_schedules_mean_run_now():
+    for job in ({}, {"scheduled_time": None}, {"scheduled_time": "next tuesday-ish"}, {"scheduled_time": 42}):
+        assert worker.job_due_at(job) is None
+        assert worker.job_due_delay(job) == 0.0
+        assert worker.should_run_job(job)
+
+
+def test_due_delay_counts_down_to_the_scheduled_time():
+    soon = datetime.now(timezone.utc) + timedelta(minutes=10)
+    job = {"scheduled_time": soon.isoformat()}
+    assert worker.job_due_delay(job) == pytest.approx(600, abs=5)
+    assert not worker.should_run_job(job)
+    past = {"scheduled_time": (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()}
+    assert worker.job_due_delay(past) == 0.0
+    assert worker.should_run_job(past)
+
+
+def test_scheduler_defers_jobs_not_due_within_the_local_wait(monkeypatch):
+    monkeypatch.setattr(worker, "DOMAIN_MAX_LOCAL_WAIT", 10.0)
+    scheduler = worker.JobScheduler()
+    later = {"id": 1, "contact_us_url": "https://a.com",
+             "scheduled_time": (datetime.now(timezone.utc) + timedelta(hours=2)).isoformat()}
+    assert scheduler.put("m", later) == pytest.approx(7200, abs=5)
+    assert scheduler.metrics["not_due"] == 1
+
+
+@pytest.fixture
+def parking(monkeypatch):
+    queue, acked, released = worker.MemoryQueue(), [], []
+    monkeypatch.setattr(worker, "_QUEUE", queue)
+    monkeypatch.setattr(worker, "_VISIBILITY_EXTENDER", None)
+    monkeypatch.setattr(worker, "release_jobs", released.extend)
+    monkeypatch.setattr(worker, "get_sqs_acker", lambda: SimpleNamespace(ack=acked.extend))
+    return SimpleNamespace(queue=queue, acked=acked, released=released)
+
+
+def test_short_deferrals_resend_the_message_with_a_delay(parking):
+    parking.queue.send_batch([("body", 0)])
+    (msg,) = parking.queue.receive(1, 0, 300)
+    worker.defer_job(msg, {"id": 5}, 120)
+    assert parking.released == [5]
+    assert parking.acked == [msg]
+    assert len(parking.queue._messages) == 2  # the original is deleted by the (faked) acker
+    assert parking.queue.receive(10, 0, 30) == []
+
+
+def test_long_deferrals_hide_the_original_message(parking, monkeypatch):
+    hidden = []
+    monkeypatch.setattr(worker, "change_message_visibility", hidden.extend)
+    worker.defer_job({"ReceiptHandle": "r1", "Body": "body"}, {"id": 6}, 3 * 3600)
+    assert parking.released == [6]
+    assert parking.acked == []
+    assert hidden == [("r1", min(worker.SQS_MAX_VISIBILITY, 3 * 3600))]
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+import worker
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(worker, "DOMAIN_RATE_PER_MINUTE", 6.0)  # one token per 10s
+    monkeypatch.setattr(worker, "DOMAIN_BURST", 2.0)
+    monkeypatch.setattr(worker, "DOMAIN_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(worker, "DOMAIN_MAX_LOCAL_WAIT", 5.0)
+    return worker.JobScheduler()
+
+
+def _job(n, host="example.com"):
+    return {"contact_id": n, "contact_us_url": f"https://{host}/contact", "campaign_name": "c"}
+
+
+def test_running_jobs_do_not_count_against_the_token_bucket(scheduler):
+    assert scheduler.put("m1", _job(1)) is None
+    assert scheduler.get(timeout=0) == ("m1", _job(1))
+    # one token left and nothing queued: the next job only waits for the slot
+    assert scheduler.put("m2", _job(2)) is None
+    assert scheduler.metrics["deferred"] == 0
+
+
+def test_queued_jobs_still_push_later_ones_back(scheduler):
+    assert scheduler.put("m1", _job(1)) is None
+    assert scheduler.put("m2", _job(2)) is None
+    wait = scheduler.put("m3", _job(3))
+    assert wait == pytest.approx(10.0, abs=0.5)
+    assert scheduler.metrics["deferred"] == 1
+    assert scheduler.put("m4", _job(4, host="other.org")) is None
+
+
+def test_idle_hosts_and_campaigns_are_forgotten(scheduler, monkeypatch):
+    monkeypatch.setattr(worker, "DOMAIN_RATE_PER_MINUTE", 60000.0)  # buckets refill within milliseconds
+    for n in range(50):
+        job = dict(_job(n, host=f"site{n}.com"), campaign_name=f"campaign{n}")
+        assert scheduler.put(f"m{n}", job) is None
+        msg, job = scheduler.get(timeout=0)
+        scheduler.done(job)
+    time.sleep(0.01)
+    assert scheduler.put("last", _job(99, host="site99.com")) is None
+    assert set(scheduler._domains) == {"site99.com"}
+    assert set(scheduler._last_finish) == {"c"}
+
+
+def test_busy_and_paused_hosts_are_kept(scheduler):
+    assert scheduler.put("m1", _job(1, host="busy.com")) is None
+    scheduler.get(timeout=0)
+    assert scheduler.put("m2", _job(2, host="blocked.com")) is None
+    _, job = scheduler.get(timeout=0)
+    scheduler.done(job, {"blocked": True})
+    scheduler.put("m3", _job(3, host="other.org"))
+    assert {"busy.com", "blocked.com", "other.org"} <= set(scheduler._domains)
@@ -0,0 +1,80 @@
+import base64
+import threading
+
+import worker
+
+
+class ShotDriver:
+    def __init__(self, clip):
+        self.clip, self.cdp = clip, []
+
+    def execute_script(self, script, *args):
+        self.args = args
+        return dict(self.clip)
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.cdp.append((cmd, params))
+        return {"data": "aGk="}
+
+
+def test_capture_clips_to_the_form_and_scales_down_tall_pages(monkeypatch):
+    monkeypatch.setattr(worker, "SCREENSHOT_MODE", "clip")
+    monkeypatch.setattr(worker, "SCREENSHOT_FORMAT", "jpeg")
+    monkeypatch.setattr(worker, "SCREENSHOT_QUALITY", 60)
+    monkeypatch.setattr(worker, "SCREENSHOT_MAX_DIMENSION", 2000)
+    driver = ShotDriver({"x": 0, "y": 300, "width": 1000, "height": 4000})
+
+    assert worker.capture_form_screenshot(driver, ["afs-1"]) == "aGk="
+
+    assert driver.args == (["afs-1"], False)
+    ((cmd, params),) = driver.cdp
+    assert cmd == "Page.captureScreenshot"
+    assert params["clip"]["scale"] == 0.5
+    assert (params["format"], params["quality"]) == ("jpeg", 60)
+
+
+def test_png_has_no_quality_and_off_captures_nothing(monkeypatch):
+    monkeypatch.setattr(worker, "SCREENSHOT_MODE", "full")
+    monkeypatch.setattr(worker, "SCREENSHOT_FORMAT", "png")
+    driver = ShotDriver({"x": 0, "y": 0, "width": 800, "height": 600})
+    worker.capture_form_screenshot(driver)
+    assert "quality" not in driver.cdp[0][1] and driver.args == ([], True)
+    monkeypatch.setattr(worker, "SCREENSHOT_MODE", "off")
+    assert worker.capture_form_screenshot(driver) is None
+    assert len(driver.cdp) == 1
+
+
+def test_writer_decodes_and_saves_in_the_background(monkeypatch):
+    saved = []
+    monkeypatch.setattr(worker, "save_job_screenshot", lambda cid, data, ctype: saved.append((cid, data, ctype)))
+    writer = worker.ScreenshotWriter()
+    writer.submit(7, base64.b64encode(b"jpegbytes").decode(), "image/jpeg")
+    assert writer.flush(timeout=2)
+    assert saved == [(7, b"jpegbytes", "image/jpeg")]
+
+
+def test_a_failed_save_does_not_stop_the_writer(monkeypatch):
+    saved = []
+
+    def save(cid, data, ctype):
+        if cid == 1:
+            raise RuntimeError("db down")
+        saved.append(cid)
+
+    monkeypatch.setattr(worker, "save_job_screenshot", save)
+    writer = worker.ScreenshotWriter()
+    writer.submit(1, "aGk=")
+    writer.submit(2, "aGk=")
+    assert writer.flush(timeout=2)
+    assert saved == [2]
+
+
+def test_a_full_queue_drops_instead_of_blocking_the_job(monkeypatch):
+    gate = threading.Event()
+    monkeypatch.setattr(worker, "save_job_screenshot", lambda *a: gate.wait(2))
+    writer = worker.ScreenshotWriter(max_pending=1)
+    for cid in range(5):
+        writer.submit(cid, "aGk=")
+    assert writer._queue.unfinished_tasks <= 2
+    gate.set()
+    assert writer.flush(timeout=2)
@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import worker
+
+
+class RecordingQueue:
+    def __init__(self):
+        self.calls = []
+        self.deleted = threading.Event()
+
+    def delete_batch(self, receipts):
+        self.calls.append(list(receipts))
+        self.deleted.set()
+        return [r for r in receipts if r == "bad"]
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    q = RecordingQueue()
+    monkeypatch.setattr(worker, "_QUEUE", q)
+    return q
+
+
+def _msgs(*receipts):
+    return [{"ReceiptHandle": r} for r in receipts]
+
+
+def test_acks_wait_to_share_a_call(queue):
+    acker = worker.SqsAcker(interval=60)
+    acker.ack(_msgs("a", "b"))
+    acker.ack(_msgs("c"))
+    time.sleep(0.05)
+    assert queue.calls == []
+    acker.close()
+    assert queue.calls == [["a", "b", "c"]]
+    assert acker.metrics == {"acked": 3, "calls": 1, "failed": 0}
+
+
+def test_a_full_batch_is_sent_without_waiting_for_the_interval(queue):
+    acker = worker.SqsAcker(interval=60)
+    acker.ack(_msgs(*[f"r{n}" for n in range(12)]))
+    assert queue.deleted.wait(2)
+    assert len(queue.calls[0]) == 12
+    assert acker.metrics["calls"] == 2  # two delete_message_batch calls of <= 10
+    acker.close()
+
+
+def test_refused_deletes_are_counted(queue):
+    acker = worker.SqsAcker(interval=60)
+    acker.ack(_msgs("ok", "bad"))
+    acker.close()
+    assert acker.metrics == {"acked": 1, "calls": 1, "failed": 1}
+
+
+def test_claiming_a_batch_acks_what_cannot_run_in_one_go(monkeypatch):
+    acked, hidden, held = [], [], []
+    monkeypatch.setattr(worker, "claim_jobs", lambda claims: (
+        {"1": {"id": 1}}, {"2"}
+    ))
+    monkeypatch.setattr(worker, "get_sqs_acker", lambda: SimpleNamespace(ack=acked.append))
+    monkeypatch.setattr(worker, "change_message_visibility", hidden.extend)
+    monkeypatch.setattr(worker, "get_lease_manager", lambda: SimpleNamespace(hold=held.append))
+    monkeypatch.setattr(worker, "get_visibility_extender", lambda: SimpleNamespace(track=lambda msg, job_id: None))
+
+    def msg(receipt, body):
+        return {"MessageId": receipt, "ReceiptHandle": receipt, "Body": body}
+
+    messages = [
+        msg("m1", json.dumps({"job_id": 1})),
+        msg("m1-dup", json.dumps({"job_id": 1})),
+        msg("m2", json.dumps({"job_id": 2})),   # another worker holds it
+        msg("m3", json.dumps({"job_id": 3})),   # already done
+        msg("junk", "not json"),
+    ]
+    claimed = worker.claim_sqs_messages(messages)
+
+    assert claimed == [(messages[0], {"id": 1})]
+    assert held == [1]
+    assert hidden == [("m2", worker.LEASE_SECONDS + int(worker.REAPER_INTERVAL))]
+    assert len(acked) == 1
+    assert [m["ReceiptHandle"] for m in acked[0]] == ["m1-dup", "junk", "m3"]
@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+
+import worker
+
+HEAVY_MODULES = ("pytz", "requests", "selenium", "psycopg2", "boto3", "dateutil", "lxml", "sqlite3")
+
+
+def test_importing_the_worker_leaves_heavy_dependencies_unloaded():
+    module_dir = os.path.dirname(os.path.abspath(worker.__file__))
+    probe = (
+        "import json, sys; sys.path.insert(0, %r); import worker; "
+        "print(json.dumps([m for m in %r if m in sys.modules]))" % (module_dir, HEAVY_MODULES)
+    )
+    out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == []
+
+
+def _bench_env(monkeypatch):
+    monkeypatch.setattr(worker, "_QUEUE", worker.MemoryQueue())
+    monkeypatch.setattr(worker, "PSYCOPG2_AVAILABLE", False)
+    monkeypatch.setattr(worker, "SELENIUM_AVAILABLE", False)
+
+
+def test_bench_startup_reports_and_checks_the_budgets(monkeypatch, capsys):
+    _bench_env(monkeypatch)
+    assert worker.benchmark_startup(runs=1, import_budget=60, first_receive_budget=60)
+    report = json.loads(capsys.readouterr().out)
+    assert report["within_budget"] is True
+    assert 0 < report["import_s"] <= report["first_receive_s"]
+
+
+def test_bench_startup_fails_when_over_budget(monkeypatch, capsys):
+    _bench_env(monkeypatch)
+    assert not worker.benchmark_startup(runs=1, import_budget=0, first_receive_budget=60)
+    assert json.loads(capsys.readouterr().out)["within_budget"] is False
+
+
+def test_bench_startup_takes_no_message_from_the_queue(monkeypatch, capsys):
+    _bench_env(monkeypatch)
+    worker._QUEUE.send_batch([("job", 0)])
+    worker.benchmark_startup(runs=1, import_budget=60, first_receive_budget=60)
+    assert [m["Body"] for m in worker._QUEUE.receive(1, 0, 30)] == ["job"]
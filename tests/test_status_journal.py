@@ -0,0 +1,63 @@
+import sys
+import types
+
+import pytest
+
+import worker
+
+
+@pytest.fixture
+def journal(fake_db, monkeypatch):
+    """A journal without a flush thread whose execute_values calls land in `journal.calls`."""
+    calls = []
+
+    def execute_values(cur, sql, rows, page_size=100):
+        if "fail" in sql:
+            raise RuntimeError("boom")
+        cur.execute(sql, rows)
+        calls.append((sql, rows))
+
+    extras = types.ModuleType("psycopg2.extras")
+    extras.execute_values = execute_values
+    monkeypatch.setitem(sys.modules, "psycopg2", types.ModuleType("psycopg2"))
+    monkeypatch.setitem(sys.modules, "psycopg2.extras", extras)
+    monkeypatch.setattr(worker, "contact_column_types", lambda: {"id": "uuid", "form_status": "text"})
+    j = worker.StatusJournal(interval=60)
+    j.calls = calls
+    return j
+
+
+def test_update_sql_casts_known_columns_and_quotes_names():
+    sql = worker.StatusJournal._update_sql(("form_status", "odd\"name"), {"id": "int8", "form_status": "text"})
+    assert sql == (
+        'UPDATE contact_urls AS t SET "form_status" = v."form_status"::text, "odd""name" = v."odd""name" '
+        'FROM (VALUES %s) AS v(id, "form_status", "odd""name") WHERE t.id = v.id::int8'
+    )
+
+
+def test_flush_writes_one_statement_per_column_set_with_latest_values(journal):
+    journal.record(1, {"form_status": "PROCESSING"})
+    journal.record(1, {"form_status": "COMPLETED"})
+    journal.record(2, {"form_status": "FAILED"})
+    journal.record(3, {"last_error": "x"})
+    assert journal.flush() == 3
+    assert len(journal.calls) == 2
+    rows = {r[0]: r for _, group in journal.calls for r in group}
+    assert rows[1][1] == "COMPLETED"
+    assert rows[2][1] == "FAILED"
+
+
+def test_failed_write_is_requeued_and_newer_changes_win(journal, monkeypatch):
+    monkeypatch.setattr(worker.StatusJournal, "_update_sql", staticmethod(lambda columns, types: "fail"))
+    journal.record(1, {"form_status": "PROCESSING"})
+    with pytest.raises(RuntimeError):
+        journal.flush([1], raise_errors=True)
+    journal.record(1, {"form_status": "COMPLETED"})
+    assert journal._pending[1]["form_status"] == "COMPLETED"
+    assert journal._attempts[1] == 1
+
+
+def test_aborted_jobs_are_not_journaled(journal, monkeypatch):
+    monkeypatch.setattr(worker, "_ABORTED_JOBS", {7})
+    journal.record(7, {"form_status": "COMPLETED"})
+    assert journal.flush() == 0
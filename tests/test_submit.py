@@ -0,0 +1,102 @@
+import sys
+import types
+
+import pytest
+
+import worker
+
+
+@pytest.fixture(autouse=True)
+def selenium_by(monkeypatch):
+    """`By` for resolve_and_submit's import when selenium itself is not installed."""
+    if worker.SELENIUM_AVAILABLE:
+        return
+    by = types.ModuleType("selenium.webdriver.common.by")
+    by.By = types.SimpleNamespace(CSS_SELECTOR="css selector")
+    for name in ("selenium", "selenium.webdriver", "selenium.webdriver.common"):
+        monkeypatch.setitem(sys.modules, name, types.ModuleType(name))
+    monkeypatch.setitem(sys.modules, "selenium.webdriver.common.by", by)
+
+
+@pytest.fixture(autouse=True)
+def fast_verify(monkeypatch):
+    monkeypatch.setattr(worker, "SUBMIT_VERIFY_TIMEOUT", 0.05)
+    monkeypatch.setattr(worker, "WAIT_POLL_INTERVAL", 0.01)
+
+
+class FakeElement:
+    def __init__(self, driver, raises=None):
+        self.driver, self.raises = driver, raises
+
+    def click(self):
+        if self.raises:
+            raise self.raises
+        self.driver.calls.append("click")
+        self.driver.signal = self.driver.on_click
+
+
+class FakeDriver:
+    def __init__(self, candidates, form=True, on_click=None, click_raises=None):
+        self.ranked = {"candidates": candidates, "form": form}
+        self.on_click = on_click
+        self.click_raises = click_raises
+        self.signal = None
+        self.calls = []
+
+    def find_element(self, by, selector):
+        return FakeElement(self, self.click_raises)
+
+    def execute_script(self, script, *args):
+        if script == worker.SUBMIT_CANDIDATES_JS:
+            return self.ranked
+        if script == worker.SUBMIT_ARM_JS:
+            self.calls.append("arm")
+            return True
+        if script == worker.SUBMIT_CHECK_JS:
+            return self.signal
+        if "requestSubmit" in script:
+            self.calls.append("requestSubmit")
+            return None
+        if "arguments[0].click()" in script:
+            raise RuntimeError("element detached")
+        return None
+
+
+def _candidate(type_="submit", inside=True, tag="button"):
+    return {"id": "3", "score": 80, "tag": tag, "type": type_, "inside": inside, "text": "send"}
+
+
+def test_verified_click_is_not_followed_by_another_mechanism():
+    driver = FakeDriver([_candidate(type_="button")], on_click="request_sent")
+    outcome = worker.resolve_and_submit(driver, ["a"])
+    assert (outcome["method"], outcome["signal"]) == ("click", "request_sent")
+    assert "requestSubmit" not in driver.calls
+
+
+def test_unverified_click_on_a_submit_button_is_not_escalated():
+    driver = FakeDriver([_candidate()])
+    outcome = worker.resolve_and_submit(driver, ["a"])
+    assert (outcome["method"], outcome["signal"]) == ("click", None)
+    assert driver.calls.count("click") == 1
+    assert "requestSubmit" not in driver.calls
+
+
+def test_click_that_did_nothing_falls_back_to_request_submit_once():
+    driver = FakeDriver([_candidate(type_="button")])
+    outcome = worker.resolve_and_submit(driver, ["a"])
+    assert outcome["method"] == "requestSubmit"
+    assert driver.calls == ["arm", "click", "arm", "requestSubmit"]
+
+
+def test_click_that_raised_falls_back_to_request_submit():
+    driver = FakeDriver([_candidate()], click_raises=RuntimeError("intercepted"))
+    outcome = worker.resolve_and_submit(driver, ["a"])
+    assert outcome["method"] == "requestSubmit"
+    assert driver.calls.count("requestSubmit") == 1
+
+
+def test_no_fallback_to_some_other_form_on_the_page():
+    driver = FakeDriver([_candidate(type_="button")], form=False)
+    outcome = worker.resolve_and_submit(driver, ["a"])
+    assert outcome["method"] == "click"
+    assert "requestSubmit" not in driver.calls
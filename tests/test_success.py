@@ -0,0 +1,126 @@
+import pytest
+
+import worker
+
+
+@pytest.fixture(autouse=True)
+def fast_poll(monkeypatch):
+    monkeypatch.setattr(worker, "WAIT_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(worker, "SUCCESS_NETWORK_SIGNALS", True)
+
+
+class FakeDriver:
+    current_url = "https://www.shop.co.uk/contact"
+
+    def __init__(self, states=(), body=""):
+        self.states = list(states)
+        self.body = body
+
+    def execute_script(self, script, *args):
+        if script == worker.SUCCESS_POLL_JS:
+            return self.states.pop(0) if self.states else {"signal": None, "url": self.current_url, "changed": False}
+        if "innerText" in script:
+            return self.body
+        return None
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {"body": '{"ok": true}'}
+
+
+def test_form_posts_compare_the_whole_host():
+    page = "www.shop.co.uk"
+    assert worker._is_form_post("https://shop.co.uk/wp-admin/admin-ajax.php", page)
+    assert worker._is_form_post("https://api.shop.co.uk/forms", page)
+    assert not worker._is_form_post("https://tracker.co.uk/collect", page)
+    assert not worker._is_form_post("https://www.google.com/ads/ga-audiences", page)
+    assert worker._is_form_post("https://forms.hsforms.com/submissions/v3", page)
+
+
+def test_timeout_is_not_rescued_by_text_already_on_the_page():
+    driver = FakeDriver(body="Thank you for visiting! Your message has been sent to the right team.")
+    verdict = worker.detect_submit_outcome(driver, timeout=0.05)
+    assert (verdict["success"], verdict["signal"]) == (False, "timeout")
+
+
+def test_message_appearing_after_arming_decides():
+    driver = FakeDriver(states=[{}, {"signal": "dom_success", "text": "thank you, we'll be in touch"}])
+    verdict = worker.detect_submit_outcome(driver, timeout=1)
+    assert (verdict["success"], verdict["signal"]) == (True, "dom_success")
+
+
+def test_tracking_posts_to_lookalike_sites_are_ignored(monkeypatch):
+    batches = [[
+        ("Network.requestWillBeSent", {"requestId": "1", "type": "XHR",
+                                       "request": {"method": "POST", "url": "https://stats.co.uk/c"}}),
+        ("Network.responseReceived", {"requestId": "1", "response": {"status": 204}}),
+        ("Network.requestWillBeSent", {"requestId": "2", "type": "XHR",
+                                       "request": {"method": "POST", "url": "https://shop.co.uk/send"}}),
+        ("Network.responseReceived", {"requestId": "2", "response": {"status": 500}}),
+    ]]
+    monkeypatch.setattr(worker, "read_network_events", lambda driver: batches.pop(0) if batches else [])
+    verdict = worker.detect_submit_outcome(FakeDriver(), timeout=1)
+    assert (verdict["success"], verdict["signal"]) == (False, "post_error")
+    assert "shop.co.uk/send" in verdict["detail"]
+
+
+def test_captcha_calls_and_same_host_beacons_are_not_form_posts():
+    page = "www.shop.co.uk"
+    assert not worker._is_form_post("https://www.google.com/recaptcha/api2/reload?k=6Lc", page)
+    assert not worker._is_form_post("https://www.recaptcha.net/recaptcha/api2/userverify", page)
+    assert not worker._is_form_post("https://api.hcaptcha.com/checkcaptcha/x", page)
+    assert not worker._is_form_post("https://shop.co.uk/cdn-cgi/rum?", page)
+    assert not worker._is_form_post("https://www.shop.co.uk/g/collect", page)
+    assert worker._is_form_post("https://www.shop.co.uk/wp-admin/admin-ajax.php", page)
+
+
+def _network(monkeypatch, batches):
+    monkeypatch.setattr(worker, "read_network_events", lambda driver: batches.pop(0) if batches else [])
+
+
+def _xhr_post(url, status=200):
+    return [
+        ("Network.requestWillBeSent", {"requestId": "9", "type": "XHR", "request": {"method": "POST", "url": url}}),
+        ("Network.responseReceived", {"requestId": "9", "response": {"status": status}}),
+    ]
+
+
+def test_a_recaptcha_post_after_the_click_is_not_a_success(monkeypatch):
+    _network(monkeypatch, [_xhr_post("https://www.google.com/recaptcha/api2/reload?k=6Lc")
+                           + [("Network.loadingFinished", {"requestId": "9"})]])
+    verdict = worker.detect_submit_outcome(FakeDriver(), timeout=0.05)
+    assert (verdict["success"], verdict["signal"]) == (False, "timeout")
+
+
+class BodyDriver(FakeDriver):
+    def __init__(self, body):
+        super().__init__()
+        self.response_body = body
+        self.finished = False
+
+    def execute_cdp_cmd(self, cmd, params):
+        if not self.finished or self.response_body is None:
+            raise RuntimeError("No data found for resource with given identifier")
+        return {"body": self.response_body}
+
+
+def test_reply_body_is_read_after_loading_finished(monkeypatch):
+    driver = BodyDriver('{"status":"validation_failed"}')
+    batches = [_xhr_post("https://shop.co.uk/wp-json/contact-form-7/v1/contact-forms/5/feedback"), []]
+
+    def events(_):
+        if not batches:
+            driver.finished = True
+            return [("Network.loadingFinished", {"requestId": "9"})]
+        return batches.pop(0)
+
+    monkeypatch.setattr(worker, "read_network_events", events)
+    verdict = worker.detect_submit_outcome(driver, timeout=1)
+    assert (verdict["success"], verdict["signal"]) == (False, "post_rejected")
+
+
+def test_an_unreadable_reply_body_is_unknown_not_success(monkeypatch):
+    driver = BodyDriver(None)
+    driver.finished = True
+    _network(monkeypatch, [_xhr_post("https://shop.co.uk/send") + [("Network.loadingFinished", {"requestId": "9"})]])
+    verdict = worker.detect_submit_outcome(driver, timeout=0.05)
+    assert (verdict["success"], verdict["signal"]) == (False, "post_unread")
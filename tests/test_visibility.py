@@ -0,0 +1,79 @@
+import time
+from concurrent.futures import Future
+
+import pytest
+
+import worker
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_calls = 0
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+@pytest.fixture
+def extender(monkeypatch):
+    monkeypatch.setattr(worker, "change_message_visibility", lambda entries: None)
+    monkeypatch.setattr(worker, "_ABORTED_JOBS", set())
+    ext = worker.VisibilityExtender(interval=3600)
+    yield ext
+    ext.stop()
+
+
+def test_stalled_job_loses_its_lease_and_browser_with_its_message(extender, monkeypatch):
+    leases = worker.LeaseManager()
+    leases.hold(42)
+    monkeypatch.setattr(worker, "get_lease_manager", lambda: leases)
+    pool = worker.DriverPool(size=1)
+    driver = FakeDriver()
+    pool._owners[driver] = 42
+    monkeypatch.setattr(worker, "_DRIVER_POOL", pool)
+    monkeypatch.setattr(worker, "_CAPTCHA_LANE", None)
+    monkeypatch.setattr(worker, "JOB_STALL_SECONDS", 0)
+
+    extender.track({"ReceiptHandle": "r"}, 42)
+    extender.start(42)
+    time.sleep(0.01)
+    extender.extend_due()
+
+    assert extender.metrics["stalled"] == 1
+    assert 42 in worker._ABORTED_JOBS
+    assert leases.held() == []
+    assert driver.quit_calls == 1
+    assert driver in pool._recycle_requested
+
+
+def test_paused_job_is_extended_without_stall_detection(extender, monkeypatch):
+    monkeypatch.setattr(worker, "JOB_STALL_SECONDS", 0)
+    monkeypatch.setattr(worker, "VISIBILITY_TIMEOUT", 0)
+    extender.track({"ReceiptHandle": "r"}, 1)
+    extender.start(1)
+    extender.pause(1)
+    extender.extend_due()
+    assert extender.metrics == {"extended": 1, "stalled": 0}
+
+
+def test_waiting_on_a_captcha_reports_progress(monkeypatch):
+    calls = []
+    monkeypatch.setattr(worker, "note_job_progress", lambda: calls.append(1))
+    future = Future()
+    with pytest.raises(TimeoutError):
+        worker.wait_with_progress(future, 0.35, step=0.1)
+    assert len(calls) >= 2
+    future.set_result("token")
+    assert worker.wait_with_progress(future, 1) == "token"
+
+
+def test_a_solver_timeout_held_by_the_future_is_raised_at_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(worker, "note_job_progress", lambda: calls.append(1))
+    future = Future()
+    future.set_exception(TimeoutError("captcha not solved within 120s"))
+    started = time.monotonic()
+    with pytest.raises(TimeoutError, match="captcha not solved"):
+        worker.wait_with_progress(future, 5, step=0.1)
+    assert time.monotonic() - started < 0.5
+    assert calls == []
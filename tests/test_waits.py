@@ -0,0 +1,21 @@
+import pytest
+
+import worker
+
+
+def test_wait_condition_names_match_the_engine():
+    assert set(worker.WAIT_CONDITION_NAMES) == set(worker._WAIT_CONDITIONS)
+
+
+def test_unknown_conditions_and_bad_timeouts_are_dropped_at_load(caplog):
+    overrides = worker._wait_stage_overrides(
+        '{"page_load": {"network_idle": 8, "netwrok_idle": 3, "dom_quiet": "2"}, "custom": {"ready_state": 4}}'
+    )
+    assert overrides == {"page_load": {"network_idle": 8}, "custom": {"ready_state": 4}}
+    assert "netwrok_idle" in caplog.text
+    assert "page_load/dom_quiet" in caplog.text
+
+
+def test_malformed_json_still_raises_for_the_caller_to_ignore():
+    with pytest.raises(ValueError):
+        worker._wait_stage_overrides("{not json")
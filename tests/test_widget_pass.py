@@ -0,0 +1,52 @@
+import re
+
+import worker
+
+
+class WidgetDriver:
+    def __init__(self, report=None, error=None):
+        self.report, self.error, self.calls = report, error, []
+
+    def execute_script(self, script, *args):
+        self.calls.append((script, args))
+        if self.error:
+            raise self.error
+        return self.report
+
+
+def test_one_script_call_carries_the_select_plan_and_dates():
+    driver = WidgetDriver({"selects": {"topic": "Sales"}})
+    report = worker.run_widget_pass(driver, {"afs-3": "sales"}, first_checkbox=False)
+    assert report == {"selects": {"topic": "Sales"}}
+    ((script, (opts,)),) = driver.calls
+    assert script is worker.WIDGET_PASS_JS
+    assert opts["selects"] == {"afs-3": "sales"}
+    assert opts["first_checkbox"] is False
+    assert len(opts["dates"]) == 4
+    assert all(re.fullmatch(r"\d{4}-\d{2}-\d{2}", d) and d >= "1995-01-01" for d in opts["dates"])
+
+
+def test_a_failed_pass_reports_nothing():
+    assert worker.run_widget_pass(WidgetDriver(error=RuntimeError("detached"))) == {}
+
+
+def test_report_is_merged_into_the_filled_summary():
+    filled = {"name": "Ada", "selects": {"country": "UK"}}
+    worker.merge_widget_report(filled, {
+        "selects": {"topic": "Sales"}, "radios": {"contact_by": "first_selected"},
+        "checkboxes": {}, "dates": {"dob": "2001-02-03"}, "subscribe": True,
+    })
+    assert filled == {
+        "name": "Ada",
+        "selects": {"country": "UK", "topic": "Sales"},
+        "radios": {"contact_by": "first_selected"},
+        "radio_selected": "first",
+        "dates": {"dob": "2001-02-03"},
+        "subscribe": True,
+    }
+
+
+def test_an_empty_report_leaves_the_summary_alone():
+    filled = {"name": "Ada"}
+    worker.merge_widget_report(filled, {})
+    assert filled == {"name": "Ada"}
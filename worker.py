@@ -13,62 +13,179 @@ Environment variables used for DB (optional):
 """
 import re
 from datetime import timezone
-import pytz
-try:
-
-    PYTZ_AVAILABLE = True
-except Exception:
-    PYTZ_AVAILABLE = False
-try:
-    from dateutil import parser as dateutil_parser
-    DATEUTIL_AVAILABLE = True
-except Exception:
-    DATEUTIL_AVAILABLE = False
+import importlib.util
 import logging
 import os
+import queue
 import tempfile
+import threading
 import uuid
 import time
+import weakref
 import random
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, Any, Optional
 import json
-import uuid
 
 WORKER_ID = str(uuid.uuid4())
-LOCK_TIMEOUT_MINUTES = 15
+LOCK_TIMEOUT_MINUTES = 15  # only for rows locked before leases existed
 MAX_RETRIES = 3
-import requests
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+LEASE_SECONDS = int(os.getenv("LEASE_SECONDS", 30))  # a job lock lapses this long after the last heartbeat
+HEARTBEAT_INTERVAL = float(os.getenv("HEARTBEAT_INTERVAL", 5))
+# How long the heartbeat/reaper thread waits for a pooled connection. Well under
+# LEASE_SECONDS, so a busy pool costs a heartbeat or two instead of the leases.
+HEARTBEAT_DB_TIMEOUT = min(float(os.getenv("HEARTBEAT_DB_TIMEOUT", 5)), LEASE_SECONDS / 4)
+REAPER_INTERVAL = float(os.getenv("REAPER_INTERVAL", 10))
+REAPER_BATCH = int(os.getenv("REAPER_BATCH", 100))
 from urllib.parse import urljoin, urlparse
-try:
-    import lxml.html as lh
-    LXML_AVAILABLE = True
-except Exception:
-    LXML_AVAILABLE = False
 
-# Optional selenium usage
-try:
-    from selenium import webdriver
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import Select
-    from selenium.webdriver.chrome.options import Options
-    SELENIUM_AVAILABLE = True
-except Exception:
-    SELENIUM_AVAILABLE = False
 
-# Optional DB (psycopg2)
-try:
-    import psycopg2
-    PSYCOPG2_AVAILABLE = True
-except Exception:
-    PSYCOPG2_AVAILABLE = False
+def _module_available(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+# Heavy and optional dependencies are only located here; each one is imported
+# inside the functions that use it, so importing this module stays cheap.
+PYTZ_AVAILABLE = _module_available("pytz")
+DATEUTIL_AVAILABLE = _module_available("dateutil")
+LXML_AVAILABLE = _module_available("lxml")
+SELENIUM_AVAILABLE = _module_available("selenium")
+PSYCOPG2_AVAILABLE = _module_available("psycopg2")
 
 logger = logging.getLogger("submit_contact_form_old_impl")
-logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 
 API_KEY_2CAPTCHA = os.getenv('API_KEY_2CAPTCHA', None)
+CAPTCHA_SOLVER_URL = os.getenv("CAPTCHA_SOLVER_URL", "http://2captcha.com").rstrip("/")  # 2captcha-compatible API
+CAPTCHA_FIRST_POLL = float(os.getenv("CAPTCHA_FIRST_POLL", 15))  # seconds before the first res.php poll
+CAPTCHA_POLL_INTERVAL = float(os.getenv("CAPTCHA_POLL_INTERVAL", 5))
+CAPTCHA_TIMEOUT = float(os.getenv("CAPTCHA_TIMEOUT", 150))
+
+CHROME_BINARY = os.getenv("CHROME_BINARY", "/usr/bin/google-chrome")
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH", "/usr/local/bin/chromedriver")
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", 1))  # concurrent jobs (and browser sessions) per process
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", WORKER_CONCURRENCY + 4))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # seconds to wait for a free connection
+DB_POOL_CHECK_AFTER = float(os.getenv("DB_POOL_CHECK_AFTER", 30))  # probe connections idle longer than this
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")  # give up rather than queue workers behind DDL
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("JOURNAL_FLUSH_INTERVAL", 1.0))  # 0 writes every status change through
+JOURNAL_BATCH_SIZE = int(os.getenv("JOURNAL_BATCH_SIZE", 100))  # flush early once this many jobs are pending
+JOURNAL_MAX_ATTEMPTS = int(os.getenv("JOURNAL_MAX_ATTEMPTS", 5))
+JOURNAL_IMMEDIATE_STATUSES = {
+    s.strip() for s in os.getenv("JOURNAL_IMMEDIATE_STATUSES", "PROCESSING").split(",") if s.strip()
+}
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", WORKER_CONCURRENCY))
+DRIVER_MAX_JOBS = int(os.getenv("DRIVER_MAX_JOBS", 25))  # recycle a session after this many jobs (0 = never)
+BROWSER_PROFILE = os.getenv("BROWSER_PROFILE", "full")  # one of LAUNCH_PROFILES
+CHROME_RSS_LIMIT_MB = int(os.getenv("CHROME_RSS_LIMIT_MB", 1500))  # recycle a session whose process tree exceeds this
+WATCHDOG_INTERVAL = float(os.getenv("WATCHDOG_INTERVAL", 30))
+
+SCREENSHOT_MODE = os.getenv("SCREENSHOT_MODE", "clip")  # clip (around the form) | full | off
+SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "jpeg")  # jpeg | webp | png
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", 70))  # ignored for png
+SCREENSHOT_MAX_DIMENSION = int(os.getenv("SCREENSHOT_MAX_DIMENSION", 2000))  # longest side, in pixels
+# Where screenshot blobs live: "db" (contact_screenshots table) or a directory path
+# standing in for an object store. Blobs are keyed by SHA-256, so identical captures are stored once.
+SCREENSHOT_STORE = os.getenv("SCREENSHOT_STORE", "db")
+
+_BASE_CHROME_ARGS = [
+    "--headless=new",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+]
+_LEAN_CHROME_ARGS = [
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-client-side-phishing-detection",
+    "--disable-hang-monitor",
+    "--disable-renderer-backgrounding",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--password-store=basic",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,BackForwardCache,"
+    "AutofillServerCommunication,InterestFeedContentSuggestions,CalculateNativeWinOcclusion",
+    "--disk-cache-size=33554432",
+    "--renderer-process-limit=2",
+]
+# Launch profiles: Chrome flags, page load strategy and viewport. "full" is the
+# historical configuration; compare them with `python worker.py bench-profiles`.
+LAUNCH_PROFILES = {
+    "full": {
+        "args": _BASE_CHROME_ARGS,
+        "page_load_strategy": "normal",
+        "window_size": (1920, 9000),
+    },
+    "lean": {
+        "args": _BASE_CHROME_ARGS + _LEAN_CHROME_ARGS,
+        "page_load_strategy": "eager",
+        "window_size": (1366, 2000),
+    },
+    "minimal": {
+        "args": _BASE_CHROME_ARGS + _LEAN_CHROME_ARGS + [
+            "--renderer-process-limit=1",
+            "--process-per-site",
+            "--disable-site-isolation-trials",
+            "--blink-settings=imagesEnabled=false",
+            "--disable-remote-fonts",
+            "--js-flags=--max-old-space-size=256",
+        ],
+        "page_load_strategy": "eager",
+        "window_size": (1280, 1024),
+    },
+}
+
+# Resource blocking: tracker hosts via CDP Network.setBlockedURLs, media/fonts via
+# Fetch interception so allowlisted hosts keep theirs. Extra hosts can be added with
+# comma-separated RESOURCE_BLOCK_HOSTS / RESOURCE_ALLOW_HOSTS.
+RESOURCE_BLOCKING = os.getenv("RESOURCE_BLOCKING", "1") == "1"
+BLOCKED_RESOURCE_TYPES = ["Image", "Font", "Media"]  # failed at Fetch.requestPaused unless allowlisted
+BLOCKED_EXTENSIONS = [
+    "png", "jpg", "jpeg", "gif", "webp", "avif", "bmp", "ico", "svg",
+    "woff", "woff2", "ttf", "otf", "eot",
+    "mp4", "webm", "ogg", "ogv", "mp3", "wav", "m4a", "mov", "avi",
+]
+BLOCKED_HOSTS = [
+    "google-analytics.com", "googletagmanager.com", "googletagservices.com", "doubleclick.net",
+    "googlesyndication.com", "googleadservices.com", "adservice.google.com", "connect.facebook.net",
+    "hotjar.com", "clarity.ms", "segment.io", "cdn.segment.com", "mixpanel.com", "fullstory.com",
+    "amplitude.com", "heapanalytics.com", "mouseflow.com", "crazyegg.com", "luckyorange.com",
+    "amazon-adsystem.com", "adnxs.com", "criteo.com", "criteo.net", "taboola.com", "outbrain.com",
+    "scorecardresearch.com", "quantserve.com", "nr-data.net", "bat.bing.com", "snap.licdn.com",
+    "ads.linkedin.com", "analytics.tiktok.com", "static.ads-twitter.com", "pinimg.com",
+    "youtube.com", "ytimg.com", "player.vimeo.com", "vimeocdn.com",
+] + [h.strip() for h in os.getenv("RESOURCE_BLOCK_HOSTS", "").split(",") if h.strip()]
+# Hosted form providers whose endpoints receive the submission itself (comma-separated FORM_PROVIDER_HOSTS adds more).
+FORM_PROVIDER_HOSTS = [
+    "hsforms.net", "hsforms.com", "jotform.com", "typeform.com", "formstack.com", "wufoo.com",
+    "cognitoforms.com", "formspree.io", "123formbuilder.com", "zohopublic.com", "forms.office.com",
+    "docs.google.com/forms",
+] + [h.strip() for h in os.getenv("FORM_PROVIDER_HOSTS", "").split(",") if h.strip()]
+# Never blocked: captcha providers and hosted form providers the page needs to render and submit.
+ALLOWED_HOSTS = [
+    "google.com/recaptcha", "gstatic.com/recaptcha", "recaptcha.net", "hcaptcha.com",
+    "challenges.cloudflare.com", "hs-scripts.com",
+] + FORM_PROVIDER_HOSTS + [h.strip() for h in os.getenv("RESOURCE_ALLOW_HOSTS", "").split(",") if h.strip()]
+# POSTs on the page's own host that are beacons or analytics, never the form submission.
+BEACON_PATH_RE = re.compile(
+    r"/(cdn-cgi|collect|g/collect|beacon|rum|analytics|telemetry|track|tracking|pixel|stats|metrics)(/|\.|$)",
+    re.I,
+)
+# Average transfer size per CDP resource type, used to estimate the bytes a blocked request saved.
+BLOCKED_BYTES_ESTIMATE = {
+    "Image": 60_000, "Font": 40_000, "Media": 500_000, "Script": 50_000,
+    "Stylesheet": 20_000, "XHR": 5_000, "Fetch": 5_000, "Other": 10_000,
+}
 
 FIELD_KEYWORDS = {
     "name": ["name", "full name", "fullname", "your-name", "contact-name", "first", "last", "first-name", "last-name"],
@@ -80,11 +197,29 @@ FIELD_KEYWORDS = {
 }
 
 SUBMIT_TEXT_KEYWORDS = ["send", "submit", "contact", "enquire", "apply", "message"]
+SUBMIT_TIME_BUDGET = float(os.getenv("SUBMIT_TIME_BUDGET", 12))  # seconds for click + verify + fallbacks
+SUBMIT_VERIFY_TIMEOUT = float(os.getenv("SUBMIT_VERIFY_TIMEOUT", 3))  # per attempt
+SUCCESS_TIMEOUT = float(os.getenv("SUCCESS_TIMEOUT", 8))  # max wait for a post-submit signal
+# Read the form's POST responses from the performance log (also on without RESOURCE_BLOCKING).
+SUCCESS_NETWORK_SIGNALS = os.getenv("SUCCESS_NETWORK_SIGNALS", "1") == "1"
+# Phrases of a confirmation / error message; whole words like "success" or "sent" are on every page.
+SUCCESS_TEXT_PATTERNS = [
+    "thank you", "thanks for", "thank-you", "message has been sent", "message was sent", "successfully sent",
+    "successfully submitted", "submission received", "has been received", "we have received", "we've received",
+    "received your", "get back to you", "be in touch", "will contact you",
+]
+FAILURE_TEXT_PATTERNS = [
+    "is required", "required field", "please fill", "please enter", "invalid", "there was an error",
+    "error occurred", "failed to send", "could not be sent", "please try again", "validation errors",
+]
+# Markers of a 2xx JSON reply that still rejected the submission (CF7, HubSpot, generic APIs).
+POST_REJECTED_MARKERS = ['"validation_failed"', '"mail_failed"', '"spam"', '"success":false', '"status":"error"']
 
 
 # --- Helpers copied from original ---
 
 def text_of_label_for(driver, input_elem):
+    from selenium.webdriver.common.by import By
     try:
         id_attr = input_elem.get_attribute("id")
         if id_attr:
@@ -154,48 +289,490 @@ def find_best_key_for_element(driver, elem):
         return "message"
     return None
 
+# One round trip: every input/textarea/select with its attributes, resolved label,
+# visibility, enabled state, form membership and a stable `data-afs-id` handle.
+SNAPSHOT_FIELDS_JS = """
+var counter = window.__afsHandleCounter || 0;
+var forms = Array.prototype.slice.call(document.forms);
+var textOf = function (nodes) {
+    return Array.prototype.map.call(nodes, function (n) { return (n.innerText || '').trim(); }).join(' ').trim();
+};
+var previousLabel = function (el) {
+    for (var s = el.previousElementSibling; s; s = s.previousElementSibling) {
+        if (s.tagName === 'LABEL') return s;
+    }
+    return null;
+};
+var visible = function (el) {
+    if (el.checkVisibility) {
+        return el.checkVisibility({opacityProperty: true, visibilityProperty: true});
+    }
+    return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+};
+var out = [];
+document.querySelectorAll('input, textarea, select').forEach(function (el) {
+    var handle = el.getAttribute('data-afs-id');
+    if (!handle) {
+        handle = 'afs-' + (++counter);
+        el.setAttribute('data-afs-id', handle);
+    }
+    var forLabel = '', label = '';
+    if (el.id) {
+        var escaped = CSS.escape(el.id);
+        var forLabels = document.querySelectorAll('label[for="' + escaped + '"]');
+        if (forLabels.length) {
+            forLabel = (forLabels[0].innerText || '').trim();
+            label = textOf(forLabels);
+        } else if (el.tagName !== 'SELECT' && previousLabel(el)) {
+            label = textOf([previousLabel(el)]);
+        }
+    }
+    if (!label) {
+        var ancestor = el.closest('label');
+        if (ancestor) label = (ancestor.innerText || '').trim();
+    }
+    out.push({
+        handle: handle,
+        element: el,
+        tag: el.tagName.toLowerCase(),
+        type: (el.type || '').toLowerCase(),
+        name: el.getAttribute('name'),
+        id: el.getAttribute('id'),
+        placeholder: el.getAttribute('placeholder'),
+        aria_label: el.getAttribute('aria-label'),
+        title: el.getAttribute('title'),
+        class: el.getAttribute('class'),
+        label: label,
+        for_label: forLabel,
+        visible: visible(el),
+        enabled: !el.disabled,
+        checked: !!el.checked,
+        form_index: el.form ? forms.indexOf(el.form) : -1
+    });
+});
+window.__afsHandleCounter = counter;
+return out;
+"""
+
+
+def snapshot_form_fields(driver):
+    """Return a snapshot dict for every input, textarea and select on the page."""
+    try:
+        return driver.execute_script(SNAPSHOT_FIELDS_JS) or []
+    except Exception as e:
+        logger.warning(f"Form field snapshot failed: {e}")
+        return []
+
+
+def attr_texts_from_field(field):
+    """Snapshot equivalent of `attr_texts`."""
+    parts = [field.get(a) for a in ("name", "id", "placeholder", "aria_label", "title", "class")]
+    return " ".join(p for p in parts if p).lower()
+
+
+def find_best_key_for_field(field):
+    """Snapshot equivalent of `find_best_key_for_element`; runs without touching the browser."""
+    label_text = field.get("label") or ""
+    combined = (attr_texts_from_field(field) + " " + label_text).lower()
+    if 'quoteforms' in combined:
+        return 'quoteForms'
+    for key, kws in FIELD_KEYWORDS.items():
+        if matches_keywords(label_text, kws):
+            return key
+    for key, kws in FIELD_KEYWORDS.items():
+        if matches_keywords(combined, kws):
+            return key
+    typ = field.get("type") or ""
+    if typ == "email":
+        return "email"
+    if typ in ("tel", "tel-national", "tel-local"):
+        return "phone"
+    if field.get("tag") == "textarea":
+        return "message"
+    return None
+
+
 def extract_form_fields(driver):
     fields = []
+    for field in snapshot_form_fields(driver):
+        fields.append({
+            "tag": field["tag"],
+            "name": field["name"],
+            "id": field["id"],
+            "placeholder": field["placeholder"],
+            "type": field["type"],
+            "label": field["for_label"] or None
+        })
+    return fields
+# Sets every value in one call through the native value setter (so React/Vue
+# trackers notice), fires input/change and one blur, then reports which fields kept it.
+FILL_FIELDS_JS = """
+var items = arguments[0];
+var find = function (handle) { return document.querySelector('[data-afs-id="' + handle + '"]'); };
+items.forEach(function (item) {
+    var el = find(item[0]);
+    if (!el) return;
+    try {
+        var proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+        el.focus();
+        Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, item[1]);
+        el.dispatchEvent(new Event('input', {bubbles: true}));
+        el.dispatchEvent(new Event('change', {bubbles: true}));
+        // blur() only fires when the field really got focus (not in a background
+        // tab); dispatch the event by hand only then, so handlers run once.
+        if (document.activeElement === el) el.blur();
+        else el.dispatchEvent(new FocusEvent('blur'));
+    } catch (e) {}
+});
+var kept = {};
+items.forEach(function (item) {
+    var el = find(item[0]);
+    kept[item[0]] = !!el && el.value === item[1];
+});
+return kept;
+"""
 
-    elements = driver.find_elements(
-        By.XPATH,
-        "//input | //textarea | //select"
-    )
 
-    for el in elements:
-        field = {
-            "tag": el.tag_name,
-            "name": el.get_attribute("name"),
-            "id": el.get_attribute("id"),
-            "placeholder": el.get_attribute("placeholder"),
-            "type": el.get_attribute("type"),
-            "label": None
-        }
+def bulk_fill_fields(driver, values):
+    """Fill `{handle: value}` in a single script call.
 
-        # Try to find label
-        el_id = field["id"]
-        if el_id:
-            labels = driver.find_elements(
-                By.XPATH,
-                f"//label[@for='{el_id}']"
-            )
-            if labels:
-                field["label"] = labels[0].text.strip()
+    Returns `(kept, rejected)` lists of handles; rejected fields need a
+    per-field `send_keys` fallback.
+    """
+    if not values:
+        return [], []
+    items = [[handle, str(value)] for handle, value in values.items()]
+    try:
+        result = driver.execute_script(FILL_FIELDS_JS, items) or {}
+    except Exception as e:
+        logger.warning(f"Bulk fill failed, falling back to send_keys: {e}")
+        result = {}
+    kept = [h for h in values if result.get(h)]
+    rejected = [h for h in values if not result.get(h)]
+    return kept, rejected
 
-        fields.append(field)
 
-    return fields
-def _setup_chrome_options():
+def send_keys_with_retry(driver, elem, value, attempts=10):
+    """Scroll, clear, click and type into `elem`, retrying while it is not interactable."""
+    last_error = None
+    for _ in range(attempts):
+        try:
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", elem)
+            try:
+                elem.clear()
+            except Exception:
+                pass
+            elem.click()
+            elem.send_keys(value)
+            return
+        except Exception as e:
+            last_error = e
+    raise Exception(f"element not interactable after scrolling: {last_error}")
+
+
+# Resolves every non-text control in a single in-page pass: planned selects, the
+# first checkbox, the first radio of each group, consent checkboxes, dropdown-like
+# ULs, DOB/date inputs and accept/agree buttons.
+WIDGET_PASS_JS = """
+var opts = arguments[0];
+var report = {selects: {}, radios: {}, checkboxes: {}, dates: {}, subscribe: false, accept_clicked: 0};
+var visible = function (el) {
+    if (el.checkVisibility) return el.checkVisibility({opacityProperty: true, visibilityProperty: true});
+    return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+};
+var labelOf = function (el) {
+    var text = '';
+    if (el.id) {
+        var labels = document.querySelectorAll('label[for="' + CSS.escape(el.id) + '"]');
+        text = Array.prototype.map.call(labels, function (l) { return l.innerText || ''; }).join(' ');
+    }
+    if (!text && el.closest('label')) text = el.closest('label').innerText || '';
+    return text.trim().toLowerCase();
+};
+var fire = function (el) {
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+};
+var count = function (obj) { return Object.keys(obj).length; };
+
+// 1) selects planned from the field snapshot: preferred text, else first valid option
+Object.keys(opts.selects).forEach(function (handle) {
+    var el = document.querySelector('[data-afs-id="' + handle + '"]');
+    if (!el) return;
+    var preferred = (opts.selects[handle] || '').toLowerCase(), chosen = null;
+    var options = Array.prototype.slice.call(el.options);
+    if (preferred) chosen = options.find(function (o) { return o.text.toLowerCase().indexOf(preferred) !== -1; });
+    if (!chosen) chosen = options.find(function (o) { return o.value && !o.disabled; });
+    if (!chosen) return;
+    el.value = chosen.value;
+    chosen.selected = true;
+    fire(el);
+    report.selects[el.getAttribute('name') || el.id || chosen.text] = chosen.text;
+});
+
+// 2) DOB / date inputs
+var datePattern = /dob|birth/;
+var dateIndex = 0;
+document.querySelectorAll('input').forEach(function (el) {
+    if (!visible(el)) return;
+    var name = (el.getAttribute('name') || '').toLowerCase();
+    var id = (el.id || '').toLowerCase();
+    var placeholder = (el.getAttribute('placeholder') || '').toLowerCase();
+    var isDate = el.type === 'date' || name.indexOf('dob') !== -1 || id.indexOf('dob') !== -1
+        || datePattern.test(placeholder) || name.indexOf('birth') !== -1;
+    var isPattern = (el.getAttribute('pattern') || '').indexOf('[0-9]{4}-[0-9]{2}-[0-9]{2}') !== -1
+        || (placeholder.indexOf('-') !== -1 && placeholder.indexOf('yyyy') !== -1);
+    if (!isDate && !isPattern) return;
+    var value = opts.dates[dateIndex++ % opts.dates.length];
+    try {
+        var setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+        setter.call(el, value);
+        fire(el);
+    } catch (e) { return; }
+    var prefix = isDate ? 'date_' : 'date_pattern_';
+    report.dates[el.getAttribute('name') || el.id || prefix + (count(report.dates) + 1)] = value;
+});
+
+// 3) UL-based dropdowns: open and pick the first option
+document.querySelectorAll('ul').forEach(function (ul) {
+    var items = Array.prototype.filter.call(ul.children, function (c) { return c.tagName === 'LI'; });
+    if (!items.length || !visible(ul)) return;
+    var cls = (ul.getAttribute('class') || '').toLowerCase();
+    var role = (ul.getAttribute('role') || '').toLowerCase();
+    if (!(cls.indexOf('dropdown') !== -1 || cls.indexOf('select') !== -1 || role === 'listbox' || role === 'menu')) return;
+    try { ul.click(); } catch (e) {}
+    var first = items.find(visible) || items[0];
+    try { first.click(); } catch (e) { return; }
+    var key = ul.id || ul.getAttribute('class') || 'ul_select_' + (count(report.selects) + 1);
+    report.selects[key] = (first.innerText || '').trim() || first.getAttribute('data-value') || 'first_option';
+});
+
+// 4) radios: first visible, enabled radio of every group
+var groups = {};
+document.querySelectorAll("input[type='radio']").forEach(function (r) {
+    var name = r.getAttribute('name') || '__noname__';
+    if (groups[name] || !visible(r) || r.disabled) return;
+    groups[name] = true;
+    if (!r.checked) r.click();
+    report.radios[name] = 'first_selected';
+});
+
+// 5) checkboxes: the first visible one, then anything that looks like consent
+var consent = ['accept', 'agree', 'terms', 'consent', 'i agree'];
+document.querySelectorAll("input[type='checkbox']").forEach(function (cb) {
+    if (!visible(cb)) return;
+    if (opts.first_checkbox && !report.subscribe) {
+        if (!cb.checked) cb.click();
+        report.subscribe = true;
+        return;
+    }
+    var label = labelOf(cb);
+    if (!consent.some(function (k) { return label.indexOf(k) !== -1; }) || cb.checked) return;
+    cb.click();
+    report.checkboxes[cb.getAttribute('name') || cb.id || 'accept_' + (count(report.checkboxes) + 1)] = true;
+});
+
+// 6) accept / agree buttons and links
+var acceptWords = ['accept', 'agree', 'i agree', 'accept all', 'accept cookies', 'agree and continue', 'i accept'];
+document.querySelectorAll('button, a').forEach(function (b) {
+    var text = (b.innerText || '').trim().toLowerCase();
+    if (!text || !acceptWords.some(function (k) { return text.indexOf(k) !== -1; }) || !visible(b)) return;
+    try { b.click(); report.accept_clicked++; } catch (e) {}
+});
+return report;
+"""
+
+
+def run_widget_pass(driver, select_plan=None, first_checkbox=True):
+    """Resolve selects, radios, checkboxes, UL dropdowns and date fields in one script call.
+
+    `select_plan` maps snapshot handles of <select> elements to the preferred option
+    text (or None for the first valid option). Returns the structured report.
+    """
+    opts = {
+        "selects": select_plan or {},
+        "dates": [generate_random_date_from_1995() for _ in range(4)],
+        "first_checkbox": first_checkbox,
+    }
+    try:
+        report = driver.execute_script(WIDGET_PASS_JS, opts) or {}
+    except Exception as e:
+        logger.warning(f"Widget pass failed: {e}")
+        return {}
+    logger.info(f"Widget pass: {report}")
+    return report
+
+
+def merge_widget_report(filled, report):
+    """Merge a `run_widget_pass` report into the job's `out["filled"]` dict."""
+    if report.get("subscribe"):
+        filled["subscribe"] = True
+    if report.get("radios"):
+        filled["radio_selected"] = "first"
+    for key in ("selects", "radios", "checkboxes", "dates"):
+        if report.get(key):
+            filled.setdefault(key, {}).update(report[key])
+
+
+def resource_block_patterns(with_extensions=None):
+    """URL patterns for Network.setBlockedURLs.
+
+    setBlockedURLs has no allow rule, so the allowlist works by never emitting a
+    host pattern that would cover an allowlisted host (e.g. a custom "google.com"
+    block would otherwise take reCAPTCHA down with it). Extension patterns would
+    also hit allowlisted hosts (reCAPTCHA's images and fonts on gstatic.com), so
+    they are only emitted when asked for; media normally goes through the Fetch
+    interceptor instead.
+    """
+    patterns = []
+    if with_extensions:
+        for ext in BLOCKED_EXTENSIONS:
+            patterns.extend([f"*.{ext}", f"*.{ext}?*"])
+    for host in BLOCKED_HOSTS:
+        if any(allowed.split("/")[0] == host or allowed.split("/")[0].endswith("." + host) for allowed in ALLOWED_HOSTS):
+            continue
+        patterns.extend([f"*://{host}/*", f"*://*.{host}/*"])
+    return patterns
+
+
+def _host_listed(url, entries):
+    """True if `url` is on one of `entries` ("host" or "host/path-prefix", subdomains included)."""
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    for entry in entries:
+        entry_host, _, prefix = entry.partition("/")
+        if host != entry_host and not host.endswith("." + entry_host):
+            continue
+        if not prefix or parsed.path.lstrip("/").startswith(prefix):
+            return True
+    return False
+
+
+def resource_allowed(url):
+    """True if `url` is on an ALLOWED_HOSTS entry."""
+    return _host_listed(url, ALLOWED_HOSTS)
+
+
+def start_media_interceptor(driver, ready_timeout=5.0):
+    """Fail Image/Font/Media requests at Fetch.requestPaused unless resource_allowed().
+
+    Runs Selenium's CDP websocket (trio) on a daemon thread for the session's
+    lifetime; the thread ends when the browser goes away. Returns False if
+    interception could not be set up, e.g. without trio or a CDP endpoint.
+    """
+    ready = threading.Event()
+    failed = []
+
+    async def intercept():
+        async with driver.bidi_connection() as connection:
+            session, devtools = connection.session, connection.devtools
+            await session.execute(devtools.fetch.enable(patterns=[
+                devtools.fetch.RequestPattern(
+                    url_pattern="*",
+                    resource_type=devtools.network.ResourceType(rtype),
+                    request_stage=devtools.fetch.RequestStage.REQUEST,
+                )
+                for rtype in BLOCKED_RESOURCE_TYPES
+            ]))
+            ready.set()
+            async for event in session.listen(devtools.fetch.RequestPaused, buffer_size=1000):
+                if resource_allowed(event.request.url):
+                    await session.execute(devtools.fetch.continue_request(event.request_id))
+                else:
+                    await session.execute(devtools.fetch.fail_request(
+                        event.request_id, devtools.network.ErrorReason.BLOCKED_BY_CLIENT))
+
+    def run():
+        try:
+            import trio
+            trio.run(intercept)
+        except Exception as e:
+            failed.append(e)
+            logger.debug(f"Media interceptor stopped: {e}")
+        finally:
+            ready.set()
+
+    threading.Thread(target=run, name="media-interceptor", daemon=True).start()
+    ready.wait(ready_timeout)
+    if failed or not ready.is_set():
+        logger.warning(f"Fetch interception unavailable ({failed[0] if failed else 'timed out'}); media is not blocked")
+        return False
+    return True
+
+
+def apply_resource_blocking(driver):
+    if not (RESOURCE_BLOCKING or SUCCESS_NETWORK_SIGNALS):
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        if RESOURCE_BLOCKING:
+            intercepting = start_media_interceptor(driver)
+            # Without interception, extension patterns are only safe when nothing is allowlisted.
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {
+                "urls": resource_block_patterns(with_extensions=not intercepting and not ALLOWED_HOSTS)
+            })
+    except Exception as e:
+        logger.warning(f"Could not enable resource blocking: {e}")
+
+
+def read_network_events(driver):
+    """Drain the performance log and return its Network.* events as (method, params) tuples."""
+    events = []
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return events
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except Exception:
+            continue
+        if message.get("method", "").startswith("Network."):
+            events.append((message["method"], message.get("params", {})))
+    return events
+
+
+def new_network_stats():
+    return {"blocked_requests": 0, "blocked_bytes_estimate": 0, "loaded_requests": 0, "loaded_bytes": 0}
+
+
+def update_network_stats(stats, events):
+    """Count blocked and loaded requests from `read_network_events` output."""
+    types = {}
+    for method, params in events:
+        if method == "Network.requestWillBeSent":
+            types[params.get("requestId")] = params.get("type", "Other")
+        elif method == "Network.loadingFailed" and (
+                params.get("blockedReason") or params.get("errorText") == "net::ERR_BLOCKED_BY_CLIENT"):
+            rtype = params.get("type") or types.get(params.get("requestId"), "Other")
+            stats["blocked_requests"] += 1
+            stats["blocked_bytes_estimate"] += BLOCKED_BYTES_ESTIMATE.get(rtype, BLOCKED_BYTES_ESTIMATE["Other"])
+        elif method == "Network.loadingFinished":
+            stats["loaded_requests"] += 1
+            stats["loaded_bytes"] += int(params.get("encodedDataLength") or 0)
+    return stats
+
+
+def get_launch_profile(name=None):
+    name = name or BROWSER_PROFILE
+    if name not in LAUNCH_PROFILES:
+        logger.warning(f"Unknown BROWSER_PROFILE {name!r}, using 'full'")
+        name = "full"
+    return LAUNCH_PROFILES[name]
+
+
+def _setup_chrome_options(profile=None):
+    from selenium.webdriver.chrome.options import Options
+    launch_profile = get_launch_profile(profile)
     options = Options()
-    # options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument("--headless=new")
-
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    # options.add_argument("--start-maximized")
-    options.add_argument("--window-size=1920,9000")
+    # Later duplicates of a switch win in Chrome, so keep only the last occurrence.
+    args = {}
+    for arg in launch_profile["args"]:
+        args[arg.split("=", 1)[0]] = arg
+    for arg in args.values():
+        options.add_argument(arg)
+    options.add_argument("--window-size=%d,%d" % launch_profile["window_size"])
+    options.page_load_strategy = launch_profile["page_load_strategy"]
     # options.add_argument("--remote-debugging-port=9222")
 
     # unique_id = str(uuid.uuid4())[:9]
@@ -203,44 +780,1271 @@ def _setup_chrome_options():
     # profile_dir = tempfile.mkdtemp(prefix=f'chrome_selenium_{unique_id}_{timestamp}_')
     # options.add_argument(f'--user-data-dir={profile_dir}')
 
-    # try common chrome binary locations
-    # for path in ['/usr/bin/google-chrome', '/usr/bin/google-chrome-stable', '/opt/google/chrome/google-chrome', '/usr/bin/chromium-browser']:
-    #     if os.path.exists(path):
-    #         options.binary_location = path
-    #         break
+    # try common chrome binary locations
+    # for path in ['/usr/bin/google-chrome', '/usr/bin/google-chrome-stable', '/opt/google/chrome/google-chrome', '/usr/bin/chromium-browser']:
+    #     if os.path.exists(path):
+    #         options.binary_location = path
+    #         break
+
+    if RESOURCE_BLOCKING or SUCCESS_NETWORK_SIGNALS:
+        # Network events feed the per-job blocked request/byte counters and the success detector.
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+    return options
+
+
+# Every DriverPool in the process. Each lane has its own pool, and a pool's orphan
+# sweep must not take another pool's live browsers for leftovers.
+_DRIVER_POOLS = weakref.WeakSet()
+_DRIVER_POOLS_LOCK = threading.Lock()
+
+
+def live_driver_pools():
+    with _DRIVER_POOLS_LOCK:
+        return list(_DRIVER_POOLS)
+
+
+class DriverPool:
+    """Keeps up to `size` Chrome sessions warm and leases them out one job at a time.
+
+    Sessions are reset between jobs (extra tabs closed, cookies and storage cleared,
+    about:blank loaded) and recycled after `max_jobs` jobs, when they stop responding,
+    or when the watchdog sees their process tree above CHROME_RSS_LIMIT_MB.
+    """
+
+    def __init__(self, size=DRIVER_POOL_SIZE, max_jobs=DRIVER_MAX_JOBS, profile=None):
+        self.size = max(1, size)
+        self.max_jobs = max_jobs
+        self.profile = profile or BROWSER_PROFILE
+        self._idle = []
+        self._jobs_served = {}
+        self._leased = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._pids = {}
+        self._known_pids = set()
+        self._launching = 0
+        self._recycle_requested = set()
+        self._owners = {}  # leased driver -> job id it is working for
+        self.metrics = {
+            "sessions": 0,
+            "browser_rss_bytes": 0,
+            "max_session_rss_bytes": 0,
+            "memory_recycles": 0,
+            "reaped_processes": 0,
+            "last_check": None,
+        }
+        with _DRIVER_POOLS_LOCK:
+            _DRIVER_POOLS.add(self)
+
+    def _launch(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        chrome_options = _setup_chrome_options(self.profile)
+        chrome_options.binary_location = CHROME_BINARY
+        logger.info("Launching new Chrome session for the driver pool")
+        with self._cond:
+            self._launching += 1
+        try:
+            driver = webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=chrome_options)
+            self._jobs_served[driver] = 0
+            self._session_pids(driver)
+        finally:
+            with self._cond:
+                self._launching -= 1
+        apply_resource_blocking(driver)
+        return driver
+
+    def _session_pids(self, driver):
+        """Current process tree of a session, remembered so it can be reaped later."""
+        try:
+            pids = set(process_tree_pids(driver.service.process.pid))
+        except Exception:
+            pids = set()
+        with self._cond:
+            pids |= self._pids.get(driver, set())
+            self._pids[driver] = pids
+            self._known_pids |= pids
+        return pids
+
+    def _session_rss(self, driver):
+        try:
+            return process_tree_rss(driver.service.process.pid)
+        except Exception:
+            return 0
+
+    def _reap(self, pids, grace=2.0):
+        """SIGKILL any chrome/chromedriver process in `pids` still alive after `grace` seconds."""
+        import signal
+        deadline = time.monotonic() + grace
+        alive = [pid for pid in pids if _is_browser_process(pid)]
+        while alive and time.monotonic() < deadline:
+            time.sleep(0.1)
+            alive = [pid for pid in alive if _is_browser_process(pid)]
+        for pid in alive:
+            try:
+                os.kill(pid, signal.SIGKILL)
+                self.metrics["reaped_processes"] += 1
+                logger.warning(f"Reaped leftover browser process {pid}")
+            except Exception:
+                continue
+        for pid in alive:
+            try:
+                os.waitpid(pid, os.WNOHANG)
+            except Exception:
+                pass
+        with self._cond:
+            self._known_pids -= set(pids)
+
+    def _is_healthy(self, driver):
+        try:
+            process = driver.service.process
+            if process is not None and process.poll() is not None:
+                return False
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _reset(self, driver):
+        """Return the session to a blank state. Returns False if the session looks broken."""
+        try:
+            driver.switch_to.default_content()
+            handles = driver.window_handles
+            for handle in reversed(handles):
+                driver.switch_to.window(handle)
+                try:
+                    origin = driver.execute_script(
+                        "try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}"
+                        "return window.location.origin;"
+                    )
+                    if origin and origin != "null":
+                        driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+                except Exception as e:
+                    logger.debug(f"Could not clear storage for tab: {e}")
+                if handle != handles[0]:
+                    driver.close()
+            driver.switch_to.window(handles[0])
+            driver.delete_all_cookies()
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            driver.get("about:blank")
+            driver.set_window_size(*get_launch_profile(self.profile)["window_size"])
+            if RESOURCE_BLOCKING or SUCCESS_NETWORK_SIGNALS:
+                read_network_events(driver)  # drop events so counters start fresh for the next job
+            return True
+        except Exception as e:
+            logger.warning(f"Driver reset failed, recycling session: {e}")
+            return False
+
+    def _retire(self, driver):
+        pids = self._session_pids(driver)
+        with self._cond:
+            self._jobs_served.pop(driver, None)
+            self._pids.pop(driver, None)
+            self._recycle_requested.discard(driver)
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.debug(f"driver.quit() failed while retiring session: {e}")
+        self._reap(pids)
+
+    def acquire(self, timeout=None):
+        """Lease a session, launching a new one if the pool has spare capacity."""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+                if self._idle:
+                    driver = self._idle.pop()
+                    break
+                if self._leased + len(self._idle) < self.size:
+                    driver = None
+                    break
+                if not self._cond.wait(timeout):
+                    raise TimeoutError("Timed out waiting for a free browser session")
+            self._leased += 1
+
+        try:
+            if driver is not None and not self._is_healthy(driver):
+                logger.info("Pooled session is unhealthy, replacing it")
+                self._retire(driver)
+                driver = None
+            if driver is None:
+                driver = self._launch()
+        except Exception:
+            with self._cond:
+                self._leased -= 1
+                self._cond.notify()
+            raise
+        job_id = getattr(_JOB_CONTEXT, "job_id", None)
+        if job_id is not None:
+            with self._cond:
+                self._owners[driver] = job_id
+        return driver
+
+    def release(self, driver):
+        """Return a leased session to the pool, resetting or recycling it."""
+        with self._cond:
+            self._owners.pop(driver, None)
+        served = self._jobs_served.get(driver, 0) + 1
+        self._jobs_served[driver] = served
+        recycle = self._closed or (self.max_jobs and served >= self.max_jobs) or driver in self._recycle_requested
+        if not recycle and CHROME_RSS_LIMIT_MB and self._session_rss(driver) > CHROME_RSS_LIMIT_MB * 1024 * 1024:
+            logger.info("Browser session is over its memory limit")
+            self.metrics["memory_recycles"] += 1
+            recycle = True
+        if not recycle:
+            recycle = not self._reset(driver)
+        if recycle:
+            logger.info(f"Recycling browser session after {served} job(s)")
+            self._retire(driver)
+
+        with self._cond:
+            self._leased -= 1
+            if not recycle:
+                self._idle.append(driver)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def warm(self):
+        """Start sessions until the pool is full so the first jobs skip the cold start."""
+        launched = []
+        with self._cond:
+            missing = self.size - self._leased - len(self._idle)
+            self._leased += missing
+        try:
+            for _ in range(missing):
+                launched.append(self._launch())
+        except Exception as e:
+            logger.warning(f"Could not warm driver pool: {e}")
+        finally:
+            with self._cond:
+                self._leased -= missing
+                self._idle.extend(launched)
+                self._cond.notify_all()
+
+    def abort_job(self, job_id):
+        """Quit the session leased to `job_id` so the job fails fast; it is recycled on release."""
+        with self._cond:
+            drivers = [d for d, owner in self._owners.items() if owner == job_id]
+            self._recycle_requested.update(drivers)
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                logger.debug(f"driver.quit() failed while aborting {job_id}: {e}")
+        return bool(drivers)
+
+    def close(self, abort_leased=False):
+        """Retire idle sessions; with `abort_leased`, also quit sessions still leased to jobs."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            leased = [d for d in self._jobs_served if d not in idle] if abort_leased else []
+            self._cond.notify_all()
+        for driver in idle + leased:
+            self._retire(driver)
+        self.reap_orphans()
+
+    def check_memory(self):
+        """Measure every session; recycle idle ones over the limit and flag leased ones."""
+        limit = CHROME_RSS_LIMIT_MB * 1024 * 1024
+        with self._cond:
+            sessions = list(self._jobs_served)
+        total = largest = 0
+        for driver in sessions:
+            self._session_pids(driver)
+            rss = self._session_rss(driver)
+            total += rss
+            largest = max(largest, rss)
+            if not limit or rss <= limit:
+                continue
+            with self._cond:
+                idle = driver in self._idle
+                if idle:
+                    self._idle.remove(driver)
+                else:
+                    self._recycle_requested.add(driver)
+            self.metrics["memory_recycles"] += 1
+            logger.warning(f"Browser session using {rss / 1024 / 1024:.0f}MB, recycling {'now' if idle else 'after its job'}")
+            if idle:
+                self._retire(driver)
+        self.metrics.update(sessions=len(sessions), browser_rss_bytes=total, max_session_rss_bytes=largest)
+
+    def _owned_pids(self):
+        """Process trees of this pool's live sessions, and whether one is mid-launch."""
+        with self._cond:
+            drivers = list(self._pids)
+            launching = self._launching
+        owned = set()
+        for driver in drivers:
+            try:
+                owned.update(process_tree_pids(driver.service.process.pid))
+            except Exception:
+                continue
+        return owned, launching
+
+    def reap_orphans(self):
+        """Kill browser processes this worker started that no live session owns any more.
+
+        That covers trees left behind by a failed driver.quit() and chromedrivers
+        still parented to this process after their session object was dropped.
+        Sessions of every pool in the process count as owned, so one lane's sweep
+        leaves the other lanes' browsers alone. Exited children are waited on so
+        they do not linger as zombies.
+        """
+        owned, launching = set(), 0
+        for pool in live_driver_pools():
+            pool_owned, pool_launching = pool._owned_pids()
+            owned |= pool_owned
+            launching += pool_launching
+        with self._cond:
+            candidates = self._known_pids - owned
+        if not launching:
+            # A session being launched is not registered yet; only sweep our own
+            # descendants when no pool has one mid-launch.
+            for pid in process_tree_pids(os.getpid())[1:]:
+                if pid not in owned and _is_browser_process(pid):
+                    candidates.add(pid)
+        if candidates:
+            self._reap(candidates, grace=0)
+        for pid in process_tree_pids(os.getpid())[1:]:
+            if _browser_process_state(pid) == "Z":
+                try:
+                    os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    pass
+
+    def start_watchdog(self, interval=WATCHDOG_INTERVAL):
+        def watch():
+            while not self._closed:
+                time.sleep(interval)
+                try:
+                    self.check_memory()
+                    self.reap_orphans()
+                    self.metrics["last_check"] = datetime.utcnow().isoformat()
+                    logger.info(f"Browser watchdog: {self.metrics}")
+                except Exception as e:
+                    logger.warning(f"Browser watchdog check failed: {e}")
+        threading.Thread(target=watch, name="browser-watchdog", daemon=True).start()
+
+
+def _browser_process_state(pid):
+    """/proc state letter of `pid` if it is a chrome/chromedriver process, else None."""
+    try:
+        with open(f"/proc/{pid}/comm") as f:
+            name = f.read().strip()
+        if not (name.startswith("chrome") or name in ("headless_shell", "google-chrome")):
+            return None
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0]
+    except Exception:
+        return None
+
+
+def _is_browser_process(pid):
+    return _browser_process_state(pid) not in (None, "Z")
+
+
+_DRIVER_POOL = None
+_DRIVER_POOL_LOCK = threading.Lock()
+
+
+def get_driver_pool():
+    global _DRIVER_POOL
+    with _DRIVER_POOL_LOCK:
+        if _DRIVER_POOL is None:
+            _DRIVER_POOL = DriverPool()
+        return _DRIVER_POOL
+
+
+def process_tree_pids(root_pid):
+    """Return `root_pid` and all of its descendants (Linux /proc)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+            ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+        except Exception:
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def process_tree_rss(root_pid):
+    """Resident memory in bytes of `root_pid` and its descendants."""
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    for pid in process_tree_pids(root_pid):
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * page_size
+        except Exception:
+            continue
+    return total
+
+
+# --- Wait engine ---
+# Each stage lists the conditions to wait for, in order, with a timeout in seconds.
+# Override per stage with WAIT_STAGES_JSON, e.g. '{"page_load": {"network_idle": 8}}'.
+WAIT_STAGES = {
+    "page_load": {"ready_state": 15, "network_idle": 5, "dom_quiet": 3},
+    "after_scroll": {"dom_quiet": 1.5},
+    "pre_submit": {"network_idle": 3, "dom_quiet": 1},
+    "post_submit": {"ready_state": 10, "network_idle": 5, "dom_quiet": 2},
+    "scrape": {"ready_state": 10, "network_idle": 3},
+}
+WAIT_CONDITION_NAMES = ("ready_state", "network_idle", "dom_quiet")  # keys of _WAIT_CONDITIONS
+
+
+def _wait_stage_overrides(raw):
+    """Parse WAIT_STAGES_JSON, logging and dropping conditions a job could not run."""
+    overrides = {}
+    for stage, conditions in json.loads(raw).items():
+        for condition, timeout in conditions.items():
+            if condition not in WAIT_CONDITION_NAMES:
+                logger.warning(f"Ignoring unknown wait condition {stage}/{condition} in WAIT_STAGES_JSON")
+                continue
+            if isinstance(timeout, bool) or not isinstance(timeout, (int, float)):
+                logger.warning(f"Ignoring non-numeric timeout for {stage}/{condition} in WAIT_STAGES_JSON")
+                continue
+            overrides.setdefault(stage, {})[condition] = timeout
+    return overrides
+
+
+try:
+    for _stage, _conditions in _wait_stage_overrides(os.getenv("WAIT_STAGES_JSON", "{}")).items():
+        WAIT_STAGES.setdefault(_stage, {}).update(_conditions)
+except Exception as e:
+    logger.warning(f"Ignoring invalid WAIT_STAGES_JSON: {e}")
+WAIT_POLL_INTERVAL = float(os.getenv("WAIT_POLL_INTERVAL", 0.1))
+NETWORK_IDLE_MS = int(os.getenv("NETWORK_IDLE_MS", 500))
+DOM_QUIET_MS = int(os.getenv("DOM_QUIET_MS", 500))
+
+# Installs (once per document) a MutationObserver and fetch/XHR counters and
+# returns the current activity state.
+WAIT_PROBE_JS = """
+if (!window.__afsWait) {
+    var w = window.__afsWait = {lastMutation: Date.now(), lastNetwork: Date.now(), pending: 0, sent: 0};
+    try {
+        new MutationObserver(function () { w.lastMutation = Date.now(); })
+            .observe(document.documentElement, {subtree: true, childList: true, attributes: true, characterData: true});
+    } catch (e) {}
+    var done = function () { w.pending = Math.max(0, w.pending - 1); w.lastNetwork = Date.now(); };
+    if (window.fetch) {
+        var origFetch = window.fetch;
+        window.fetch = function () {
+            w.pending++; w.sent++; w.lastNetwork = Date.now();
+            return origFetch.apply(this, arguments).finally(done);
+        };
+    }
+    var origSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        w.pending++; w.sent++; w.lastNetwork = Date.now();
+        this.addEventListener('loadend', done);
+        return origSend.apply(this, arguments);
+    };
+}
+var resources = performance.getEntriesByType('resource');
+var lastResourceEnd = 0;
+for (var i = 0; i < resources.length; i++) {
+    lastResourceEnd = Math.max(lastResourceEnd, resources[i].responseEnd);
+}
+return {
+    readyState: document.readyState,
+    now: Date.now(),
+    lastMutation: window.__afsWait.lastMutation,
+    lastNetwork: Math.max(window.__afsWait.lastNetwork, performance.timeOrigin + lastResourceEnd),
+    pending: window.__afsWait.pending,
+    resources: resources.length
+};
+"""
+
+
+def _probe_page(driver):
+    try:
+        return driver.execute_script(WAIT_PROBE_JS) or {}
+    except Exception:
+        return {}
+
+
+def _wait_until(check, timeout):
+    """Poll `check()` until it is truthy or `timeout` expires. Returns (met, seconds_waited)."""
+    started = time.monotonic()
+    deadline = started + timeout
+    while True:
+        try:
+            if check():
+                return True, time.monotonic() - started
+        except Exception:
+            pass
+        if time.monotonic() >= deadline:
+            return False, time.monotonic() - started
+        time.sleep(WAIT_POLL_INTERVAL)
+
+
+def wait_for_ready_state(driver, timeout=15, state="complete"):
+    wanted = ("interactive", "complete") if state == "interactive" else ("complete",)
+    return _wait_until(lambda: _probe_page(driver).get("readyState") in wanted, timeout)
+
+
+def wait_for_network_idle(driver, timeout=5, idle_ms=NETWORK_IDLE_MS):
+    """Wait until no fetch/XHR is in flight and no resource finished for `idle_ms`."""
+    def idle():
+        s = _probe_page(driver)
+        return s and s["pending"] == 0 and s["now"] - s["lastNetwork"] >= idle_ms
+    return _wait_until(idle, timeout)
+
+
+def wait_for_dom_quiet(driver, timeout=3, quiet_ms=DOM_QUIET_MS):
+    """Wait until the DOM has not mutated for `quiet_ms`."""
+    def quiet():
+        s = _probe_page(driver)
+        return s and s["now"] - s["lastMutation"] >= quiet_ms
+    return _wait_until(quiet, timeout)
+
+
+def wait_for_interactable(driver, elem, timeout=5):
+    """Wait until `elem` is displayed, enabled and not covered by another element."""
+    def interactable():
+        return driver.execute_script(
+            """
+            var el = arguments[0];
+            if (!el.isConnected || el.disabled) return false;
+            var r = el.getBoundingClientRect();
+            if (r.width === 0 || r.height === 0) return false;
+            var style = getComputedStyle(el);
+            if (style.visibility === 'hidden' || style.display === 'none') return false;
+            if (r.bottom < 0 || r.top > innerHeight) el.scrollIntoView({block: 'center'});
+            r = el.getBoundingClientRect();
+            var top = document.elementFromPoint(r.left + r.width / 2, r.top + r.height / 2);
+            return !top || top === el || el.contains(top) || top.contains(el)
+                || (el.labels && Array.prototype.some.call(el.labels, function (l) { return l.contains(top); }));
+            """,
+            elem
+        )
+    return _wait_until(interactable, timeout)
+
+
+_WAIT_CONDITIONS = {
+    "ready_state": wait_for_ready_state,
+    "network_idle": wait_for_network_idle,
+    "dom_quiet": wait_for_dom_quiet,
+}
+
+
+def wait_for_stage(driver, stage, timings=None):
+    """Run the conditions configured for `stage` and record how long each one took.
+
+    Timed-out conditions are logged and recorded but never raise: a page that
+    keeps polling in the background should still get filled in.
+    """
+    all_met = True
+    note_job_progress()
+    for condition, timeout in WAIT_STAGES.get(stage, {}).items():
+        met, waited = _WAIT_CONDITIONS[condition](driver, timeout)
+        all_met = all_met and met
+        logger.info(f"Wait {stage}/{condition}: {'met' if met else 'timed out'} after {waited:.2f}s")
+        if timings is not None:
+            timings.append({"stage": stage, "condition": condition, "met": met, "seconds": round(waited, 3)})
+    return all_met
+
+
+# --- Screenshots ---
+# Document-coordinate rectangle around the form holding the given field handles
+# (falling back to the first form, then the whole page), padded a little.
+SCREENSHOT_CLIP_JS = """
+var handles = arguments[0] || [], full = arguments[1];
+var doc = document.documentElement, body = document.body || doc;
+var pageW = Math.max(doc.scrollWidth, body.scrollWidth), pageH = Math.max(doc.scrollHeight, body.scrollHeight);
+var target = null;
+if (!full) {
+    for (var i = 0; i < handles.length && !target; i++) {
+        var el = document.querySelector('[data-afs-id="' + handles[i] + '"]');
+        if (el) target = el.closest('form') || el.parentElement;
+    }
+    target = target || document.querySelector('form');
+}
+if (!target) return {x: 0, y: 0, width: pageW, height: pageH};
+var r = target.getBoundingClientRect(), pad = 40;
+if (r.width < 1 || r.height < 1) return {x: 0, y: 0, width: pageW, height: pageH};
+var x = Math.max(0, r.left + scrollX - pad), y = Math.max(0, r.top + scrollY - pad);
+return {x: x, y: y, width: Math.min(pageW - x, r.width + 2 * pad), height: Math.min(pageH - y, r.height + 2 * pad)};
+"""
+
+
+def capture_form_screenshot(driver, handles=None):
+    """Capture the form area with CDP Page.captureScreenshot, without resizing the window.
+
+    Returns the screenshot as base64 text (decoding happens off the hot path in the
+    screenshot writer), or None when screenshots are off or capture fails.
+    """
+    if SCREENSHOT_MODE == "off":
+        return None
+    try:
+        clip = driver.execute_script(SCREENSHOT_CLIP_JS, list(handles or []), SCREENSHOT_MODE == "full")
+        longest = max(clip["width"], clip["height"], 1)
+        clip["scale"] = min(1.0, SCREENSHOT_MAX_DIMENSION / longest)
+        params = {
+            "format": SCREENSHOT_FORMAT,
+            "clip": clip,
+            "captureBeyondViewport": True,
+            "fromSurface": True,
+        }
+        if SCREENSHOT_FORMAT != "png":
+            params["quality"] = SCREENSHOT_QUALITY
+        return driver.execute_cdp_cmd("Page.captureScreenshot", params)["data"]
+    except Exception as e:
+        logger.info(f"Taking screenshot Error- -  - - - - {e}")
+        return None
+
+
+# --- Submitting ---
+# One pass over every clickable element: score each as a submit control and return
+# the ranked candidates. The target form is the one holding most filled fields.
+SUBMIT_CANDIDATES_JS = """
+var handles = arguments[0] || [], keywords = arguments[1] || [];
+var counts = new Map(), lastFilled = null;
+handles.forEach(function (h) {
+    var el = document.querySelector('[data-afs-id="' + h + '"]');
+    if (!el) return;
+    lastFilled = el;
+    var f = el.form || el.closest('form');
+    if (f) counts.set(f, (counts.get(f) || 0) + 1);
+});
+var target = null, best = 0;
+counts.forEach(function (n, f) { if (n > best) { best = n; target = f; } });
+if (!target && lastFilled) target = lastFilled.closest('form, [role=form], section, div');
+var visible = function (el) {
+    var r = el.getBoundingClientRect(), cs = getComputedStyle(el);
+    return r.width > 0 && r.height > 0 && cs.visibility !== 'hidden' && cs.display !== 'none' && cs.opacity !== '0';
+};
+var nodes = document.querySelectorAll('button, input[type=submit], input[type=image], input[type=button], [role=button], a');
+var out = [];
+for (var i = 0; i < nodes.length; i++) {
+    var el = nodes[i], tag = el.tagName.toLowerCase();
+    var type = (el.getAttribute('type') || (tag === 'button' ? 'submit' : '')).toLowerCase();
+    var text = ((el.innerText || el.value || el.getAttribute('aria-label') || el.title || '') + '').trim().toLowerCase();
+    if (type === 'reset' || el.disabled || text.length > 60) continue;
+    var hit = keywords.filter(function (k) { return text.indexOf(k) !== -1; }).length;
+    var form = el.form || el.closest('form');
+    var score = 0;
+    if (type === 'submit' || type === 'image') score += 40;
+    if (hit) score += 20 + 5 * Math.min(hit, 2);
+    var inside = target && (form === target || target.contains(el));
+    // Links only count inside the target, so a "Contact" menu entry never wins.
+    if (tag === 'a' && (!hit || (target && !inside))) continue;
+    if (inside) score += 30;
+    else if (target) score -= 25;
+    if (lastFilled && (lastFilled.compareDocumentPosition(el) & Node.DOCUMENT_POSITION_FOLLOWING)) score += 5;
+    if (!visible(el)) score -= 60;
+    if (score < 20) continue;
+    el.setAttribute('data-afs-submit', i);
+    out.push({id: String(i), score: score, tag: tag, type: type, inside: !!inside, text: text.slice(0, 40)});
+}
+out.sort(function (a, b) { return b.score - a.score; });
+if (target && target.tagName === 'FORM') target.setAttribute('data-afs-submit-form', '1');
+return {candidates: out.slice(0, 5), form: !!(target && target.tagName === 'FORM')};
+"""
+
+# Remember the state to compare against after a submit attempt.
+SUBMIT_ARM_JS = """
+window.__afsSubmit = {
+    submitted: false, url: location.href, sent: window.__afsWait ? window.__afsWait.sent : 0,
+    hadForm: !!document.querySelector('[data-afs-submit-form]')
+};
+if (!window.__afsSubmitHooked) {
+    window.__afsSubmitHooked = true;
+    document.addEventListener('submit', function () { if (window.__afsSubmit) window.__afsSubmit.submitted = true; }, true);
+}
+return true;
+"""
+
+# What changed since SUBMIT_ARM_JS: a submit event, a request, a new URL or document, or the form going away.
+SUBMIT_CHECK_JS = """
+var s = window.__afsSubmit;
+if (!s) return 'navigated';
+if (s.submitted) return 'submit_event';
+if (location.href !== s.url) return 'url_changed';
+if (window.__afsWait && window.__afsWait.sent > s.sent) return 'request_sent';
+var form = document.querySelector('[data-afs-submit-form]');
+if (s.hadForm && (!form || form.getBoundingClientRect().height === 0)) return 'form_gone';
+return null;
+"""
+
+
+def _submit_signal(driver):
+    try:
+        return driver.execute_script(SUBMIT_CHECK_JS)
+    except Exception as e:
+        # The old document went away mid-call.
+        logger.debug(f"Submit check raised, treating as navigation: {e}")
+        return 'navigated'
+
+
+def resolve_and_submit(driver, handles=None, budget=SUBMIT_TIME_BUDGET):
+    """Submit the form holding the filled fields once, within `budget` seconds.
+
+    Candidates are ranked in one in-page pass (submit type, SUBMIT_TEXT_KEYWORDS
+    in the label, same form as the filled fields, after them, visible) and the
+    best one is clicked. A click counts as verified when a submit event fires, a
+    request goes out, the URL or document changes, or the form disappears.
+
+    Only a click that clearly did nothing falls back to form.requestSubmit() on
+    the target form: one that raised, or one on a non-submit control that showed
+    none of those signs. A submit button inside the form is never followed by a
+    second mechanism, since its click already went through the form's own submit
+    path (an unverified click there is usually client-side validation). Without a
+    target form there is no fallback.
+
+    Returns {"method", "signal", "candidate", "elapsed"}: the mechanism that
+    fired, what verified it (None if nothing did) and the clicked candidate;
+    method is None when nothing could be submitted at all.
+    """
+    from selenium.webdriver.common.by import By
+    started = time.monotonic()
+    deadline = started + budget
+    outcome = {"method": None, "signal": None, "candidate": None, "elapsed": 0.0}
+    _probe_page(driver)  # make sure the request counters are installed
+    ranked = driver.execute_script(SUBMIT_CANDIDATES_JS, list(handles or []), SUBMIT_TEXT_KEYWORDS) or {}
+    candidates = ranked.get("candidates") or []
+    logger.info(f"Submit candidates: {candidates}")
+
+    def attempt(method, action):
+        """Run one mechanism; False if it could not fire at all."""
+        if time.monotonic() >= deadline:
+            return False
+        try:
+            driver.execute_script(SUBMIT_ARM_JS)
+            action()
+        except Exception as e:
+            logger.info(f"Submit via {method} failed: {e}")
+            return False
+        # Something was submitted even if nothing below confirms it.
+        outcome["method"] = method
+        signal = []
+        met, _ = _wait_until(
+            lambda: signal.append(_submit_signal(driver)) or signal[-1],
+            min(SUBMIT_VERIFY_TIMEOUT, max(0.0, deadline - time.monotonic()))
+        )
+        if met:
+            outcome["signal"] = signal[-1]
+        return True
+
+    def click_best():
+        elem = driver.find_element(By.CSS_SELECTOR, f'[data-afs-submit="{candidates[0]["id"]}"]')
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", elem)
+        try:
+            elem.click()
+        except Exception as e:
+            # Covered by an overlay: the element is right, only the native click was intercepted.
+            logger.info(f"Native click intercepted ({e}); clicking from script")
+            driver.execute_script("arguments[0].click();", elem)
+
+    if candidates:
+        best = candidates[0]
+        outcome["candidate"] = best
+        if attempt("click", click_best):
+            if outcome["signal"] or (best.get("inside") and best.get("type") in ("submit", "image")):
+                outcome["elapsed"] = round(time.monotonic() - started, 2)
+                return outcome
+            logger.info(f"Click on {best} showed no sign of submitting")
+    if ranked.get("form"):
+        attempt("requestSubmit", lambda: driver.execute_script(
+            "var f = document.querySelector('[data-afs-submit-form]'); f.requestSubmit ? f.requestSubmit() : f.submit();"))
+    outcome["elapsed"] = round(time.monotonic() - started, 2)
+    return outcome
+
+
+# --- Success detection ---
+# Watches the page from just before submit: the first visible, short node whose text
+# reads like a confirmation or a validation error decides. Hidden messages that get
+# revealed by a class/style change are caught through the attribute mutations.
+SUCCESS_ARM_JS = """
+var ok = arguments[0], bad = arguments[1];
+if (window.__afsOutcomeObserver) window.__afsOutcomeObserver.disconnect();
+var st = window.__afsOutcome = {signal: null, text: null, url: location.href};
+var MESSAGES = '[role=alert], [role=status], [aria-live], .wpcf7-response-output, [class*=success], '
+    + '[class*=thank], [class*=confirm], [class*=message], [class*=error], [class*=notice]';
+var match = function (el) {
+    if (!el || el.nodeType !== 1 || !el.getClientRects().length) return;
+    var text = (el.innerText || '').trim().toLowerCase();
+    if (!text || text.length > 400) return;
+    for (var i = 0; i < ok.length; i++) if (text.indexOf(ok[i]) !== -1) { st.signal = 'dom_success'; st.text = text.slice(0, 200); return; }
+    for (var j = 0; j < bad.length; j++) if (text.indexOf(bad[j]) !== -1) { st.signal = 'dom_error'; st.text = text.slice(0, 200); return; }
+};
+var check = function (node) {
+    if (st.signal) return;
+    var el = node.nodeType === 3 ? node.parentElement : node;
+    if (!el || el.nodeType !== 1) return;
+    match(el);
+    if (!st.signal && el.querySelectorAll) {
+        var inner = el.querySelectorAll(MESSAGES);
+        for (var i = 0; i < inner.length && i < 50 && !st.signal; i++) match(inner[i]);
+    }
+};
+var obs = window.__afsOutcomeObserver = new MutationObserver(function (mutations) {
+    for (var i = 0; i < mutations.length && !st.signal; i++) {
+        var m = mutations[i];
+        if (m.type === 'childList') m.addedNodes.forEach(check);
+        else check(m.target);
+    }
+    if (st.signal) obs.disconnect();
+});
+obs.observe(document.documentElement, {
+    subtree: true, childList: true, characterData: true,
+    attributes: true, attributeFilter: ['style', 'class', 'hidden', 'aria-hidden']
+});
+return true;
+"""
+
+SUCCESS_POLL_JS = """
+var st = window.__afsOutcome;
+if (!st) return {navigated: true, url: location.href};
+return {signal: st.signal, text: st.text, url: location.href, changed: location.href !== st.url};
+"""
+
+
+def arm_success_detector(driver, network_stats=None):
+    """Start watching for the submit outcome; call right before submitting."""
+    if SUCCESS_NETWORK_SIGNALS or RESOURCE_BLOCKING:
+        # Older events belong to filling the form, not to the submit.
+        update_network_stats(network_stats if network_stats is not None else new_network_stats(), read_network_events(driver))
+    try:
+        driver.execute_script(SUCCESS_ARM_JS, SUCCESS_TEXT_PATTERNS, FAILURE_TEXT_PATTERNS)
+    except Exception as e:
+        logger.warning(f"Could not arm the success detector: {e}")
+
+
+def _is_form_post(url, page_host):
+    """POSTs to the page's own host (or a subdomain of it) or a hosted form provider.
+
+    Hosts are compared whole, with a leading "www." ignored: cutting to the last
+    two labels would make every site under a suffix like co.uk look like one site.
+    Beacon paths on the page's host and captcha widgets' own calls (reload,
+    userverify) are tracking noise like everything else.
+    """
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    if not host:
+        return False
+    site = page_host[4:] if page_host.startswith("www.") else page_host
+    if site and (host == site or host.endswith("." + site)):
+        return not BEACON_PATH_RE.search(parsed.path)
+    return _host_listed(url, FORM_PROVIDER_HOSTS)
+
+
+def _post_rejected(driver, request_id):
+    """Whether a 2xx XHR/fetch reply body says the submission was refused; None if it cannot be read.
+
+    Only call this after the request's Network.loadingFinished, when the body is there.
+    """
+    try:
+        body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id}).get("body")
+    except Exception as e:
+        logger.debug(f"Could not read the response body of {request_id}: {e}")
+        return None
+    if body is None:
+        return None
+    body = body[:5000].lower().replace(" ", "")
+    return any(marker in body for marker in POST_REJECTED_MARKERS)
+
+
+def detect_submit_outcome(driver, network_stats=None, timeout=SUCCESS_TIMEOUT):
+    """Decide whether the submit worked from the first signal that arrives.
+
+    Signals, checked every WAIT_POLL_INTERVAL until `timeout`:
+      post_response / post_error / post_rejected - the form's POST (CDP Network
+        events from the performance log): 2xx, >= 400 or a failed load, or 2xx
+        with an error body (XHR/fetch bodies are read once loadingFinished says
+        they are complete);
+      dom_success / dom_error - a confirmation or validation message appeared;
+      navigated / url_changed - a new document, or a URL that reads like a
+        thank-you page.
+    Text only counts when it appears or changes after arming, so a slogan or an
+    unrelated "thank you" already on the page cannot pass for a confirmation.
+    With no signal by the deadline the signal is "post_unread" when a 2xx reply
+    body could not be read (outcome unknown, not a success), else "timeout".
+
+    Returns {"success": bool, "signal": str, "detail": str, "elapsed": float}.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    page_host = (urlparse(driver.current_url).hostname or "").lower()
+    network = SUCCESS_NETWORK_SIGNALS or RESOURCE_BLOCKING
+    posts = {}
+    pending = {}  # 2xx XHR/fetch replies waiting for loadingFinished: requestId -> detail
+    unread = None
+
+    def outcome(success, signal, detail=""):
+        result = {"success": success, "signal": signal, "detail": detail[:200],
+                  "elapsed": round(time.monotonic() - started, 2)}
+        logger.info(f"Submit outcome: {result}")
+        return result
+
+    while True:
+        if network:
+            events = read_network_events(driver)
+            if network_stats is not None:
+                update_network_stats(network_stats, events)
+            for method, params in events:
+                if method == "Network.requestWillBeSent":
+                    request = params.get("request") or {}
+                    if request.get("method") == "POST" and _is_form_post(request.get("url", ""), page_host):
+                        posts[params.get("requestId")] = (request.get("url", ""), params.get("type"))
+                elif method == "Network.responseReceived" and params.get("requestId") in posts:
+                    url, rtype = posts[params["requestId"]]
+                    status = int((params.get("response") or {}).get("status") or 0)
+                    if status >= 400:
+                        return outcome(False, "post_error", f"{status} {url}")
+                    if rtype not in ("XHR", "Fetch"):
+                        return outcome(True, "post_response", f"{status} {url}")
+                    pending[params["requestId"]] = f"{status} {url}"
+                elif method == "Network.loadingFinished" and params.get("requestId") in pending:
+                    detail = pending.pop(params["requestId"])
+                    rejected = _post_rejected(driver, params["requestId"])
+                    if rejected is None:
+                        unread = detail
+                    elif rejected:
+                        return outcome(False, "post_rejected", detail)
+                    else:
+                        return outcome(True, "post_response", detail)
+                elif method == "Network.loadingFailed" and params.get("requestId") in posts:
+                    if not params.get("canceled"):
+                        url, _ = posts[params["requestId"]]
+                        return outcome(False, "post_error", f"{params.get('errorText')} {url}")
+        try:
+            state = driver.execute_script(SUCCESS_POLL_JS) or {}
+        except Exception:
+            state = {}
+        if state.get("signal"):
+            return outcome(state["signal"] == "dom_success", state["signal"], state.get("text") or "")
+        if state.get("navigated") and not posts:
+            return outcome(True, "navigated", state.get("url") or "")
+        if state.get("changed") and re.search(r"thank|success|confirm|sent|received", state.get("url") or "", re.I):
+            return outcome(True, "url_changed", state["url"])
+        if time.monotonic() >= deadline:
+            if unread:
+                return outcome(False, "post_unread", unread)
+            return outcome(False, "timeout")
+        time.sleep(WAIT_POLL_INTERVAL)
+
+
+def generate_random_date_from_1995():
+    from datetime import date, timedelta
+    _rand = random.Random()
+    start = date(1995, 1, 1)
+    end = date.today()
+    delta = (end - start).days
+    if delta <= 0:
+        return end.strftime("%Y-%m-%d")
+    r = _rand.randint(0, delta)
+    d = start + timedelta(days=r)
+    return d.strftime("%Y-%m-%d")
+
+
+def build_form_payload_from_row(row: Dict[str, Any], generated_message: str) -> Dict[str, Any]:
+    name = row.get('full_name') or ' '.join(filter(None, [row.get('first_name'), row.get('last_name')]))
+    payload = {}
+    if name:
+        payload['name'] = name
+    if row.get('company_name'):
+        payload['company'] = row.get('company_name')
+    if row.get('email_address'):
+        payload['email'] = row.get('email_address')
+    if row.get('phone_number'):
+        payload['phone'] = row.get('phone_number')
+    payload['message'] = row.get('personalized_message') or generated_message or f"Hello, I'm interested in your services on {row.get('website_url','')}"
+    payload['subject'] = row.get('campaign_name') or 'Business Inquiry'
+    return payload
+
+
+# --- Captcha solving ---
+# The captcha widget on the page as {provider, sitekey}; null when there is none.
+# hCaptcha and Turnstile also use `data-sitekey`, so they are recognised first and
+# reported under their own provider rather than passed off as reCAPTCHA.
+CAPTCHA_DETECT_JS = """
+var other = [
+    ['hcaptcha', '.h-captcha[data-sitekey]', 'iframe[src*="hcaptcha.com"]'],
+    ['turnstile', '.cf-turnstile[data-sitekey]', 'iframe[src*="challenges.cloudflare.com"]']
+];
+for (var j = 0; j < other.length; j++) {
+    var el = document.querySelector(other[j][1]);
+    if (el) return {provider: other[j][0], sitekey: el.getAttribute('data-sitekey')};
+    if (document.querySelector(other[j][2])) return {provider: other[j][0], sitekey: null};
+}
+var frames = document.querySelectorAll('iframe[src*="google.com/recaptcha"], iframe[src*="recaptcha.net/recaptcha"]');
+for (var i = 0; i < frames.length; i++) {
+    var m = /[?&]k=([^&]+)/.exec(frames[i].src);
+    if (m) return {provider: 'recaptcha', sitekey: decodeURIComponent(m[1])};
+}
+var box = document.querySelector('.g-recaptcha[data-sitekey]');
+if (box) return {provider: 'recaptcha', sitekey: box.getAttribute('data-sitekey')};
+return null;
+"""
+
+# Put a solved token into every g-recaptcha-response field and fire the widget callback if one is set.
+CAPTCHA_INJECT_JS = """
+var token = arguments[0];
+var areas = document.querySelectorAll('textarea[name="g-recaptcha-response"], #g-recaptcha-response');
+areas.forEach(function (ta) {
+    ta.value = token;
+    ta.innerHTML = token;
+    ta.dispatchEvent(new Event('change', {bubbles: true}));
+});
+var box = document.querySelector('.g-recaptcha[data-callback]');
+var cb = box && window[box.getAttribute('data-callback')];
+if (typeof cb === 'function') { try { cb(token); } catch (e) {} }
+return areas.length;
+"""
+
+
+def detect_captcha(driver):
+    """Return {"provider", "sitekey"} for a captcha on the current page, or None."""
+    try:
+        return driver.execute_script(CAPTCHA_DETECT_JS)
+    except Exception as e:
+        logger.debug(f"Captcha detection failed: {e}")
+        return None
+
+
+def captcha_solvable(captcha):
+    """True for a detected captcha the solver can take (reCAPTCHA with a sitekey)."""
+    if not captcha:
+        return False
+    if captcha.get("provider") != "recaptcha":
+        logger.info(f"Unsupported captcha provider {captcha.get('provider')}; not solving it")
+        return False
+    return bool(captcha.get("sitekey"))
+
+
+def inject_captcha_token(driver, token):
+    return driver.execute_script(CAPTCHA_INJECT_JS, token)
+
+
+class CaptchaSolver:
+    """Solves reCAPTCHAs through a 2captcha-compatible API without blocking the job.
+
+    `solve()` returns a Future straight away. One background thread submits the
+    task and polls res.php for every outstanding task over a shared, pooled HTTP
+    session, so a job can keep filling fields and only waits on the Future right
+    before it submits.
+    """
+
+    def __init__(self, base_url=CAPTCHA_SOLVER_URL, api_key=API_KEY_2CAPTCHA):
+        self.base_url = base_url
+        self.api_key = api_key
+        self._tasks = []
+        self._cond = threading.Condition()
+        self._session = None
+        self._thread = None
+        self.metrics = {"submitted": 0, "solved": 0, "failed": 0, "timed_out": 0, "cancelled": 0, "polls": 0}
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
+    def solve(self, site_key, page_url, timeout=CAPTCHA_TIMEOUT):
+        from concurrent.futures import Future
+        future = Future()
+        task = {
+            "site_key": site_key, "page_url": page_url, "future": future, "id": None, "timeout": timeout,
+            "started": time.monotonic(), "deadline": time.monotonic() + timeout, "next_at": 0.0,
+        }
+        with self._cond:
+            self._tasks.append(task)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="captcha-solver", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def cancel(self, future):
+        """Stop polling for a task nobody needs any more (e.g. the form wasn't found)."""
+        with self._cond:
+            for task in self._tasks:
+                if task["future"] is future:
+                    self._tasks.remove(task)
+                    self.metrics["cancelled"] += 1
+                    future.cancel()
+                    return True
+        return False
+
+    def _submit(self, task):
+        resp = self.session.post(
+            f"{self.base_url}/in.php",
+            data={
+                "key": self.api_key,
+                "method": "userrecaptcha",
+                "googlekey": task["site_key"],
+                "pageurl": task["page_url"],
+                "json": 1
+            },
+            timeout=15
+        ).json()
+        if resp.get("status") != 1:
+            raise RuntimeError(f"captcha submit rejected: {resp.get('request')}")
+        self.metrics["submitted"] += 1
+        return resp["request"]
+
+    def _poll(self, task):
+        self.metrics["polls"] += 1
+        resp = self.session.get(
+            f"{self.base_url}/res.php",
+            params={"key": self.api_key, "action": "get", "id": task["id"], "json": 1},
+            timeout=15
+        ).json()
+        if resp.get("status") == 1:
+            return resp["request"]
+        if resp.get("request") != "CAPCHA_NOT_READY":
+            raise RuntimeError(f"captcha solve failed: {resp.get('request')}")
+        return None
+
+    def _step(self, task, now):
+        """Advance one task; return (token, error) once it is finished, else None."""
+        if now >= task["deadline"]:
+            self.metrics["timed_out"] += 1
+            return None, TimeoutError(f"captcha not solved within {task['timeout']:.0f}s")
+        try:
+            if task["id"] is None:
+                task["id"] = self._submit(task)
+                task["next_at"] = now + CAPTCHA_FIRST_POLL
+                return None
+            token = self._poll(task)
+        except Exception as e:
+            self.metrics["failed"] += 1
+            return None, e
+        if token:
+            self.metrics["solved"] += 1
+            logger.info(f"Captcha {task['id']} solved in {time.monotonic() - task['started']:.1f}s")
+            return token, None
+        task["next_at"] = now + CAPTCHA_POLL_INTERVAL
+        return None
 
-    options.add_argument('--disable-gpu')
-    options.add_argument('--disable-extensions')
-    return options
+    def _run(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                due = [t for t in self._tasks if t["next_at"] <= now]
+                if not due:
+                    wake = min((t["next_at"] for t in self._tasks), default=now + 60) - now
+                    self._cond.wait(max(0.05, wake))
+                    continue
+            for task in due:
+                outcome = self._step(task, time.monotonic())
+                if outcome is None:
+                    continue
+                token, error = outcome
+                with self._cond:
+                    if task not in self._tasks:
+                        continue  # cancelled while we were talking to the API
+                    self._tasks.remove(task)
+                    if error is not None:
+                        task["future"].set_exception(error)
+                    else:
+                        task["future"].set_result(token)
 
+_CAPTCHA_SOLVER = None
+_CAPTCHA_SOLVER_LOCK = threading.Lock()
 
-def generate_random_date_from_1995():
-    from datetime import date, timedelta
-    _rand = random.Random()
-    start = date(1995, 1, 1)
-    end = date.today()
-    delta = (end - start).days
-    if delta <= 0:
-        return end.strftime("%Y-%m-%d")
-    r = _rand.randint(0, delta)
-    d = start + timedelta(days=r)
-    return d.strftime("%Y-%m-%d")
 
+def wait_with_progress(future, timeout, step=5.0):
+    """`future.result(timeout)` that keeps reporting job progress, so a long solve is not taken for a stall.
 
-def build_form_payload_from_row(row: Dict[str, Any], generated_message: str) -> Dict[str, Any]:
-    name = row.get('full_name') or ' '.join(filter(None, [row.get('first_name'), row.get('last_name')]))
-    payload = {}
-    if name:
-        payload['name'] = name
-    if row.get('company_name'):
-        payload['company'] = row.get('company_name')
-    if row.get('email_address'):
-        payload['email'] = row.get('email_address')
-    if row.get('phone_number'):
-        payload['phone'] = row.get('phone_number')
-    payload['message'] = row.get('personalized_message') or generated_message or f"Hello, I'm interested in your services on {row.get('website_url','')}"
-    payload['subject'] = row.get('campaign_name') or 'Business Inquiry'
-    return payload
+    Only a wait that is still pending reports progress; a finished future returns
+    or re-raises what it holds straight away, even if that is a TimeoutError.
+    """
+    from concurrent.futures import wait
+    deadline = time.monotonic() + timeout
+    while not future.done():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"no result within {timeout:.0f}s")
+        wait([future], timeout=min(step, remaining))
+        if not future.done():
+            note_job_progress()
+    return future.result()
+
+
+def get_captcha_solver():
+    global _CAPTCHA_SOLVER
+    with _CAPTCHA_SOLVER_LOCK:
+        if _CAPTCHA_SOLVER is None:
+            _CAPTCHA_SOLVER = CaptchaSolver()
+        return _CAPTCHA_SOLVER
+
+
+def start_mock_captcha_solver(port=0, delay=3.0):
+    """Serve a local 2captcha-compatible API that solves every task after `delay` seconds.
+
+    Returns (server, base_url); point CAPTCHA_SOLVER_URL at base_url. The token is
+    "mock-token-<task id>".
+    """
+    import http.server
+    from urllib.parse import parse_qs
+    submitted = {}
+    lock = threading.Lock()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def _reply(self, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/in.php":
+                return self._reply({"status": 0, "request": "ERROR_WRONG_PATH"})
+            length = int(self.headers.get("Content-Length") or 0)
+            form = parse_qs(self.rfile.read(length).decode())
+            if not form.get("googlekey"):
+                return self._reply({"status": 0, "request": "ERROR_GOOGLEKEY"})
+            task_id = uuid.uuid4().hex[:12]
+            with lock:
+                submitted[task_id] = time.monotonic()
+            self._reply({"status": 1, "request": task_id})
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            task_id = parse_qs(parsed.query).get("id", [""])[0]
+            with lock:
+                started = submitted.get(task_id)
+            if parsed.path != "/res.php" or started is None:
+                return self._reply({"status": 0, "request": "ERROR_WRONG_CAPTCHA_ID"})
+            if time.monotonic() - started < delay:
+                return self._reply({"status": 0, "request": "CAPCHA_NOT_READY"})
+            self._reply({"status": 1, "request": f"mock-token-{task_id}"})
+
+        def log_message(self, fmt, *args):
+            logger.debug("mock captcha solver: " + fmt % args)
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, name="mock-captcha-solver", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
 
 
 # --- DB helper (standalone, optional) ---
@@ -250,6 +2054,7 @@ def _get_db_conn():
     if not PSYCOPG2_AVAILABLE:
         logger.warning(f"PSYCOPG2_not AVAILABLE: ")
         return None
+    import psycopg2
     database_url = os.getenv('DATABASE_URL')
     try:
         if database_url:
@@ -269,33 +2074,318 @@ def _get_db_conn():
         return None
 
 
-def update_contact_status(contact_id: str, status: str,final_status:str, submission_time: datetime):
-    """Update contact_urls.form_status and submission_time if DB available."""
-    conn = _get_db_conn()
-    if not conn:
-        logger.debug("No DB connection available; skipping update")
-        return False
+class DbPool:
+    """Thread-safe pool of psycopg2 connections shared by every DB helper.
+
+    Checkout blocks while `maxconn` connections are in use, and a connection that
+    sat idle for DB_POOL_CHECK_AFTER seconds is probed with `SELECT 1` first.
+    Connections come back rolled back, so a failed helper never leaks an open
+    transaction to the next caller.
+    """
+
+    def __init__(self, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX):
+        self.minconn = minconn
+        self.maxconn = max(1, maxconn)
+        self._idle = []
+        self._open = 0
+        self._cond = threading.Condition()
+
+    def _healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < DB_POOL_CHECK_AFTER:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def getconn(self, timeout=DB_POOL_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._open >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        raise TimeoutError("Timed out waiting for a DB connection")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                else:
+                    conn, last_used = None, None
+                    self._open += 1
+            if conn is None:
+                conn = _get_db_conn()
+                if conn is None:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                return conn
+            if self._healthy(conn, last_used):
+                return conn
+            logger.info("Dropping broken pooled DB connection")
+            self._discard(conn)
+
+    def putconn(self, conn, discard=False):
+        import psycopg2.extensions
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        if discard or conn.closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def warm(self):
+        conns = [c for c in (self.getconn() for _ in range(self.minconn)) if c is not None]
+        for conn in conns:
+            self.putconn(conn)
+
+    def closeall(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+_DB_POOL = None
+_DB_POOL_LOCK = threading.Lock()
+
+
+def get_db_pool():
+    global _DB_POOL
+    if not PSYCOPG2_AVAILABLE:
+        return None
+    with _DB_POOL_LOCK:
+        if _DB_POOL is None:
+            _DB_POOL = DbPool()
+        return _DB_POOL
+
+
+@contextmanager
+def db_connection(timeout=None):
+    """Check a connection out of the pool; yields None when no DB is available.
+
+    `timeout` overrides DB_POOL_TIMEOUT for the wait on a free connection.
+
+    On an exception the transaction is rolled back (connection-level errors drop
+    the connection) before the exception propagates.
+    """
+    pool = get_db_pool()
+    conn = (pool.getconn() if timeout is None else pool.getconn(timeout)) if pool else None
+    if conn is None:
+        if pool is None:
+            logger.warning("PSYCOPG2_not AVAILABLE: ")
+        yield None
+        return
+    import psycopg2
+    discard = False
     try:
-        cur = conn.cursor()
-        cur.execute(
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        discard = True
+        raise
+    finally:
+        pool.putconn(conn, discard=discard)
+
+
+# Schema changes the worker depends on. They are applied once per deploy with
+# `python worker.py migrate`, never from the job path: DDL on contact_urls takes
+# locks that would stall every worker in the fleet. "check" must select one boolean.
+SCHEMA_MIGRATIONS = {
+    "screenshots": {
+        "statements": [
             """
-            UPDATE contact_urls
-            SET form_status = %s,status = %s, submission_time = %s, updated_at = NOW()
-            WHERE id = %s
+            CREATE TABLE IF NOT EXISTS contact_screenshots (
+                sha256 TEXT PRIMARY KEY,
+                content_type TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                data BYTEA NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
             """,
-            (status,final_status, submission_time, contact_id)
-        )
-        conn.commit()
-        cur.close()
+            "ALTER TABLE contact_urls ADD COLUMN IF NOT EXISTS screenshot_ref TEXT",
+        ],
+        "indexes": {},
+        "check": """
+            SELECT to_regclass('contact_screenshots') IS NOT NULL AND EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'contact_urls' AND column_name = 'screenshot_ref')
+        """,
+    },
+    "leases": {
+        "statements": [
+            "ALTER TABLE contact_urls ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ",
+            """
+            CREATE TABLE IF NOT EXISTS workers (
+                worker_id TEXT PRIMARY KEY,
+                hostname TEXT,
+                instance_ip TEXT,
+                pid INTEGER,
+                status TEXT NOT NULL DEFAULT 'alive',
+                active_jobs INTEGER NOT NULL DEFAULT 0,
+                started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                last_heartbeat_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                lease_expires_at TIMESTAMPTZ
+            )
+            """,
+        ],
+        "indexes": {
+            "contact_urls_processing_lease_idx": """
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS contact_urls_processing_lease_idx
+                    ON contact_urls (lease_expires_at) WHERE form_status = 'PROCESSING'
+            """,
+        },
+        "check": """
+            SELECT to_regclass('workers') IS NOT NULL AND EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'contact_urls' AND column_name = 'lease_expires_at')
+        """,
+    },
+}
+_MIGRATIONS_VERIFIED = set()
+
+
+def run_migrations(names=None):
+    """Apply SCHEMA_MIGRATIONS (all, or just `names`); safe to re-run.
+
+    Uses its own autocommit connection so indexes can be built with CREATE INDEX
+    CONCURRENTLY, and a short lock_timeout so a busy contact_urls makes this fail
+    (re-run it) instead of holding up the workers queued behind its lock. An
+    index left INVALID by an interrupted concurrent build is dropped and rebuilt.
+    """
+    conn = _get_db_conn()
+    if conn is None:
+        raise RuntimeError("No DB connection; cannot migrate")
+    conn.autocommit = True
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT set_config('lock_timeout', %s, false)", (MIGRATION_LOCK_TIMEOUT,))
+        for name, migration in SCHEMA_MIGRATIONS.items():
+            if names and name not in names:
+                continue
+            for statement in migration["statements"]:
+                cur.execute(statement)
+            for index_name, create_sql in migration["indexes"].items():
+                cur.execute("""
+                    SELECT i.indisvalid FROM pg_index i
+                    WHERE i.indexrelid = to_regclass(%s)
+                """, (index_name,))
+                row = cur.fetchone()
+                if row and not row[0]:
+                    logger.warning(f"Rebuilding invalid index {index_name}")
+                    cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+                cur.execute(create_sql)
+            logger.info(f"Migration {name} applied")
+    finally:
         conn.close()
-        return True
-    except Exception as e:
-        logger.error(f"DB update failed for {contact_id}: {e}")
+
+
+def require_migration(conn, name):
+    """Raise unless migration `name` is in place; checked once per process."""
+    if name in _MIGRATIONS_VERIFIED:
+        return
+    cur = conn.cursor()
+    cur.execute(SCHEMA_MIGRATIONS[name]["check"])
+    if not cur.fetchone()[0]:
+        raise RuntimeError(f"Schema migration {name!r} is not applied; run `python worker.py migrate`")
+    _MIGRATIONS_VERIFIED.add(name)
+
+
+def check_migrations():
+    """Fail fast at startup if any migration is missing."""
+    with db_connection() as conn:
+        if not conn:
+            return
+        for name in SCHEMA_MIGRATIONS:
+            require_migration(conn, name)
+
+
+# Columns that are never read along with a job row; fetch them explicitly when needed.
+LAZY_CONTACT_COLUMNS = {"screenshot_img"}
+_CONTACT_COLUMNS_SQL = None
+_CONTACT_COLUMN_TYPES = None
+
+
+def contact_column_types():
+    """Map of contact_urls column name -> Postgres type name, read once from information_schema."""
+    global _CONTACT_COLUMN_TYPES
+    if _CONTACT_COLUMN_TYPES is not None:
+        return _CONTACT_COLUMN_TYPES
+    with db_connection() as conn:
+        if not conn:
+            return {}
         try:
-            conn.close()
-        except Exception:
-            pass
-        return False
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT column_name, udt_name FROM information_schema.columns "
+                "WHERE table_name = 'contact_urls' AND table_schema = current_schema() ORDER BY ordinal_position"
+            )
+            types = dict(cur.fetchall())
+            if types:
+                _CONTACT_COLUMN_TYPES = types
+            return types
+        except Exception as e:
+            logger.warning(f"Could not read contact_urls columns: {e}")
+            return {}
+
+
+def contact_columns_sql(alias=None):
+    """Column list for reading contact_urls rows without the lazy blob columns.
+
+    Looked up once from information_schema; falls back to `*` if that fails.
+    `alias` qualifies every column (for statements that join contact_urls).
+    """
+    global _CONTACT_COLUMNS_SQL
+    if _CONTACT_COLUMNS_SQL is None:
+        columns = [c for c in contact_column_types() if c not in LAZY_CONTACT_COLUMNS]
+        if columns:
+            _CONTACT_COLUMNS_SQL = ", ".join('"%s"' % c.replace('"', '""') for c in columns)
+    columns_sql = _CONTACT_COLUMNS_SQL or "*"
+    if alias:
+        return ", ".join(f"{alias}.{c.strip()}" for c in columns_sql.split(","))
+    return columns_sql
+
+
+def update_contact_status(contact_id: str, status: str,final_status:str, submission_time: datetime):
+    """Update contact_urls.form_status and submission_time if DB available."""
+    with db_connection() as conn:
+        if not conn:
+            logger.debug("No DB connection available; skipping update")
+            return False
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                UPDATE contact_urls
+                SET form_status = %s,status = %s, submission_time = %s, updated_at = NOW()
+                WHERE id = %s
+                """,
+                (status,final_status, submission_time, contact_id)
+            )
+            conn.commit()
+            cur.close()
+            return True
+        except Exception as e:
+            logger.error(f"DB update failed for {contact_id}: {e}")
+            return False
 
 def normalize(text):
     if not text:
@@ -378,6 +2468,7 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
 
     form_data: expects keys like `form_url`, optional `field_mapping`, and optional `id`/`contact_id` to update DB.
     """
+    from selenium.webdriver.common.by import By
     form_data1 = {
         'field_mapping': {
             'name': '//input[contains(translate(@name,"ABCDEFGHIJKLMNOPQRSTUVWXYZ","abcdefghijklmnopqrstuvwxyz"),"name")] | //input[contains(translate(@id,"ABCDEFGHIJKLMNOPQRSTUVWXYZ","abcdefghijklmnopqrstuvwxyz"),"name")] | //input[contains(translate(@placeholder,"ABCDEFGHIJKLMNOPQRSTUVWXYZ","abcdefghijklmnopqrstuvwxyz"),"name")]',
@@ -414,27 +2505,17 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
 
     # Try Selenium-based submission first if available
     if SELENIUM_AVAILABLE:
-        chrome_options = _setup_chrome_options()
-        chrome_options.binary_location = "/usr/bin/google-chrome"
+        pool = job_driver_pool()
         driver = None
-        out = {"filled": {}, "submitted": False, "notes": []}
+        out = {"filled": {}, "submitted": False, "notes": [], "waits": []}
+        captcha_task = None
         try:
-            # driver = webdriver.Chrome(options=chrome_options)
-            from selenium.webdriver.chrome.service import Service
-            from webdriver_manager.chrome import ChromeDriverManager
             logger.info(f"Going TO opend Driver : {form_data['form_url']}")
-            # service = Service(
-            #     ChromeDriverManager().install(),
-            #     log_path="/tmp/chromedriver.log"
-            # )
-            service = Service("/usr/local/bin/chromedriver")
-            driver = webdriver.Chrome(
-                service=service,
-                options=chrome_options
-            )
+            driver = pool.acquire()
+            network_stats = new_network_stats()
             # driver.maximize_window()
             driver.get(form_data['form_url'])
-            time.sleep(5)
+            wait_for_stage(driver, "page_load", out["waits"])
 
             try:
                 driver.execute_script("""
@@ -589,16 +2670,14 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
             #     'form_url': form_data.get('form_url')
             # }
 
-            print(data, "filling this - - - -")
-            logger.info(f"filling this - - - - : {data}")
+            logger.debug(f"filling this - - - - : {data}")
             name_=False
             if field_mapping.get('name'):
 
                 try:
                     name_field = driver.find_element(By.XPATH, field_mapping['name'])
-                    time.sleep(0.5)
+                    wait_for_interactable(driver, name_field)
                     name_field.clear()
-                    time.sleep(0.5)
                     name_field.send_keys(cfg['sender_name'])
                     logger.info(f"Filled name field: {cfg['sender_name']}")
                     name_ = True
@@ -619,7 +2698,7 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
                 try:
                     driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
                     driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    elements = driver.find_elements(By.XPATH, "//input|//textarea|//select")
+                    elements = snapshot_form_fields(driver)
                     n_counter+=1
 
                     if elements:
@@ -631,7 +2710,7 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
 
                 # scroll down
                 driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1)
+                wait_for_stage(driver, "after_scroll", out["waits"])
 
                 new_height = driver.execute_script("return document.body.scrollHeight")
                 if new_height == last_height:
@@ -639,7 +2718,6 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
 
                 last_height = new_height
 
-            check_box_clicked=False
             try:
                 main_field = driver.find_element(By.XPATH, field_mapping['name'])
             except:
@@ -652,9 +2730,9 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
 
 
             submit_buttons = []
-            count_scroll = 0
+            fill_plan = {}
+            select_plan = {}
 
-            first_radio_selected = False
             captcha_solved = 'Not Detected captcha'
             Validate_Form = has_valid_form_element(form_fields)
             BLOCKING_KEYWORDS = [
@@ -691,6 +2769,7 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
                     'success': False,
                     'submission_time': datetime.now(),
                     'error': 'Form Not found',
+                    'blocked': True,
                     'response_page': driver.page_source[:1000],  # First 1000 chars
                     'form_url': form_data['form_url']
                 }
@@ -749,17 +2828,28 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
 
                 return result
 
-            for elem in elements:
-
+            captcha = detect_captcha(driver)
+            solvable = captcha_solvable(captcha)
+            if solvable and captcha_lane_handoff(job):
+                logger.info(f"Captcha detected on {form_data['form_url']}; handing {job['id']} to the captcha lane")
+                return {
+                    'success': False,
+                    'handoff': 'captcha',
+                    'submission_time': datetime.now(),
+                    'form_url': form_data['form_url']
+                }
+            if solvable:
+                # Start solving now; the solver works while the fields get filled.
+                captcha_task = get_captcha_solver().solve(captcha["sitekey"], driver.current_url)
+                logger.info(f"Captcha detected (sitekey {captcha['sitekey']}); solving in the background")
 
-                try:
-                    if not elem.is_displayed():
-                        continue
-                except Exception as e:
+            for field in elements:
+                if not field["visible"]:
                     continue
 
-                tag = elem.tag_name.lower()
-                typ = (elem.get_attribute("type") or "").lower()
+                elem = field["element"]
+                tag = field["tag"]
+                typ = field["type"]
                 if not name_:
                     pass
                     # Scroll up a little
@@ -768,11 +2858,11 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
 
                 # skip hidden / non-interactive
                 if typ in ("hidden", "submit", "button", "image"):
-                    if typ == "submit" and elem.is_displayed():
+                    if typ == "submit":
                         submit_buttons.append(elem)
                     continue
 
-                key = find_best_key_for_element(driver, elem)
+                key = find_best_key_for_field(field)
                 try:
                     if 'quoteForms' in key:
                         continue
@@ -790,68 +2880,25 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
                             out["notes"].append(f"file upload failed: {e}")
                     continue
 
-                label = text_of_label_for(driver, elem).lower()
-                if not label:
-                    label = ''
-                # --- checkboxes ---
-                if typ == "checkbox":
-                    label = text_of_label_for(driver, elem).lower()
-                    if elem and not check_box_clicked:
-                        try:
-                            if not elem.is_selected():
-                                elem.click()
-                            out["filled"]["subscribe"] = True
-                            logger.info("check box clicked - - -")
-                            check_box_clicked = True
-                        except Exception as e:
-                            out["notes"].append(f"checkbox click failed: {e}")
-                    continue
-
-                # --- radio buttons: select first radio ---
-                if typ == "radio" and not first_radio_selected:
-                    try:
-                        elem.click()
-                        first_radio_selected = True
-                        out["filled"]["radio_selected"] = "first"
-                    except Exception as e:
-                        out["notes"].append(f"first radio click failed: {e}")
+                label = (field["label"] or '').lower()
+                # --- checkboxes, radios and selects are resolved by the widget pass ---
+                if typ in ("checkbox", "radio"):
                     continue
-
-                # --- select dropdown ---
                 if tag == "select":
-                    try:
-                        sel = Select(elem)
-                        options = sel.options
-                        chosen = None
-                        if key in data:
-                            for o in options:
-                                if data[key].lower() in o.text.lower():
-                                    chosen = o
-                                    break
-                        if not chosen:
-                            for o in options:
-                                if o.get_attribute("value") and not o.get_attribute("disabled"):
-                                    chosen = o
-                                    break
-                        if chosen:
-                            sel.select_by_visible_text(chosen.text)
-                            out["filled"].setdefault("selects", {})[
-                                elem.get_attribute("name") or elem.get_attribute("id") or chosen.text] = chosen.text
-                    except Exception as e:
-                        out["notes"].append(f"select error: {e}")
+                    select_plan[field["handle"]] = data[key] if key in data else None
                     continue
 
                 # --- text inputs and textareas ---
                 guess = key
+                placeholder = (field["placeholder"] or "").lower()
                 if not guess:
-                    attrs = attr_texts(elem)
+                    attrs = attr_texts_from_field(field)
                     for k in data.keys():
                         if k in FIELD_KEYWORDS and matches_keywords(attrs, FIELD_KEYWORDS[k]):
                             guess = k
                             break
 
                 if not guess:
-                    placeholder = (elem.get_attribute("placeholder") or "").lower()
                     if len(placeholder) < 30 and "message" in placeholder:
                         guess = "message"
 
@@ -871,7 +2918,6 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
 
                     try:
                         if name_ and guess=='name':
-                            placeholder = (elem.get_attribute("placeholder") or "").lower()
                             if 'last' in placeholder.lower() or any(word.lower() in placeholder.lower() for word in FIELD_KEYWORDS['company']):
                                 pass
                             else:
@@ -879,54 +2925,37 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
                                 continue
                     except Exception as e:
                         logger.info(f"Wrong condition - -{guess}")
-                    try:
-                        # try scrolling up to 10 times
-                        for _ in range(10):
-                            count_scroll+=1
-                            if count_scroll == 1:
-                                driver.execute_script("window.scrollBy(0, -300);")
-                            else:
-                                driver.execute_script(
-                                    "arguments[0].scrollIntoView({block: 'center'});",
-                                    elem
-                                )
-                            try:
-
-                                try:
-                                    elem.clear()
-                                except Exception:
-                                    print("cleaning error - - - -")
-                                    pass
-                                elem.click()
-                                placeholder = (elem.get_attribute("placeholder") or "").lower()
-                                if 'last' in placeholder.lower():
-                                    elem.send_keys(str(data['lname']))
-                                elif any(word.lower() in placeholder.lower() for word in FIELD_KEYWORDS['company']) or any(word.lower() in label.lower() for word in FIELD_KEYWORDS['company']):
-                                    elem.send_keys(str(data['company']))
-                                elif typ=='email' or any(word.lower() in label.lower() for word in FIELD_KEYWORDS['email']):
-                                    elem.send_keys(str(data['email']))
-                                elif typ=='tel'  or any(word.lower() in label.lower() for word in FIELD_KEYWORDS['phone']):
-                                    elem.send_keys(str(data['phone']))
-                                else:
-                                    elem.send_keys(str(data[guess]))
-                                out["filled"][guess] = data[guess]
-
-                                print(f"cleaning error - - - -{data[guess]} ,{str(data[guess])} ,{count_scroll}")
-
-
-                                break  # ✅ success, stop scrolling
-
-                            except Exception:
-                                driver.execute_script(
-                                    "arguments[0].scrollIntoView({block: 'center'});",
-                                    elem
-                                )
-                        else:
-                            # runs only if loop never broke
-                            raise Exception("element not interactable after scrolling")
 
-                    except Exception as e:
-                        out["notes"].append(f"couldn't fill {guess}: {e}")
+                    if 'last' in placeholder.lower():
+                        value = data['lname']
+                    elif any(word.lower() in placeholder.lower() for word in FIELD_KEYWORDS['company']) or any(word.lower() in label.lower() for word in FIELD_KEYWORDS['company']):
+                        value = data['company']
+                    elif typ=='email' or any(word.lower() in label.lower() for word in FIELD_KEYWORDS['email']):
+                        value = data['email']
+                    elif typ=='tel'  or any(word.lower() in label.lower() for word in FIELD_KEYWORDS['phone']):
+                        value = data['phone']
+                    else:
+                        value = data[guess]
+                    fill_plan[field["handle"]] = (guess, str(value), elem)
+
+            # --- fill all text inputs and textareas in one call ---
+            kept, rejected = bulk_fill_fields(driver, {h: v for h, (_, v, _) in fill_plan.items()})
+            for handle in kept:
+                guess = fill_plan[handle][0]
+                out["filled"][guess] = data[guess]
+            if rejected:
+                logger.info(f"{len(rejected)} field(s) rejected the bulk fill, typing them instead")
+            for handle in rejected:
+                guess, value, elem = fill_plan[handle]
+                try:
+                    send_keys_with_retry(driver, elem, value)
+                    out["filled"][guess] = data[guess]
+                except Exception as e:
+                    out["notes"].append(f"couldn't fill {guess}: {e}")
+
+            # --- selects, radios, checkboxes, UL dropdowns and date fields in one pass ---
+            widget_report = run_widget_pass(driver, select_plan)
+            merge_widget_report(out["filled"], widget_report)
 
             #todo after all loop if no element filled then do not found
             if not out.get('filled'):
@@ -949,200 +2978,11 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
                     )
 
                 return result
-            # Try to fill common DOB / date fields and other custom widgets before main mapping
-            try:
-                # Quick helper to safely click/send keys
-                def safe_send_keys(el, value):
-                    try:
-                        try:
-                            el.clear()
-                        except Exception:
-                            pass
-                        el.click()
-                        time.sleep(0.05)
-                        el.send_keys(value)
-                        return True
-                    except Exception:
-                        return False
-
-                # 1) Fill date inputs and inputs that look like DOB fields
-                date_xpath = (
-                    "//input[@type='date'] |"
-                    "//input[contains(translate(@name,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'dob')] |"
-                    "//input[contains(translate(@id,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'dob')] |"
-                    "//input[contains(translate(@placeholder,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'dob')] |"
-                    "//input[contains(translate(@name,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'birth')] |"
-                    "//input[contains(translate(@placeholder,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'birth')]"
-                )
-                try:
-                    date_inputs = driver.find_elements(By.XPATH, date_xpath)
-                except Exception:
-                    date_inputs = []
-
-                for di in date_inputs:
-                    try:
-                        if not di.is_displayed():
-                            continue
-                        val = generate_random_date_from_1995()
-                        if safe_send_keys(di, val):
-                            out.setdefault("filled", {}).setdefault("dates", {})[
-                                di.get_attribute("name") or di.get_attribute(
-                                    "id") or f"date_{len(out.get('filled', {}).get('dates', {})) + 1}"
-                                ] = val
-                            logger.info(f"Filled date/DOB field with {val}")
-                    except Exception as e:
-                        logger.debug(f"Could not fill date field: {e}")
-
-                # 2) Inputs that include a YYYY-MM-DD pattern in @pattern attribute or placeholder
-                try:
-                    pattern_inputs = driver.find_elements(By.XPATH,
-                                                          "//input[contains(@pattern,'[0-9]{4}-[0-9]{2}-[0-9]{2}')] | //input[contains(translate(@placeholder,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'-') and (contains(translate(@placeholder,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'yyyy') or contains(translate(@placeholder,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'YYYY') or contains(translate(@placeholder,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'yyyy-mm-dd'))")
-                except Exception:
-                    pattern_inputs = []
-
-                for pi in pattern_inputs:
-                    try:
-                        if not pi.is_displayed():
-                            continue
-                        val = generate_random_date_from_1995()
-                        if safe_send_keys(pi, val):
-                            out.setdefault("filled", {}).setdefault("dates", {})[
-                                pi.get_attribute("name") or pi.get_attribute(
-                                    "id") or f"date_pattern_{len(out.get('filled', {}).get('dates', {})) + 1}"
-                                ] = val
-                            logger.info(f"Filled pattern date field with {val}")
-                    except Exception as e:
-                        logger.debug(f"Could not fill pattern date field: {e}")
-
-                # 3) UL-based dropdowns: try to click the UL (if it looks like a dropdown) and then click the first visible <li>
-                try:
-                    uls = driver.find_elements(By.XPATH, "//ul[./li]")
-                except Exception:
-                    uls = []
-
-                for ul in uls:
-                    try:
-                        if not ul.is_displayed():
-                            continue
-                        cls = (ul.get_attribute('class') or '').lower()
-                        role = (ul.get_attribute('role') or '').lower()
-                        if not ("dropdown" in cls or "select" in cls or role in ('listbox', 'menu')):
-                            # skip generic lists that don't look like dropdowns
-                            continue
-
-                        # Try to open and click first visible li
-                        try:
-                            driver.execute_script("arguments[0].scrollIntoView({block:'center'});", ul)
-                            ul.click()
-                            time.sleep(0.15)
-                        except Exception:
-                            pass
-
-                        lis = ul.find_elements(By.TAG_NAME, "li")
-                        first_li = None
-                        for li in lis:
-                            try:
-                                if li.is_displayed():
-                                    first_li = li
-                                    break
-                            except Exception:
-                                continue
-
-                        if first_li:
-                            try:
-                                first_li.click()
-                                out.setdefault("filled", {}).setdefault("selects", {})[
-                                    ul.get_attribute('id') or ul.get_attribute(
-                                        'class') or f"ul_select_{len(out.get('filled', {}).get('selects', {})) + 1}"
-                                    ] = first_li.text or first_li.get_attribute('data-value') or 'first_option'
-                                logger.info("Clicked first option in UL-based dropdown")
-                            except Exception as e:
-                                logger.debug(f"Could not click UL dropdown option: {e}")
-                    except Exception:
-                        continue
-
-                # 4) Radio groups: select the first visible radio for each name group
-                try:
-                    radios = driver.find_elements(By.CSS_SELECTOR, "input[type='radio']")
-                except Exception:
-                    radios = []
-
-                radios_by_name = {}
-                for r in radios:
-                    try:
-                        name = r.get_attribute('name') or '__noname__'
-                        radios_by_name.setdefault(name, []).append(r)
-                    except Exception:
-                        continue
-
-                for name, group in radios_by_name.items():
-                    for r in group:
-                        try:
-                            if r.is_displayed() and r.is_enabled():
-                                r.click()
-                                out.setdefault("filled", {}).setdefault("radios", {})[name] = 'first_selected'
-                                logger.info(f"Selected first radio for group {name}")
-                                break
-                        except Exception:
-                            continue
-
-                # 5) Accept/Agree handling: check checkboxes or click accept buttons
-                try:
-                    checks = driver.find_elements(By.CSS_SELECTOR, "input[type='checkbox']")
-                except Exception:
-                    checks = []
-
-                for cb in checks:
-                    try:
-                        if not cb.is_displayed():
-                            continue
-                        lbl = ''
-                        try:
-                            lbl = text_of_label_for(driver, cb).lower()
-                        except Exception:
-                            pass
-                        if any(k in (lbl or '') for k in ("accept", "agree", "terms", "consent", "i agree")):
-                            try:
-                                if not cb.is_selected():
-                                    cb.click()
-                                    out.setdefault("filled", {}).setdefault("checkboxes", {})[
-                                        cb.get_attribute('name') or cb.get_attribute(
-                                            'id') or f"accept_{len(out.get('filled', {}).get('checkboxes', {})) + 1}"
-                                        ] = True
-                                    logger.info("Clicked accept/agree checkbox")
-                            except Exception as e:
-                                logger.debug(f"Could not click accept checkbox: {e}")
-                    except Exception as e:
-                        logger.debug(f"erroor: {e}")
-                # Click buttons/links that look like accept/agree
-                try:
-                    btns = driver.find_elements(By.XPATH, "//button|//a")
-                    for b in btns:
-                        try:
-                            if not b.is_displayed():
-                                continue
-                            txt = (b.text or '').strip().lower()
-                            if any(k in txt for k in (
-                            "accept", "agree", "i agree", "accept all", "accept cookies", "agree and continue",
-                            "i accept")):
-                                try:
-                                    b.click()
-                                    logger.info("Clicked accept/agree button")
-                                except Exception:
-                                    continue
-                        except Exception:
-                            continue
-                except Exception:
-                    pass
-
-            except Exception as e:
-                logger.debug(f"Post-fill helper failed: {e}")
             if field_mapping.get('subject'):
                 try:
                     subject_field = driver.find_element(By.XPATH, field_mapping['subject'])
-                    time.sleep(0.5)
+                    wait_for_interactable(driver, subject_field)
                     subject_field.clear()
-                    time.sleep(0.5)
                     subject_field.send_keys(cfg['message_subject'])
                     logger.info(f"Filled subject field: {cfg['message_subject']}")
                 except Exception as e:
@@ -1153,66 +2993,24 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
             if field_mapping.get('message'):
                 try:
                     message_field = driver.find_element(By.XPATH, field_mapping['message'])
-                    time.sleep(0.5)
+                    wait_for_interactable(driver, message_field)
                     message_field.clear()
-                    time.sleep(0.5)
                     message_field.send_keys(form_data.get('personalized_message'))
                     logger.info(f"Filled message field with generated message")
                 except Exception as e:
                     logger.warning(f"Could not fill message field: {e}")
             try:
-                def inject_recaptcha_response(driver, token):
-                    driver.execute_script(f'document.getElementById("g-recaptcha-response").innerHTML="{token}";')
-                    driver.execute_script(
-                        'document.getElementById("g-recaptcha-response").dispatchEvent(new Event("change"));')
-
-                def solve_recaptcha(site_key, url):
-                    logger.info(f"Requesting to solve captcha $$$$$$$$$$$")
-                    s = requests.Session()
-                    captcha_id = s.post(
-                        "http://2captcha.com/in.php",
-                        data={
-                            "key": API_KEY_2CAPTCHA,
-                            "method": "userrecaptcha",
-                            "googlekey": site_key,
-                            "pageurl": url,
-                            "json": 1
-                        }
-                    ).json()["request"]
-
-                    recaptcha_answer = None
+                if captcha_task is None:
+                    # Widgets rendered after the first snapshot are only seen now.
+                    captcha = detect_captcha(driver)
+                    if captcha_solvable(captcha):
+                        captcha_task = get_captcha_solver().solve(captcha["sitekey"], driver.current_url)
+                if captcha_task is not None:
                     captcha_solved = 'Captcha not solved'
-                    for i in range(30):
-                        time.sleep(5)
-                        logger.info(f"Check to solve captcha is solve or not $$$$$$$$$$$")
-                        resp = s.get(
-                            f"http://2captcha.com/res.php?key={API_KEY_2CAPTCHA}&action=get&id={captcha_id}&json=1").json()
-                        print(resp)
-                        if resp["status"] == 1:
-                            captcha_solved = 'Captcha solved'
-                            logger.info(f"$$$$$$$ captcha_info_Check the status solve if 1: {resp['status']}")
-                            recaptcha_answer = resp["request"]
-                            break
-                    return recaptcha_answer,captcha_solved
-
-                frames = driver.find_elements(By.TAG_NAME, "iframe")
-                logger.info(f"captcha_info: {frames}")
-                logger.info(f"going to solve captcha: {frames}")
-                recaptcha_frame = None
-                site_key = None
-                for f in frames:
-                    src = f.get_attribute("src")
-                    if src and "google.com/recaptcha" in src:
-                        recaptcha_frame = f
-                        import urllib.parse as urlparse
-                        parsed = urlparse.urlparse(src)
-                        params = urlparse.parse_qs(parsed.query)
-                        site_key = params.get("k", [None])[0]
-                        break
-                if recaptcha_frame and site_key:
-                    token,captcha_solved = solve_recaptcha(site_key, driver.current_url)
+                    token = wait_with_progress(captcha_task, CAPTCHA_TIMEOUT + 5)
                     if token:
-                        inject_recaptcha_response(driver, token)
+                        inject_captcha_token(driver, token)
+                        captcha_solved = 'Captcha solved'
                         logger.info("reCAPTCHA solved via 2Captcha - - - -")
             except Exception as e:
                 logger.info(f"reCAPTCHA handling failed: {e}")
@@ -1230,246 +3028,50 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
             try:
                 name3_field = driver.find_element(By.XPATH,
                                                   """//label[contains(text(),"Company")]//following-sibling::input""")
-                time.sleep(0.5)
+                wait_for_interactable(driver, name3_field)
                 name3_field.clear()
-                time.sleep(0.5)
                 name3_field.send_keys(form_data.get('company_name'))
                 logger.info(f"Filled Last name field: {form_data.get('company_name')}")
             except Exception as e:
                 logger.warning(f"Could not Last name field: {e}--- {field_mapping['name']}")
 
-            try:
-                # Wait until at least one radio button or checkbox is clickable
-                if not first_radio_selected:
-                    first_input = WebDriverWait(driver, 10).until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, "input[type='radio']"))
-                    )
-                    time.sleep(0.5)
-                    # Click the first one
-                    first_input.click()
-                    time.sleep(0.5)
-                    print("Clicked the first radio button or checkbox found!")
-            except Exception as e:
-                logger.info(f"No radio button or checkbox found.{e}")
-
-            logger.info(f"Waiting for 5 seconds - - -{form_data['form_url']}")
-            time.sleep(5)
-            # if count_scroll>=3:
-            #     driver.execute_script("window.scrollBy(0, 300);")
-            #     time.sleep(0.5)
-            # else:
-            driver.execute_script("window.scrollBy(0, 300);")
-            time.sleep(0.5)
-
-            try:
-
-                submit_buttons = driver.find_elements(By.XPATH,
-                                                      "//button[@type='submit' or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'), 'send') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'), 'submit')]")
-                final_clicked = False
-                if submit_buttons:
-                    for button in submit_buttons:
-                        try:
-                            button.click()
-                            time.sleep(0.5)
-                            final_clicked = True
-                        except:
-                            pass
-                # Only consider submit buttons that are contained within a <form> element
-                submit_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable(
-                        (By.CSS_SELECTOR, "form input[type='submit'], form button[type='submit']"))
-                )
-
-                if submit_button and not final_clicked:
-                    # driver.execute_script("window.scrollBy(0, 300);")
-                    try:
-                        driver.execute_script("arguments[0].scrollIntoView(true);", submit_button)
-                        submit_button.click()
-                        logger.info(f"Form submitted successfully{form_data['form_url']}")
-                    except:
-                        pass
-                    time.sleep(0.5)
-
-                    driver.execute_script("window.scrollTo(0, 0);")
-                    time.sleep(0.5)
-                    nsubmit_button = WebDriverWait(driver, 10).until(
-                        EC.element_to_be_clickable(
-                            (By.CSS_SELECTOR, "form input[type='submit'], form button[type='submit']"))
-                    )
-                    driver.execute_script("arguments[0].scrollIntoView(true);", nsubmit_button)
-                    submit_button.click()
-                    logger.info(f"Form submitted successfully{form_data['form_url']}")
-                    # submit_button.click()
-                    logger.info(f"submit_buttons 1 - -- -Form submitted successfully {form_data['form_url']}")
-                time.sleep(0.5)
-                if not submit_button:
-                    driver.execute_script("window.scrollTo(0, 300);")
-                    time.sleep(0.5)
-                    submit_buttons = driver.find_elements(By.XPATH,
-                                                          "//button[@type='submit' or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'), 'send') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'), 'submit')]")
-                    time.sleep(0.5)
-                    for button in submit_buttons:
-                        try:
-                            button.click()
-                        except:
-                            pass
-                    logger.info(f"submit_buttons 2  - -- -Form submitted successfully {form_data['form_url']}")
-
-            except Exception as e:
-                logger.info(f"Retry to submit {e}")
-                driver.execute_script("window.scrollTo(0, 0);")
-
-                try:
-
-                    try:
-                        try:
-                            submit_button = WebDriverWait(driver, 10).until(
-                                EC.element_to_be_clickable(
-                                    (By.CSS_SELECTOR, "form input[type='submit'], form button[type='submit']"))
-                            )
-                            if submit_button:
-                                driver.execute_script("window.scrollBy(0, -300);")
-                                driver.execute_script("arguments[0].scrollIntoView(true);", submit_button)
-                                submit_button.click()
-                                logger.info(f"Form submitted successfully{form_data['form_url']}")
-                                time.sleep(0.5)
-                                # submit_button.click()
-                                logger.info(f"submit_buttons 1 - -- -Form submitted successfully {form_data['form_url']}")
-                        except:
-                            time.sleep(0.5)
-                            driver.execute_script("window.scrollTo(0, 300);")
-
-                            submit_buttons = driver.find_elements(By.XPATH,
-                                                                  "//button[@type='submit' or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'), 'send') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'), 'submit')]")
-                            time.sleep(0.5)
-                            if not submit_buttons:
-                                driver.find_element(By.XPATH, "//a[normalize-space()='Send']").click()
-                            else:
-                                for button in submit_buttons:
-                                    try:
-                                        button.click()
-                                    except:
-                                        pass
-                            logger.info(f"submit_buttons 2  - -- -Form submitted successfully {form_data['form_url']}")
-
-                    except:
-                        driver.execute_script("window.scrollBy(0, 200);")
-                        submit_button = driver.find_element(By.CSS_SELECTOR,
-                                                            "button:contains('Send'), button:contains('Submit')")
-                        submit_button.click()
-                        logger.info(f"DD &&&&& Submitted Successful...{form_data['form_url']}")
-                except:
-                    try:
-                        logger.info("  advancesd - -- - -")
-                        driver.execute_script("document.querySelector('form').submit();")
-                        logger.info(" submitted 3 with advancesd - -- - -")
-                        logger.info(f"Form 3 submitted successfully{form_data['form_url']}")
-
-                    except Exception as e:
-
-                        try:
-                            if not submit_buttons:
-
-                                for btn in driver.find_elements(By.TAG_NAME, "button"):
-
-                                    txt = (btn.text or "").lower()
-                                    if any(k in txt for k in SUBMIT_TEXT_KEYWORDS) and btn.is_displayed():
-                                        submit_buttons.append(btn)
-
-
-                        except:
-                            try:
-
-                                submit_button = driver.find_element(By.CSS_SELECTOR,
-                                                                    "input[type='submit'], button[type='submit']")
-                                driver.execute_script("arguments[0].scrollIntoView(true);", submit_button)
-                                time.sleep(0.5)
-                                submit_button.click()
-                                logger.info(f"Form submitted successfully{form_data['form_url']}")
-                            except:
-                                # Submit form
-                                try:
-                                    logger.info("  advancesd - -- - -")
-                                    driver.execute_script("document.querySelector('form').submit();")
-                                    logger.info(" submitted with advancesd - -- - -")
-                                except Exception as e:
-                                    logger.info("Retry to submit")
-                                    try:
-
-                                        # Only consider submit buttons that are contained within a <form> element
-                                        submit_button = WebDriverWait(driver, 10).until(
-                                            EC.element_to_be_clickable((By.CSS_SELECTOR,
-                                                                        "form input[type='submit'], form button[type='submit']"))
-                                        )
-                                        submit_button.click()
-                                        logger.info(f"Form submitted successfully{form_data['form_url']}")
-                                    except Exception as e:
-                                        logger.warning(f"Could not find submit button retry once more - - -: {e}")
-
-                                        # Try alternative submit methods
-
-                                        try:
-                                            submit_button = driver.find_element(By.CSS_SELECTOR,
-                                                                                "button:contains('Send'), button:contains('Submit')")
-                                            submit_button.click()
-                                            logger.info(f"DD &&&&& Submitted Successful...{form_data['form_url']}")
-                                        except Exception as eeee:
-                                            try:
-                                                print("submittintt through adavnce -")
-                                                driver.execute_script("document.querySelector('form').submit();")
-                                                print("submittintt through adavnce Done - - - -")
-                                            except Exception as e:
-                                                e=f'Failed To submit Please verify...{form_data['form_url']} {str(e)}'
-                                                mark_failed(job['id'], str(e))
-                                                driver.quit()
-                                                logger.info(
-                                                    f"DD &&&&& Failed To submit Please verify...{form_data['form_url']} {e}")
-                                                return {
-                                                    'success': False,
-                                                    'error': f'Selenium failed: {eeee}.  submission not done no result.',
-                                                    'submission_time': datetime.now(),
-                                                    'form_url': form_data.get('form_url', '')
-                                                }
-
-            # Wait for submission
-            try:
-                width = driver.execute_script("return document.body.scrollWidth")
-                height = driver.execute_script("return document.body.scrollHeight")
-
-                driver.set_window_size(width, 15000)
-
-                screenshot_bytes = driver.get_screenshot_as_png()
-
-                logger.info(f"Taking screenshot Captured - - - -")
-            except Exception as e:
-                screenshot_bytes = None
-                logger.info(f"Taking screenshot Error- -  - - - - {e}")
-            time.sleep(5)
-
-            # Check for success indicators
-            success_indicators = [
-                "thank you",
-                "success",
-                "submitted",
-                "received",
-                "sent"
-            ]
-
-            try:
-                thank_u_message_field = driver.find_element(By.XPATH,
-                                                            '''"//*[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'thank you') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'success') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'submitted') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'received')]"''')
-                logger.info(f"Thank you appered - -  - - - - : {thank_u_message_field}")
-            except:
-                logger.info(f"Not appered thank you- -  - - - - ")
+            logger.info(f"Waiting for page to settle before submit - - -{form_data['form_url']}")
+            wait_for_stage(driver, "pre_submit", out["waits"])
+            # The resolver scrolls its candidate into view itself.
+            arm_success_detector(driver, network_stats)
+            submitted = resolve_and_submit(driver, fill_plan.keys())
+            logger.info(f"Submit for {form_data['form_url']}: {submitted}")
+            if not submitted["method"]:
+                e = f"Failed To submit Please verify...{form_data['form_url']} no submit control or form"
+                mark_failed(job['id'], e)
+                return {
+                    'success': False,
+                    'error': f'Selenium failed: {e}.  submission not done no result.',
+                    'submission_time': datetime.now(),
+                    'form_url': form_data.get('form_url', '')
+                }
 
-            page_text = driver.page_source.lower()
-            submission_successful = any(indicator in page_text for indicator in success_indicators)
+            # Decides on the first network/DOM signal instead of waiting out the post_submit stage.
+            verdict = detect_submit_outcome(driver, network_stats)
+            if verdict["signal"] in ("navigated", "url_changed", "post_response"):
+                wait_for_ready_state(driver, timeout=5)  # screenshot the new page, not a half-loaded one
+            screenshot_b64 = capture_form_screenshot(driver, fill_plan.keys())
+            if screenshot_b64:
+                logger.info(f"Taking screenshot Captured - - - -")
 
+            try:
+                response_page = driver.execute_script("return document.documentElement.outerHTML.slice(0, 1000);")
+            except Exception:
+                response_page = ""
             result = {
-                'success': submission_successful,
+                'success': verdict["success"],
                 'submission_time': datetime.now(),
-                'response_page': driver.page_source[:1000],  # First 1000 chars
-                'form_url': form_data['form_url']
+                'response_page': response_page,  # First 1000 chars
+                'form_url': form_data['form_url'],
+                'waits': out["waits"],
+                'submit': submitted,
+                'verdict': verdict,
+                'network': update_network_stats(network_stats, read_network_events(driver))
             }
 
             logger.info(f"All Form Submitted - - - - : {result}")
@@ -1479,9 +3081,10 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
                 update_aws_job_metadata(
                     job['id'],
                     status="COMPLETED",
-                    completed=True,job=job,screenshot_bytes=screenshot_bytes,captcha_solved=captcha_solved
+                    completed=True,job=job,captcha_solved=captcha_solved
                 )
-                time.sleep(2)
+                if screenshot_b64:
+                    get_screenshot_writer().submit(job['id'], screenshot_b64)
 
             return result
 
@@ -1505,11 +3108,14 @@ def submit_contact_form_old(form_data: Dict[str, Any], generated_message: str,jo
             }
             # fallthrough to requests fallback
         finally:
-            try:
-                if driver:
-                    driver.quit()
-            except Exception:
-                pass
+            if captcha_task is not None and not captcha_task.done():
+                get_captcha_solver().cancel(captcha_task)
+            if driver:
+                if RESOURCE_BLOCKING or SUCCESS_NETWORK_SIGNALS:
+                    update_network_stats(network_stats, read_network_events(driver))
+                if RESOURCE_BLOCKING:
+                    logger.info(f"Resource blocking for {form_data.get('form_url')}: {network_stats}")
+                pool.release(driver)
 
 
     # --- Non-selenium fallback: simple HTTP POST ---
@@ -1542,34 +3148,30 @@ def _fetch_pending_rows(limit: int = 50):
     if not PSYCOPG2_AVAILABLE:
         logger.warning("psycopg2 not available; cannot fetch pending rows")
         return []
-    conn = _get_db_conn()
-    if not conn:
-        logger.warning("No DB connection; cannot fetch pending rows")
-        return []
-    try:
-        try:
-            from psycopg2.extras import RealDictCursor
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-        except Exception:
-            cur = conn.cursor()
-        cur.execute("SELECT * FROM contact_urls WHERE form_status = 'PENDING' ORDER BY created_at ASC LIMIT %s", (limit,))
-        rows = cur.fetchall()
-        if hasattr(rows[0] if rows else None, 'keys'):
-            # RealDictCursor or dict-like
-            result = [dict(r) for r in rows]
-        else:
-            cols = [c[0] for c in cur.description]
-            result = [dict(zip(cols, r)) for r in rows]
-        cur.close()
-        conn.close()
-        return result
-    except Exception as e:
-        logger.error(f"Failed fetching pending rows: {e}")
+    columns = contact_columns_sql()
+    with db_connection() as conn:
+        if not conn:
+            logger.warning("No DB connection; cannot fetch pending rows")
+            return []
         try:
-            conn.close()
-        except Exception:
-            pass
-        return []
+            try:
+                from psycopg2.extras import RealDictCursor
+                cur = conn.cursor(cursor_factory=RealDictCursor)
+            except Exception:
+                cur = conn.cursor()
+            cur.execute(f"SELECT {columns} FROM contact_urls WHERE form_status = 'PENDING' ORDER BY created_at ASC LIMIT %s", (limit,))
+            rows = cur.fetchall()
+            if hasattr(rows[0] if rows else None, 'keys'):
+                # RealDictCursor or dict-like
+                result = [dict(r) for r in rows]
+            else:
+                cols = [c[0] for c in cur.description]
+                result = [dict(zip(cols, r)) for r in rows]
+            cur.close()
+            return result
+        except Exception as e:
+            logger.error(f"Failed fetching pending rows: {e}")
+            return []
 
 
 def process_pending_forms(limit: int = 50, pause_seconds: float = 1.5):
@@ -1624,41 +3226,42 @@ def fetch_and_lock_one_job():
     if not PSYCOPG2_AVAILABLE:
         return None
 
-    conn = _get_db_conn()
-    if not conn:
-        return None
+    columns = contact_columns_sql()
+    with db_connection() as conn:
+        if not conn:
+            return None
 
-    try:
-        from psycopg2.extras import RealDictCursor
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            require_migration(conn, "leases")
+            from psycopg2.extras import RealDictCursor
+            cur = conn.cursor(cursor_factory=RealDictCursor)
 
-        cur.execute("""
-            UPDATE contact_urls
-            SET form_status = 'PROCESSING',
-                worker_id = %s,
-                locked_at = NOW()
-            WHERE id = (
-                SELECT id
-                FROM contact_urls
-                WHERE form_status = 'PENDING'
-                ORDER BY created_at ASC
-                LIMIT 1
-                FOR UPDATE SKIP LOCKED
-            )
-            RETURNING *;
-        """, (WORKER_ID,))
+            cur.execute(f"""
+                UPDATE contact_urls
+                SET form_status = 'PROCESSING',
+                    worker_id = %s,
+                    locked_at = NOW(),
+                    lease_expires_at = NOW() + %s * INTERVAL '1 second'
+                WHERE id = (
+                    SELECT id
+                    FROM contact_urls
+                    WHERE form_status = 'PENDING'
+                    ORDER BY created_at ASC
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {columns};
+            """, (WORKER_ID, LEASE_SECONDS))
 
-        row = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
-        return dict(row) if row else None
+            row = cur.fetchone()
+            conn.commit()
+            cur.close()
+            return dict(row) if row else None
 
-    except Exception as e:
-        conn.rollback()
-        conn.close()
-        logger.error(f"Fetch+lock failed: {e}")
-        return None
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Fetch+lock failed: {e}")
+            return None
 
 # def recover_stuck_jobs():
 #     if not PSYCOPG2_AVAILABLE:
@@ -1688,25 +3291,40 @@ def fetch_and_lock_one_job():
 #         logger.error(f"Recovery failed: {e}")
 
 def mark_failed(contact_id, error):
-    conn = _get_db_conn()
-    if not conn:
-        return
+    if contact_id in _ABORTED_JOBS:
+        # Handed back by a drain; the failure is the abort itself, not the job's.
+        return None
+    # Land anything journaled for this job first so it can't overwrite the retry state.
+    if _STATUS_JOURNAL is not None:
+        _STATUS_JOURNAL.flush([contact_id])
+    with db_connection() as conn:
+        if not conn:
+            return
 
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE contact_urls
-        SET retry_count = retry_count + 1,
-            last_error = %s,
-            form_status = CASE
-                WHEN retry_count + 1 >= %s THEN 'FAILED'
-                ELSE 'Queued'
-            END,
-            worker_id = NULL,
-            locked_at = NULL
-        WHERE id = %s;
-    """, (error, MAX_RETRIES, contact_id))
-    conn.commit()
-    conn.close()
+        require_migration(conn, "leases")
+        cur = conn.cursor()
+        cur.execute("""
+            UPDATE contact_urls
+            SET retry_count = retry_count + 1,
+                last_error = %s,
+                form_status = CASE
+                    WHEN retry_count + 1 >= %s THEN 'FAILED'
+                    ELSE 'Queued'
+                END,
+                status = CASE
+                    WHEN retry_count + 1 >= %s THEN 'FAILED'
+                    ELSE 'Queued'
+                END,
+                worker_id = NULL,
+                locked_at = NULL,
+                lease_expires_at = NULL
+            WHERE id = %s
+            RETURNING form_status, retry_count;
+        """, (error, MAX_RETRIES, MAX_RETRIES, contact_id))
+        row = cur.fetchone()
+        conn.commit()
+    # (new form_status, retry_count), so callers can schedule the retry.
+    return row
 
 
 def thread_worker():
@@ -1738,142 +3356,686 @@ def thread_worker():
         except Exception as e:
             logger.error(f"Job failed {job['id']}: {e}")
             mark_failed(job['id'], str(e))
-import boto3
 import signal
 import sys
 
+QUEUE_BACKEND = os.getenv("QUEUE_BACKEND", "sqs")  # sqs | memory | sqlite
 QUEUE_URL = os.getenv("QUEUE_URL",'https://sqs.us-east-1.amazonaws.com/957440525184/selenium-worker-jobs')
-VISIBILITY_TIMEOUT = 1200  # must be > max selenium execution time
+SQLITE_QUEUE_PATH = os.getenv("SQLITE_QUEUE_PATH", os.path.join(tempfile.gettempdir(), "form_worker_queue.sqlite3"))
+VISIBILITY_TIMEOUT = int(os.getenv("VISIBILITY_TIMEOUT", 60))  # initial; extended while the job makes progress
+VISIBILITY_EXTEND_INTERVAL = float(os.getenv("VISIBILITY_EXTEND_INTERVAL", VISIBILITY_TIMEOUT / 3))
+JOB_STALL_SECONDS = float(os.getenv("JOB_STALL_SECONDS", 300))  # stop extending after this long without progress
+RETRY_BACKOFF_BASE = int(os.getenv("RETRY_BACKOFF_BASE", 5))
+RETRY_BACKOFF_MAX = int(os.getenv("RETRY_BACKOFF_MAX", 900))
+SQS_MAX_VISIBILITY = 43200  # SQS limit: 12 hours
+SQS_RECEIVE_BATCH = max(1, min(10, int(os.getenv("SQS_RECEIVE_BATCH", 10))))  # SQS caps a receive at 10
+PREFETCH_BUFFER = int(os.getenv("PREFETCH_BUFFER", 0))  # claimed jobs waiting for an executor; 0 = concurrency
+SQS_ACK_INTERVAL = float(os.getenv("SQS_ACK_INTERVAL", 0.5))  # max seconds a delete waits to fill a batch
 SHUTDOWN = False
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", 60))  # seconds in-flight jobs get to finish on SIGTERM
+SQS_WAIT_SECONDS = int(os.getenv("SQS_WAIT_SECONDS", 20))  # long poll; also bounds how late a drain starts
+_ABORTED_JOBS = set()  # jobs handed back by a drain whose threads may still be unwinding
+DOMAIN_RATE_PER_MINUTE = float(os.getenv("DOMAIN_RATE_PER_MINUTE", 6))  # job starts per target host
+DOMAIN_BURST = float(os.getenv("DOMAIN_BURST", 2))
+DOMAIN_MAX_CONCURRENCY = int(os.getenv("DOMAIN_MAX_CONCURRENCY", 1))
+DOMAIN_MAX_LOCAL_WAIT = float(os.getenv("DOMAIN_MAX_LOCAL_WAIT", 10))  # longer waits go back to the queue
+DOMAIN_BLOCK_BACKOFF = float(os.getenv("DOMAIN_BLOCK_BACKOFF", 300))  # pause a host after it blocked us
+CAMPAIGN_WEIGHTS = {}  # {"campaign_name": weight}, default 1
+try:
+    CAMPAIGN_WEIGHTS = {str(k): float(v) for k, v in json.loads(os.getenv("CAMPAIGN_WEIGHTS", "{}")).items()}
+except Exception as e:
+    logger.warning(f"Ignoring invalid CAMPAIGN_WEIGHTS: {e}")
+CAPTCHA_LANE_CONCURRENCY = int(os.getenv("CAPTCHA_LANE_CONCURRENCY", 1))  # captcha executors/browsers; 0 = solve inline
+CAPTCHA_LANE_BUFFER = int(os.getenv("CAPTCHA_LANE_BUFFER", 4))  # handed-off jobs waiting for a captcha executor
+CAPTCHA_SOLVES_PER_HOUR = int(os.getenv("CAPTCHA_SOLVES_PER_HOUR", 120))  # solver budget; 0 = unlimited
+CAPTCHA_LANE_RETRY_DELAY = int(os.getenv("CAPTCHA_LANE_RETRY_DELAY", 120))  # defer when the lane is full
+CAPTCHA_HOST_TTL = float(os.getenv("CAPTCHA_HOST_TTL", 3600))  # route a host's jobs straight to the lane this long
+LANE_METRICS_INTERVAL = float(os.getenv("LANE_METRICS_INTERVAL", 300))  # seconds between per-lane metric logs
 
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 
-sqs = boto3.client(
-    "sqs",
-    region_name=AWS_REGION
-)
-
 def shutdown_handler(signum, frame):
     global SHUTDOWN
     SHUTDOWN = True
-    logger.info("Shutdown signal received, finishing current job...")
+    logger.info("Shutdown signal received, draining in-flight jobs...")
 
-signal.signal(signal.SIGTERM, shutdown_handler)
-signal.signal(signal.SIGINT, shutdown_handler)
 
+def install_signal_handlers():
+    signal.signal(signal.SIGTERM, shutdown_handler)
+    signal.signal(signal.SIGINT, shutdown_handler)
 
-def mark_done(contact_id):
-    conn = _get_db_conn()
-    if not conn:
-        return
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE contact_urls
-        SET form_status='DONE',
-            worker_id=NULL,
-            locked_at=NULL,
-            updated_at=NOW()
-        WHERE id=%s;
-    """, (contact_id,))
-    conn.commit()
-    conn.close()
 
+# --- Queue backends ---
+# Messages are SQS-shaped dicts ({"MessageId", "ReceiptHandle", "Body"}) whatever
+# the backend. A receipt handle is only valid for the delivery it came from: once
+# a message becomes visible again and is re-received, the old handle can no
+# longer delete it or change its visibility.
 
-def recover_stuck_jobs():
-    try:
-        logger.info(f"Database connectionss: ")
-        conn = _get_db_conn()
+class QueueBackend:
+    """What the worker needs from a job queue."""
+
+    url = None
+
+    def receive(self, max_messages, wait_seconds, visibility_timeout):
+        """Return up to `max_messages` messages, waiting up to `wait_seconds` for the first."""
+        raise NotImplementedError
+
+    def delete_batch(self, receipts):
+        """Delete messages by receipt handle; return the receipts that could not be deleted."""
+        raise NotImplementedError
+
+    def change_visibility_batch(self, entries):
+        """Apply [(receipt, seconds)]; return the receipts that could not be changed."""
+        raise NotImplementedError
+
+    def send_batch(self, entries):
+        """Send [(body, delay_seconds)]; return the new message ids."""
+        raise NotImplementedError
+
+
+class SqsQueue(QueueBackend):
+    """Amazon SQS; the boto3 client is created on first use."""
+
+    def __init__(self, url=QUEUE_URL, region=AWS_REGION):
+        self.url = url
+        self.region = region
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                import boto3
+                self._client = boto3.client("sqs", region_name=self.region)
+            return self._client
+
+    def receive(self, max_messages, wait_seconds, visibility_timeout):
+        resp = self.client.receive_message(
+            QueueUrl=self.url,
+            MaxNumberOfMessages=max(1, min(10, max_messages)),
+            WaitTimeSeconds=wait_seconds,
+            VisibilityTimeout=visibility_timeout
+        )
+        logger.info(f"SQS Worker started and details: {resp}")
+        return resp.get("Messages", [])
+
+    @staticmethod
+    def _chunks(items):
+        for start in range(0, len(items), 10):
+            yield items[start:start + 10]
+
+    def delete_batch(self, receipts):
+        failed = []
+        for chunk in self._chunks(list(receipts)):
+            resp = self.client.delete_message_batch(
+                QueueUrl=self.url,
+                Entries=[{"Id": str(i), "ReceiptHandle": r} for i, r in enumerate(chunk)]
+            )
+            failed.extend(chunk[int(f["Id"])] for f in resp.get("Failed", []))
+        return failed
+
+    def change_visibility_batch(self, entries):
+        failed = []
+        for chunk in self._chunks(list(entries)):
+            resp = self.client.change_message_visibility_batch(
+                QueueUrl=self.url,
+                Entries=[
+                    {"Id": str(i), "ReceiptHandle": receipt, "VisibilityTimeout": int(seconds)}
+                    for i, (receipt, seconds) in enumerate(chunk)
+                ]
+            )
+            failed.extend(chunk[int(f["Id"])][0] for f in resp.get("Failed", []))
+        return failed
+
+    def send_batch(self, entries):
+        ids = []
+        for chunk in self._chunks(list(entries)):
+            resp = self.client.send_message_batch(
+                QueueUrl=self.url,
+                Entries=[
+                    {"Id": str(i), "MessageBody": body, "DelaySeconds": int(min(900, delay or 0))}
+                    for i, (body, delay) in enumerate(chunk)
+                ]
+            )
+            ids.extend(m["MessageId"] for m in resp.get("Successful", []))
+            if resp.get("Failed"):
+                logger.warning(f"SQS refused {len(resp['Failed'])} send(s): {resp['Failed']}")
+        return ids
+
+
+class MemoryQueue(QueueBackend):
+    """In-process queue with SQS visibility semantics, for tests and single-process load runs."""
+
+    def __init__(self):
+        self.url = "memory://"
+        self._messages = {}
+        self._by_receipt = {}
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def receive(self, max_messages, wait_seconds, visibility_timeout):
+        deadline = time.monotonic() + wait_seconds
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                visible = sorted(
+                    (m for m in self._messages.values() if m["visible_at"] <= now), key=lambda m: m["seq"]
+                )[:max_messages]
+                if visible or now >= deadline:
+                    break
+                next_visible = min((m["visible_at"] for m in self._messages.values()), default=deadline)
+                self._cond.wait(max(0.01, min(deadline, next_visible) - now))
+            out = []
+            for m in visible:
+                self._by_receipt.pop(m["receipt"], None)
+                m["receipt"] = uuid.uuid4().hex
+                m["visible_at"] = now + visibility_timeout
+                self._by_receipt[m["receipt"]] = m["id"]
+                out.append({"MessageId": m["id"], "ReceiptHandle": m["receipt"], "Body": m["body"]})
+            return out
+
+    def delete_batch(self, receipts):
+        failed = []
+        with self._cond:
+            for receipt in receipts:
+                message_id = self._by_receipt.pop(receipt, None)
+                if message_id is None:
+                    failed.append(receipt)
+                else:
+                    del self._messages[message_id]
+        return failed
+
+    def change_visibility_batch(self, entries):
+        failed = []
+        with self._cond:
+            for receipt, seconds in entries:
+                message_id = self._by_receipt.get(receipt)
+                if message_id is None:
+                    failed.append(receipt)
+                else:
+                    self._messages[message_id]["visible_at"] = time.monotonic() + seconds
+            self._cond.notify_all()
+        return failed
+
+    def send_batch(self, entries):
+        ids = []
+        with self._cond:
+            for body, delay in entries:
+                self._seq += 1
+                message_id = uuid.uuid4().hex
+                self._messages[message_id] = {
+                    "id": message_id, "body": body, "seq": self._seq,
+                    "visible_at": time.monotonic() + (delay or 0), "receipt": None,
+                }
+                ids.append(message_id)
+            self._cond.notify_all()
+        return ids
+
+
+class SqliteQueue(QueueBackend):
+    """SQLite-file queue with SQS visibility semantics, shareable by several local worker processes."""
+
+    POLL_INTERVAL = 0.2
+
+    def __init__(self, path=SQLITE_QUEUE_PATH):
+        import sqlite3
+        self.url = f"sqlite:///{path}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS queue_messages (
+                id TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                sent_at REAL NOT NULL,
+                visible_at REAL NOT NULL,
+                receipt TEXT,
+                receive_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS queue_messages_visible_idx ON queue_messages (visible_at)")
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS queue_messages_receipt_idx ON queue_messages (receipt)")
+
+    def _receive_once(self, max_messages, visibility_timeout):
+        now = time.time()
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                rows = cur.execute(
+                    "SELECT id, body FROM queue_messages WHERE visible_at <= ? ORDER BY sent_at LIMIT ?",
+                    (now, max_messages)
+                ).fetchall()
+                out = []
+                for message_id, body in rows:
+                    receipt = uuid.uuid4().hex
+                    cur.execute(
+                        "UPDATE queue_messages SET receipt = ?, visible_at = ?, receive_count = receive_count + 1 "
+                        "WHERE id = ?",
+                        (receipt, now + visibility_timeout, message_id)
+                    )
+                    out.append({"MessageId": message_id, "ReceiptHandle": receipt, "Body": body})
+                cur.execute("COMMIT")
+                return out
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+    def receive(self, max_messages, wait_seconds, visibility_timeout):
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            out = self._receive_once(max_messages, visibility_timeout)
+            if out or time.monotonic() >= deadline:
+                return out
+            time.sleep(self.POLL_INTERVAL)
+
+    def delete_batch(self, receipts):
+        failed = []
+        with self._lock:
+            for receipt in receipts:
+                if self._conn.execute("DELETE FROM queue_messages WHERE receipt = ?", (receipt,)).rowcount == 0:
+                    failed.append(receipt)
+        return failed
+
+    def change_visibility_batch(self, entries):
+        failed = []
+        now = time.time()
+        with self._lock:
+            for receipt, seconds in entries:
+                cur = self._conn.execute(
+                    "UPDATE queue_messages SET visible_at = ? WHERE receipt = ?", (now + seconds, receipt)
+                )
+                if cur.rowcount == 0:
+                    failed.append(receipt)
+        return failed
+
+    def send_batch(self, entries):
+        ids = []
+        now = time.time()
+        with self._lock:
+            for body, delay in entries:
+                message_id = uuid.uuid4().hex
+                self._conn.execute(
+                    "INSERT INTO queue_messages (id, body, sent_at, visible_at) VALUES (?, ?, ?, ?)",
+                    (message_id, body, now, now + (delay or 0))
+                )
+                ids.append(message_id)
+        return ids
+
+
+QUEUE_BACKENDS = {"sqs": SqsQueue, "memory": MemoryQueue, "sqlite": SqliteQueue}
+_QUEUE = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def get_queue():
+    global _QUEUE
+    with _QUEUE_LOCK:
+        if _QUEUE is None:
+            if QUEUE_BACKEND not in QUEUE_BACKENDS:
+                raise ValueError(f"Unknown QUEUE_BACKEND {QUEUE_BACKEND!r}; expected one of {sorted(QUEUE_BACKENDS)}")
+            _QUEUE = QUEUE_BACKENDS[QUEUE_BACKEND]()
+            logger.info(f"Using {QUEUE_BACKEND} queue backend: {_QUEUE.url}")
+        return _QUEUE
+
+
+def enqueue_jobs(job_ids, delay_seconds=0):
+    """Send one {"job_id": ...} message per id to the configured queue."""
+    return get_queue().send_batch([(json.dumps({"job_id": job_id}), delay_seconds) for job_id in job_ids])
+
+
+def mark_done(contact_id):
+    with db_connection() as conn:
         if not conn:
             return
+        require_migration(conn, "leases")
         cur = conn.cursor()
         cur.execute("""
             UPDATE contact_urls
-            SET form_status='PENDING',
+            SET form_status='DONE',
                 worker_id=NULL,
                 locked_at=NULL,
-                retry_count = retry_count + 1
-            WHERE form_status='PROCESSING'
-              AND locked_at < NOW() - INTERVAL '%s minutes'
-              AND retry_count < %s;
-        """, (LOCK_TIMEOUT_MINUTES, MAX_RETRIES))
+                lease_expires_at=NULL,
+                updated_at=NOW()
+            WHERE id=%s;
+        """, (contact_id,))
         conn.commit()
-        conn.close()
+
+
+def recover_stuck_jobs():
+    """Release every job whose lease has lapsed; see reap_expired_leases."""
+    try:
+        logger.info("Database connectionss: ")
+        return reap_expired_leases()
     except Exception as e:
         logger.info(f"Error in recover_stuck_jobs: {e}")
+        return 0
+
+
+def contact_id_array_sql():
+    """`%s` placeholder for a list of contact ids, cast to the id column's array type."""
+    id_type = contact_column_types().get("id")
+    return f"%s::{id_type}[]" if id_type else "%s"
+
+
+def reap_expired_leases(batch=REAPER_BATCH, db_timeout=None):
+    """Put PROCESSING jobs with a lapsed lease back to Queued (FAILED at MAX_RETRIES).
+
+    Works in batches of `batch` rows picked through the lease index with SKIP
+    LOCKED, so any number of workers can reap at once. Rows locked before leases
+    existed fall back to the LOCK_TIMEOUT_MINUTES age check. Returns rows released.
+    """
+    total = 0
+    with db_connection(db_timeout) as conn:
+        if not conn:
+            return 0
+        require_migration(conn, "leases")
+        cur = conn.cursor()
+        while True:
+            cur.execute("""
+                WITH expired AS (
+                    SELECT id
+                    FROM contact_urls
+                    WHERE form_status = 'PROCESSING'
+                      AND (lease_expires_at < NOW()
+                           OR (lease_expires_at IS NULL AND locked_at < NOW() - %s * INTERVAL '1 minute'))
+                    ORDER BY lease_expires_at
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE contact_urls AS c
+                SET retry_count = c.retry_count + 1,
+                    last_error = 'Lease expired (worker ' || COALESCE(c.worker_id::text, 'unknown') || ')',
+                    form_status = CASE
+                        WHEN c.retry_count + 1 >= %s THEN 'FAILED'
+                        ELSE 'Queued'
+                    END,
+                    status = CASE
+                        WHEN c.retry_count + 1 >= %s THEN 'FAILED'
+                        ELSE 'Queued'
+                    END,
+                    worker_id = NULL,
+                    locked_at = NULL,
+                    lease_expires_at = NULL
+                FROM expired
+                WHERE c.id = expired.id
+                RETURNING c.id;
+            """, (LOCK_TIMEOUT_MINUTES, batch, MAX_RETRIES, MAX_RETRIES))
+            released = cur.fetchall()
+            conn.commit()
+            total += len(released)
+            if len(released) < batch:
+                break
+        cur.execute("""
+            UPDATE workers SET status = 'stale'
+            WHERE status = 'alive' AND lease_expires_at < NOW()
+        """)
+        conn.commit()
+    if total:
+        logger.warning(f"Reaped {total} job(s) with expired leases")
+    return total
+
+
+class LeaseManager:
+    """Keeps this worker's job leases and its `workers` row alive.
+
+    Jobs are registered with `hold()` once locked and dropped with `release()`.
+    Every HEARTBEAT_INTERVAL seconds the thread pushes `lease_expires_at` of all
+    held rows LEASE_SECONDS into the future in one statement, and every
+    REAPER_INTERVAL seconds it reaps other workers' lapsed leases.
+    """
+
+    def __init__(self):
+        self._held = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.metrics = {"heartbeats": 0, "heartbeat_errors": 0, "leases_lost": 0, "reaped": 0}
+
+    def hold(self, contact_id):
+        with self._lock:
+            self._held.add(contact_id)
+
+    def release(self, contact_id):
+        with self._lock:
+            self._held.discard(contact_id)
+
+    def held(self):
+        with self._lock:
+            return list(self._held)
+
+    def heartbeat(self):
+        import socket
+        held = self.held()
+        ids_sql = contact_id_array_sql()
+        with db_connection(HEARTBEAT_DB_TIMEOUT) as conn:
+            if not conn:
+                return
+            require_migration(conn, "leases")
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO workers (worker_id, hostname, instance_ip, pid, status, active_jobs,
+                                     last_heartbeat_at, lease_expires_at)
+                VALUES (%s, %s, %s, %s, 'alive', %s, NOW(), NOW() + %s * INTERVAL '1 second')
+                ON CONFLICT (worker_id) DO UPDATE
+                SET status = 'alive',
+                    active_jobs = EXCLUDED.active_jobs,
+                    last_heartbeat_at = EXCLUDED.last_heartbeat_at,
+                    lease_expires_at = EXCLUDED.lease_expires_at
+            """, (WORKER_ID, socket.gethostname(), get_instance_private_ip(), os.getpid(), len(held), LEASE_SECONDS))
+            renewed = []
+            if held:
+                cur.execute(f"""
+                    UPDATE contact_urls
+                    SET lease_expires_at = NOW() + %s * INTERVAL '1 second'
+                    WHERE id = ANY({ids_sql})
+                      AND worker_id = %s
+                      AND form_status = 'PROCESSING'
+                    RETURNING id
+                """, (LEASE_SECONDS, held, WORKER_ID))
+                renewed = [str(r[0]) for r in cur.fetchall()]
+            conn.commit()
+        self.metrics["heartbeats"] += 1
+        lost = [cid for cid in held if str(cid) not in renewed]
+        if lost:
+            # Either the job already finished or a reaper took it; stop renewing either way.
+            with self._lock:
+                self._held.difference_update(lost)
+            self.metrics["leases_lost"] += len(lost)
+            logger.info(f"Stopped renewing leases no longer held by {WORKER_ID}: {lost}")
+
+    def _run(self):
+        next_reap = 0
+        while not self._stop.is_set():
+            try:
+                self.heartbeat()
+            except Exception as e:
+                self.metrics["heartbeat_errors"] += 1
+                logger.error(f"Lease heartbeat failed: {e}")
+            if time.monotonic() >= next_reap:
+                next_reap = time.monotonic() + REAPER_INTERVAL
+                try:
+                    self.metrics["reaped"] += reap_expired_leases(db_timeout=HEARTBEAT_DB_TIMEOUT)
+                except Exception as e:
+                    logger.error(f"Lease reaper failed: {e}")
+            self._stop.wait(HEARTBEAT_INTERVAL)
+
+    def start(self):
+        if self._thread is not None or not PSYCOPG2_AVAILABLE:
+            return
+        self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with db_connection() as conn:
+            if not conn:
+                return
+            try:
+                cur = conn.cursor()
+                cur.execute(
+                    "UPDATE workers SET status = 'stopped', active_jobs = 0, last_heartbeat_at = NOW() WHERE worker_id = %s",
+                    (WORKER_ID,)
+                )
+                conn.commit()
+            except Exception as e:
+                logger.warning(f"Could not mark worker {WORKER_ID} stopped: {e}")
+
+
+_LEASE_MANAGER = None
+_LEASE_MANAGER_LOCK = threading.Lock()
+
+
+def get_lease_manager():
+    global _LEASE_MANAGER
+    with _LEASE_MANAGER_LOCK:
+        if _LEASE_MANAGER is None:
+            _LEASE_MANAGER = LeaseManager()
+        return _LEASE_MANAGER
 
 
 def get_job_by_id(contact_id):
     """Fetch a job row by id without locking."""
     if not PSYCOPG2_AVAILABLE:
         return None
-    conn = _get_db_conn()
-    if not conn:
-        return None
-    try:
-        from psycopg2.extras import RealDictCursor
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-    except Exception:
-        cur = conn.cursor()
-    try:
-        cur.execute("SELECT * FROM contact_urls WHERE id = %s", (contact_id,))
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
-        if not row:
+    columns = contact_columns_sql()
+    with db_connection() as conn:
+        if not conn:
             return None
-        return dict(row) if hasattr(row, 'keys') else dict(zip([c[0] for c in cur.description], row))
-    except Exception as e:
         try:
-            conn.close()
+            from psycopg2.extras import RealDictCursor
+            cur = conn.cursor(cursor_factory=RealDictCursor)
         except Exception:
-            pass
-        logger.error(f"get_job_by_id failed: {e}")
-        return None
+            cur = conn.cursor()
+        try:
+            cur.execute(f"SELECT {columns} FROM contact_urls WHERE id = %s", (contact_id,))
+            row = cur.fetchone()
+            cur.close()
+            if not row:
+                return None
+            return dict(row) if hasattr(row, 'keys') else dict(zip([c[0] for c in cur.description], row))
+        except Exception as e:
+            logger.error(f"get_job_by_id failed: {e}")
+            return None
 
 
 def try_lock_job(contact_id):
     logger.info(f"Going for connection:")
-    conn = _get_db_conn()
+    columns = contact_columns_sql()
+    with db_connection() as conn:
+        if not conn:
+            return None
 
-    if not conn:
-        return None
+        require_migration(conn, "leases")
+        from psycopg2.extras import RealDictCursor
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+
+        # cur.execute("""
+        #     UPDATE contact_urls
+        #     SET form_status='PROCESSING',
+        #         worker_id=%s,
+        #         0=NOW()
+        #     WHERE id=%s
+        #       AND form_status='PENDING'
+        #       AND retry_count < %s
+        #     RETURNING *;
+        # """, (WORKER_ID, contact_id, MAX_RETRIES))
+        cur.execute(f"""
+                   UPDATE contact_urls
+                   SET form_status = 'PROCESSING',
+                       worker_id = %s,
+                       locked_at = NOW(),
+                       lease_expires_at = NOW() + %s * INTERVAL '1 second'
+                   WHERE id = (
+                       SELECT id
+                       FROM contact_urls
+                       WHERE form_status = 'Queued' and id= %s
+                       ORDER BY created_at ASC
+                       LIMIT 1
+                       FOR UPDATE SKIP LOCKED
+                   )
+                   RETURNING {columns};
+               """, (WORKER_ID,LEASE_SECONDS,contact_id,))
 
-    from psycopg2.extras import RealDictCursor
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
-    # cur.execute("""
-    #     UPDATE contact_urls
-    #     SET form_status='PROCESSING',
-    #         worker_id=%s,
-    #         0=NOW()
-    #     WHERE id=%s
-    #       AND form_status='PENDING'
-    #       AND retry_count < %s
-    #     RETURNING *;
-    # """, (WORKER_ID, contact_id, MAX_RETRIES))
-    cur.execute("""
-               UPDATE contact_urls
-               SET form_status = 'PROCESSING',
-                   worker_id = %s,
-                   locked_at = NOW()
-               WHERE id = (
-                   SELECT id
-                   FROM contact_urls
-                   WHERE form_status = 'Queued' and id= %s
-                   ORDER BY created_at ASC
-                   LIMIT 1
-                   FOR UPDATE SKIP LOCKED
-               )
-               RETURNING *;
-           """, (WORKER_ID,contact_id,))
-
-    row = cur.fetchone()
-    conn.commit()
-    conn.close()
+        row = cur.fetchone()
+        conn.commit()
     logger.info(f"contact_urls Updated to Pending: {row}")
     return dict(row) if row else None
 
+
+def claim_jobs(claims):
+    """Lock every Queued job in `claims` for this worker in a single statement.
+
+    `claims` is a list of (contact_id, message_id, receipt_handle). The claim also
+    writes the PROCESSING metadata that update_aws_job_metadata would otherwise
+    send per job. Returns ({contact_id: job}, busy_ids) where busy_ids are the
+    unclaimed jobs that another worker still holds (or may still retry).
+    """
+    if not claims or not PSYCOPG2_AVAILABLE:
+        return {}, set()
+    columns = contact_columns_sql(alias="c")
+    ids_sql = contact_id_array_sql()
+    types = contact_column_types()
+    id_cast = f"::{types['id']}" if "id" in types else ""
+    with db_connection() as conn:
+        if not conn:
+            return {}, set()
+        require_migration(conn, "leases")
+        from psycopg2.extras import RealDictCursor
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        values_sql = ", ".join(cur.mogrify("(%s, %s, %s)", claim).decode() for claim in claims)
+        cur.execute(f"""
+            UPDATE contact_urls AS c
+            SET form_status = 'PROCESSING',
+                status = 'PROCESSING',
+                worker_id = %s,
+                locked_at = NOW(),
+                lease_expires_at = NOW() + %s * INTERVAL '1 second',
+                worker_started_at = NOW(),
+                sqs_message_id = v.claim_message_id,
+                sqs_receipt_handle = v.claim_receipt,
+                sqs_queue_url = %s,
+                aws_region = %s,
+                worker_instance_ip = %s,
+                updated_at = NOW()
+            FROM (VALUES {values_sql}) AS v(claim_id, claim_message_id, claim_receipt)
+            WHERE c.id = v.claim_id{id_cast}
+              AND c.id IN (
+                  SELECT id
+                  FROM contact_urls
+                  WHERE form_status = 'Queued' AND id = ANY({ids_sql})
+                  FOR UPDATE SKIP LOCKED
+              )
+            RETURNING {columns};
+        """, (WORKER_ID, LEASE_SECONDS, get_queue().url, AWS_REGION, get_instance_private_ip(),
+              [claim[0] for claim in claims]))
+        rows = cur.fetchall()
+        conn.commit()
+        jobs = {str(row["id"]): dict(row) for row in rows}
+        busy = set()
+        unclaimed = [claim[0] for claim in claims if str(claim[0]) not in jobs]
+        if unclaimed:
+            # Jobs still PROCESSING (or Queued but locked right now) belong to someone
+            # else; their message must come back later rather than be deleted.
+            cur.execute(
+                f"SELECT id FROM contact_urls WHERE id = ANY({ids_sql}) AND form_status IN ('PROCESSING', 'Queued')",
+                (unclaimed,)
+            )
+            busy = {str(row["id"]) for row in cur.fetchall()}
+            conn.commit()
+    logger.info(f"Claimed {len(rows)} of {len(claims)} job(s), {len(busy)} busy elsewhere")
+    return jobs, busy
+
+_INSTANCE_PRIVATE_IP = None
+
+
 def get_instance_private_ip():
+    global _INSTANCE_PRIVATE_IP
+    if _INSTANCE_PRIVATE_IP is not None:
+        return _INSTANCE_PRIVATE_IP
     try:
         import socket
         # r = requests.get(
@@ -1886,10 +4048,177 @@ def get_instance_private_ip():
         s.connect(("8.8.8.8", 80))
         ip = s.getsockname()[0]
         s.close()
+        _INSTANCE_PRIVATE_IP = ip
         return ip
 
     except Exception:
         return "unknown"
+
+
+class StatusJournal:
+    """Write-behind buffer for contact_urls column updates.
+
+    `record()` merges field changes per job (later values win), and a background
+    thread flushes everything pending every JOURNAL_FLUSH_INTERVAL seconds. A flush
+    groups jobs by the set of columns they touch and writes each group with one
+    `UPDATE ... FROM (VALUES ...)`. Callers that need a change on disk before they
+    continue (taking the PROCESSING lock, deleting the SQS message) pass
+    `durable=True` or call `flush()` for their job ids.
+    """
+
+    def __init__(self, interval=JOURNAL_FLUSH_INTERVAL, batch_size=JOURNAL_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self._pending = {}
+        self._attempts = {}
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._thread = None
+        self.metrics = {"records": 0, "flushes": 0, "rows_written": 0, "statements": 0, "dropped": 0}
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="status-journal", daemon=True)
+        self._thread.start()
+
+    def record(self, contact_id, fields, durable=False):
+        """Buffer `fields` ({column: value}) for `contact_id`; write now if `durable`."""
+        if contact_id in _ABORTED_JOBS:
+            return
+        fields = dict(fields, updated_at=datetime.now(timezone.utc))
+        with self._cond:
+            self._pending.setdefault(contact_id, {}).update(fields)
+            self.metrics["records"] += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        if durable or self.interval <= 0 or self._closed:
+            self.flush([contact_id], raise_errors=durable)
+
+    def _take(self, contact_ids=None):
+        with self._cond:
+            if contact_ids is None:
+                entries, self._pending = self._pending, {}
+            else:
+                entries = {cid: self._pending.pop(cid) for cid in contact_ids if cid in self._pending}
+        return entries
+
+    def discard(self, contact_ids):
+        """Forget pending changes for `contact_ids` without writing them."""
+        self._take(contact_ids)
+
+    def _requeue(self, entries):
+        with self._cond:
+            for cid, fields in entries.items():
+                attempts = self._attempts.get(cid, 0) + 1
+                if attempts >= JOURNAL_MAX_ATTEMPTS:
+                    logger.error(f"Dropping journaled update for {cid} after {attempts} attempts: {fields}")
+                    self._attempts.pop(cid, None)
+                    self.metrics["dropped"] += 1
+                    continue
+                self._attempts[cid] = attempts
+                # Anything recorded since the failed flush is newer and wins.
+                merged = dict(fields)
+                merged.update(self._pending.get(cid, {}))
+                self._pending[cid] = merged
+
+    def flush(self, contact_ids=None, raise_errors=False):
+        """Write pending changes (all, or only `contact_ids`) and return how many rows were sent."""
+        with self._write_lock:
+            entries = self._take(contact_ids)
+            if not entries:
+                return 0
+            failed, error = self._write(entries)
+            if failed:
+                self._requeue(failed)
+                if raise_errors:
+                    raise RuntimeError(f"Status journal flush failed: {error}")
+            with self._cond:
+                for cid in entries:
+                    if cid not in failed:
+                        self._attempts.pop(cid, None)
+                self.metrics["flushes"] += 1
+                self.metrics["rows_written"] += len(entries) - len(failed)
+            return len(entries) - len(failed)
+
+    def _write(self, entries):
+        groups = {}
+        for cid, fields in entries.items():
+            groups.setdefault(tuple(sorted(fields)), []).append((cid, fields))
+        types = contact_column_types()
+        failed, error = {}, None
+        with db_connection() as conn:
+            if not conn:
+                return dict(entries), "no DB connection"
+            from psycopg2.extras import execute_values
+            cur = conn.cursor()
+            for columns, rows in groups.items():
+                sql = self._update_sql(columns, types)
+                try:
+                    execute_values(
+                        cur, sql,
+                        [(cid,) + tuple(fields[c] for c in columns) for cid, fields in rows],
+                        page_size=self.batch_size
+                    )
+                    conn.commit()
+                    self.metrics["statements"] += 1
+                except Exception as e:
+                    conn.rollback()
+                    logger.error(f"Status journal write failed for {len(rows)} job(s): {e}")
+                    failed.update(rows)
+                    error = e
+        return failed, error
+
+    @staticmethod
+    def _update_sql(columns, types):
+        def quote(name):
+            return '"%s"' % name.replace('"', '""')
+
+        def cast(name):
+            return f"::{types[name]}" if name in types else ""
+
+        assignments = ", ".join(f"{quote(c)} = v.{quote(c)}{cast(c)}" for c in columns)
+        names = ", ".join(["id"] + [quote(c) for c in columns])
+        return (
+            f"UPDATE contact_urls AS t SET {assignments} "
+            f"FROM (VALUES %s) AS v({names}) WHERE t.id = v.id{cast('id')}"
+        )
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                if len(self._pending) < self.batch_size:
+                    self._cond.wait(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Status journal flush error: {e}")
+
+    def close(self, timeout=10):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+
+_STATUS_JOURNAL = None
+_STATUS_JOURNAL_LOCK = threading.Lock()
+
+
+def get_status_journal():
+    global _STATUS_JOURNAL
+    with _STATUS_JOURNAL_LOCK:
+        if _STATUS_JOURNAL is None:
+            _STATUS_JOURNAL = StatusJournal()
+            _STATUS_JOURNAL.start()
+        return _STATUS_JOURNAL
+
+
 def update_aws_job_metadata(
     contact_id,
     message_id=None,
@@ -1898,118 +4227,205 @@ def update_aws_job_metadata(
     started=False,
     completed=False,job=None,ERROR=None,screenshot_bytes=None,captcha_solved=None
 ):
-    conn = _get_db_conn()
-    if not conn:
+    if not PSYCOPG2_AVAILABLE:
         return
 
-    fields = []
-    values = []
-    INSTANCE_PRIVATE_IP = get_instance_private_ip()
+    # Timestamps are taken when the change is recorded, not when the journal flushes it.
+    utc_now = datetime.now(timezone.utc)
+    fields = {}
     if message_id:
-        fields.append("sqs_message_id=%s")
-        values.append(message_id)
+        fields["sqs_message_id"] = message_id
 
     if receipt_handle:
-        fields.append("sqs_receipt_handle=%s")
-        values.append(receipt_handle)
-
-    if status:
-        fields.append("form_status=%s")
-        values.append(status)
+        fields["sqs_receipt_handle"] = receipt_handle
 
     if status:
-        fields.append("status=%s")
-        values.append(status)
+        fields["form_status"] = status
+        fields["status"] = status
 
     if started:
-        fields.append("worker_started_at=NOW()")
+        fields["worker_started_at"] = utc_now
+
+    if completed:
+        fields["worker_completed_at"] = utc_now
+        fields["lease_expires_at"] = None
+        fields["submission_time"] = utc_now
+
+    if ERROR:
+        fields["last_error"] = ERROR
+
+    if captcha_solved:
+        fields["captcha_solved"] = f'{captcha_solved}'
+
+    if screenshot_bytes:
+        # Blob goes to the content-addressed store; the row only keeps the reference.
+        with db_connection() as conn:
+            if conn:
+                require_migration(conn, "screenshots")
+                fields["screenshot_ref"] = store_screenshot_blob(conn.cursor(), screenshot_bytes, "image/png")
+                conn.commit()
 
     if completed:
-        fields.append("worker_completed_at=NOW()")
-        fields.append("submission_time=NOW()")
+        try:
+            user_timezone = get_timezone(job['time_zone'])
+            if user_timezone is None:
+                raise ValueError(f"unknown time_zone {job['time_zone']!r}")
+            user_completed_time = utc_now.astimezone(user_timezone)
+            fields["user_completed_time"] = str(user_completed_time)
+        except Exception as e:
+            logger.info(f"Error in time values: {contact_id} {e}")
+
+    fields["sqs_queue_url"] = get_queue().url
+    fields["aws_region"] = AWS_REGION
+    fields["worker_instance_ip"] = get_instance_private_ip()
+
+    logger.info(f"Field details to updated DB : {contact_id}")
+
+    get_status_journal().record(contact_id, fields, durable=status in JOURNAL_IMMEDIATE_STATUSES)
+
+
+SCREENSHOT_EXTENSIONS = {"image/jpeg": "jpg", "image/webp": "webp", "image/png": "png"}
+
+
+def store_screenshot_blob(cur, data, content_type):
+    """Store `data` once per content hash and return its reference ("db:<sha>" or "fs:<path>")."""
+    import hashlib
+    import psycopg2
+    digest = hashlib.sha256(data).hexdigest()
+    if SCREENSHOT_STORE == "db":
+        cur.execute(
+            """
+            INSERT INTO contact_screenshots (sha256, content_type, size_bytes, data)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (sha256) DO NOTHING
+            """,
+            (digest, content_type, len(data), psycopg2.Binary(data))
+        )
+        return f"db:{digest}"
+
+    relative = f"{digest[:2]}/{digest}.{SCREENSHOT_EXTENSIONS.get(content_type, 'bin')}"
+    path = os.path.join(SCREENSHOT_STORE, relative)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return f"fs:{relative}"
+
 
-    if ERROR:
-        fields.append("last_error=%s")
-        values.append(ERROR)
+def save_job_screenshot(contact_id, screenshot_bytes, content_type="image/png"):
+    with db_connection() as conn:
+        if not conn:
+            return
+        require_migration(conn, "screenshots")
+        cur = conn.cursor()
+        ref = store_screenshot_blob(cur, screenshot_bytes, content_type)
+        conn.commit()
+    get_status_journal().record(contact_id, {"screenshot_ref": ref})
 
-    if captcha_solved:
-        fields.append("captcha_solved=%s")
-        values.append(f'{captcha_solved}')
 
-    if screenshot_bytes:
-        fields.append("screenshot_img=%s")
-        values.append(psycopg2.Binary(screenshot_bytes))
+def load_screenshot(ref):
+    """Return the blob bytes for a screenshot reference, or None."""
+    if not ref:
+        return None
+    kind, _, key = ref.partition(":")
+    if kind == "fs":
+        try:
+            with open(os.path.join(SCREENSHOT_STORE, key), "rb") as f:
+                return f.read()
+        except OSError as e:
+            logger.warning(f"Screenshot {ref} not readable: {e}")
+            return None
+    with db_connection() as conn:
+        if not conn:
+            return None
+        cur = conn.cursor()
+        cur.execute("SELECT data FROM contact_screenshots WHERE sha256 = %s", (key,))
+        row = cur.fetchone()
+        return bytes(row[0]) if row else None
 
 
-    if completed:
+def load_job_screenshot(contact_id):
+    """Lazily load a job's screenshot; rows written before the store fall back to screenshot_img."""
+    with db_connection() as conn:
+        if not conn:
+            return None
+        cur = conn.cursor()
         try:
-            utc_now = datetime.utcnow().replace(tzinfo=pytz.UTC)
-            user_timezone = pytz.timezone(job['time_zone'])
-            user_completed_time = utc_now.astimezone(user_timezone)
-            fields.append("user_completed_time=%s")
-            values.append(str(user_completed_time))
-        except Exception as e:
-            logger.info(f"Error in time values: {contact_id} {e}")
+            cur.execute("SELECT screenshot_ref FROM contact_urls WHERE id = %s", (contact_id,))
+            row = cur.fetchone()
+            ref = row[0] if row else None
+        except Exception:
+            conn.rollback()
+            ref = None
+        if not ref:
+            cur.execute("SELECT screenshot_img FROM contact_urls WHERE id = %s", (contact_id,))
+            row = cur.fetchone()
+            return bytes(row[0]) if row and row[0] else None
+    # Resolve the reference after the connection is back in the pool.
+    return load_screenshot(ref)
+
+
+class ScreenshotWriter:
+    """Background thread that decodes and persists screenshots so jobs don't wait on the upload."""
+
+    def __init__(self, max_pending=100):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="screenshot-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, contact_id, screenshot_b64, content_type=None):
+        content_type = content_type or f"image/{SCREENSHOT_FORMAT}"
+        try:
+            self._queue.put_nowait((contact_id, screenshot_b64, content_type))
+        except queue.Full:
+            logger.warning(f"Screenshot queue full, dropping screenshot for {contact_id}")
+
+    def _run(self):
+        import base64
+        while True:
+            contact_id, screenshot_b64, content_type = self._queue.get()
+            try:
+                save_job_screenshot(contact_id, base64.b64decode(screenshot_b64), content_type)
+                logger.info(f"Saved screenshot for {contact_id}")
+            except Exception as e:
+                logger.warning(f"Saving screenshot failed for {contact_id}: {e}")
+            finally:
+                self._queue.task_done()
 
-    fields.extend([
-        "sqs_queue_url=%s",
-        "aws_region=%s",
-        "worker_instance_ip=%s"
-    ])
+    def flush(self, timeout=30):
+        """Wait up to `timeout` seconds for queued screenshots to be written."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.1)
+        return not self._queue.unfinished_tasks
 
-    logger.info(f"Field details to updated DB : {contact_id}")
 
-    values.extend([QUEUE_URL, AWS_REGION, INSTANCE_PRIVATE_IP])
+_SCREENSHOT_WRITER = None
+_SCREENSHOT_WRITER_LOCK = threading.Lock()
 
-    sql = f"""
-        UPDATE contact_urls
-        SET {", ".join(fields)}, updated_at=NOW()
-        WHERE id=%s
-    """
-    values.append(contact_id)
 
-    cur = conn.cursor()
-    cur.execute(sql, values)
-    conn.commit()
-    conn.close()
+def get_screenshot_writer():
+    global _SCREENSHOT_WRITER
+    with _SCREENSHOT_WRITER_LOCK:
+        if _SCREENSHOT_WRITER is None:
+            _SCREENSHOT_WRITER = ScreenshotWriter()
+        return _SCREENSHOT_WRITER
 
 
 def update_scraping_result(contact_id, found_url=None):
     """Mark scraping as DONE and optionally update contact_us_url."""
-    conn = _get_db_conn()
-    if not conn:
+    if not PSYCOPG2_AVAILABLE:
         return
+    if found_url:
+        fields = {"contact_us_url": found_url, "scraping_status": 'DONE'}
+    else:
+        fields = {"scraping_status": 'NOT FOUND'}
     try:
-        cur = conn.cursor()
-        if found_url:
-            cur.execute(
-                """
-                UPDATE contact_urls
-                SET contact_us_url = %s,
-                    scraping_status = %s,
-                    updated_at = NOW()
-                WHERE id = %s
-                """,
-                (found_url, 'DONE', contact_id)
-            )
-        else:
-            cur.execute(
-                """
-                UPDATE contact_urls
-                SET scraping_status = %s,
-                    updated_at = NOW()
-                WHERE id = %s
-                """,
-                ('NOT FOUND', contact_id)
-            )
-        conn.commit()
+        get_status_journal().record(contact_id, fields)
     except Exception as e:
         logger.warning(f"Failed to update scraping_result for {contact_id}: {e}")
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
 
 
 def find_contact_url_in_html(html, base_url):
@@ -2017,6 +4433,7 @@ def find_contact_url_in_html(html, base_url):
     candidates = []
     try:
         if LXML_AVAILABLE:
+            import lxml.html as lh
             doc = lh.fromstring(html)
             # look for links with 'contact' in text or href
             nodes = doc.xpath("//a[contains(translate(normalize-space(text()), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'contact')]")
@@ -2065,6 +4482,7 @@ def find_contact_url_in_html(html, base_url):
 
 def validate_url(url):
     """Check that URL returns a successful HTML response."""
+    import requests
     try:
         headers = {'User-Agent': 'Mozilla/5.0 (compatible; LinkChecker/1.0)'}
         # some servers don't like HEAD; try GET
@@ -2078,6 +4496,7 @@ def validate_url(url):
 
 def get_or_scrape_form_url(job):
     """Return contact_us_url: existing value, or attempt to discover from website via HTTP then Selenium."""
+    import requests
     existing = job.get('contact_us_url')
     if existing:
         return existing
@@ -2104,51 +4523,56 @@ def get_or_scrape_form_url(job):
 
     # Fallback to Selenium if available
     if SELENIUM_AVAILABLE:
-        driver = None
         try:
-            chrome_options = _setup_chrome_options()
-            from selenium.webdriver.chrome.service import Service
-            from webdriver_manager.chrome import ChromeDriverManager
-            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-            driver.get(website)
-            time.sleep(3)
-            html = driver.page_source
-            current_url = driver.current_url or website
+            with job_driver_pool().lease() as driver:
+                driver.get(website)
+                wait_for_stage(driver, "scrape")
+                html = driver.page_source
+                current_url = driver.current_url or website
             found = find_contact_url_in_html(html, current_url)
             if found and validate_url(found):
                 update_scraping_result(job.get('id'), found)
                 return found
         except Exception as e:
             logger.debug(f"Selenium scrape failed for {website}: {e}")
-        finally:
-            try:
-                if driver:
-                    driver.quit()
-            except Exception:
-                pass
 
     # mark scraping done even if nothing found
     update_scraping_result(job.get('id'), found)
     return found
 
-def should_run_job(job_row):
-    """Return True if job should run based on scheduled_time and time_zone.
+@lru_cache(maxsize=512)
+def get_timezone(tz_name):
+    """Timezone object for `tz_name` (pytz if installed, else zoneinfo), or None if unknown. Cached."""
+    if not tz_name:
+        return None
+    try:
+        if PYTZ_AVAILABLE:
+            import pytz
+            return pytz.timezone(tz_name)
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(tz_name)
+    except Exception as e:
+        logger.warning(f"Invalid timezone {tz_name}: {e}")
+        return None
+
+
+def job_due_at(job_row):
+    """UTC instant a job becomes due, or None if it has no (usable) scheduled_time.
 
-    Behavior: get current server UTC time, convert to job's timezone, then compare
-    to scheduled_time (interpreted as local time in that timezone). If scheduled_time
-    is missing, return True.
+    A naive scheduled_time is local time in the job's time_zone (UTC without one).
     """
     if not job_row:
-        return True
+        return None
     sched = job_row.get('scheduled_time')
     tz_name = job_row.get('time_zone') or job_row.get('timezone')
     if not sched:
-        return True
+        return None
 
     # Parse scheduled_time if string
     try:
         if isinstance(sched, str):
             if DATEUTIL_AVAILABLE:
+                from dateutil import parser as dateutil_parser
                 scheduled_dt = dateutil_parser.parse(sched)
             else:
                 # try ISO format
@@ -2156,204 +4580,1097 @@ def should_run_job(job_row):
         elif isinstance(sched, datetime):
             scheduled_dt = sched
         else:
-            return True
+            return None
     except Exception as e:
         logger.warning(f"Could not parse scheduled_time {sched}: {e}")
-        return True
+        return None
 
-    # Determine timezone object
-    tz_obj = None
-    if tz_name:
+    tz_obj = get_timezone(tz_name)
+
+    # Normalize scheduled_dt: if naive, treat as local time in tz_obj
+    if scheduled_dt.tzinfo is None:
         try:
-            if PYTZ_AVAILABLE:
-                tz_obj = pytz.timezone(tz_name)
+            if tz_obj is not None and hasattr(tz_obj, 'localize'):
+                # pytz zones need localize() to pick the right UTC offset
+                scheduled_dt = tz_obj.localize(scheduled_dt)
+            elif tz_obj is not None:
+                scheduled_dt = scheduled_dt.replace(tzinfo=tz_obj)
             else:
-                from zoneinfo import ZoneInfo
-                tz_obj = ZoneInfo(tz_name)
-        except Exception as e:
-            logger.warning(f"Invalid timezone {tz_name}: {e}")
-            tz_obj = None
+                # no tz info: assume UTC
+                scheduled_dt = scheduled_dt.replace(tzinfo=timezone.utc)
+        except Exception:
+            scheduled_dt = scheduled_dt.replace(tzinfo=timezone.utc)
+    return scheduled_dt.astimezone(timezone.utc)
+
+
+def job_due_delay(job_row):
+    """Seconds until the job is due (0 when due now or unscheduled)."""
+    due = job_due_at(job_row)
+    if due is None:
+        return 0.0
+    return max(0.0, (due - datetime.now(timezone.utc)).total_seconds())
 
-    # Current server time in UTC
+
+def should_run_job(job_row):
+    """Return True if job should run based on scheduled_time and time_zone.
+
+    scheduled_time is interpreted as local time in the job's timezone (see
+    job_due_at). If scheduled_time is missing or unusable, return True.
+    """
+    due = job_due_at(job_row)
+    if due is None:
+        return True
     now_utc = datetime.now(timezone.utc)
+    run = now_utc >= due
+    if not run:
+        tz_name = job_row.get('time_zone') or job_row.get('timezone')
+        logger.info(f"Job {job_row.get('id')} scheduled for {due} (tz {tz_name}); current time {now_utc}; skipping.")
+    return run
+class SqsAcker:
+    """Coalesces SQS deletes into delete_message_batch calls of up to 10 receipts.
+
+    A delete waits at most SQS_ACK_INTERVAL seconds for others to share its call.
+    Losing a pending ack only means a redelivery, which claim_jobs then drops.
+    """
 
-    # Convert now to target tz if available
-    if tz_obj:
+    def __init__(self, interval=SQS_ACK_INTERVAL):
+        self.interval = interval
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self.metrics = {"acked": 0, "calls": 0, "failed": 0}
+        self._thread = threading.Thread(target=self._run, name="sqs-acker", daemon=True)
+        self._thread.start()
+
+    def ack(self, messages):
+        with self._cond:
+            self._pending.extend(msg["ReceiptHandle"] for msg in messages)
+            if len(self._pending) >= 10 or self._closed:
+                self._cond.notify()
+
+    def flush(self):
+        with self._cond:
+            receipts, self._pending = self._pending, []
+        if not receipts:
+            return
         try:
-            now_in_tz = now_utc.astimezone(tz_obj)
+            failed = get_queue().delete_batch(receipts)
+        except Exception as e:
+            logger.error(f"delete_batch failed: {e}")
+            failed = receipts
+        self.metrics["calls"] += (len(receipts) + 9) // 10
+        self.metrics["acked"] += len(receipts) - len(failed)
+        self.metrics["failed"] += len(failed)
+        if failed:
+            logger.warning(f"Queue refused {len(failed)} delete(s): {failed}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                if len(self._pending) < 10:
+                    self._cond.wait(self.interval)
+            self.flush()
+
+    def close(self, timeout=5):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self.flush()
+
+
+_SQS_ACKER = None
+_SQS_ACKER_LOCK = threading.Lock()
+
+
+def get_sqs_acker():
+    global _SQS_ACKER
+    with _SQS_ACKER_LOCK:
+        if _SQS_ACKER is None:
+            _SQS_ACKER = SqsAcker()
+        return _SQS_ACKER
+
+
+def claim_sqs_messages(messages):
+    """Claim the jobs behind a received batch and return the runnable (msg, job) pairs.
+
+    Unparseable messages, duplicates of a job already in the batch and jobs that
+    are already finished are acknowledged (deleted) in bulk rather than one by one.
+    Messages for jobs another worker still holds are hidden again until that
+    worker's lease could have lapsed.
+    """
+    claims, drop, seen = [], [], set()
+    for msg in messages:
+        try:
+            contact_id = str(json.loads(msg["Body"])["job_id"])
         except Exception:
-            # pytz requires localize for naive scheduled dt; keep fallback
-            now_in_tz = now_utc
-    else:
-        now_in_tz = now_utc
+            drop.append(msg)
+            continue
+        if contact_id in seen:
+            drop.append(msg)
+            continue
+        seen.add(contact_id)
+        claims.append((contact_id, msg))
+        logger.info(f"SQS Worker Processing for ID: {contact_id}")
+
+    jobs, busy = claim_jobs([(cid, msg.get("MessageId"), msg["ReceiptHandle"]) for cid, msg in claims])
+    claimed, deferred = [], []
+    for contact_id, msg in claims:
+        job = jobs.get(contact_id)
+        if job:
+            _ABORTED_JOBS.discard(job['id'])  # claimed again after an earlier attempt was abandoned
+            get_lease_manager().hold(job['id'])
+            get_visibility_extender().track(msg, job['id'])
+            claimed.append((msg, job))
+        elif contact_id in busy:
+            deferred.append((msg["ReceiptHandle"], LEASE_SECONDS + int(REAPER_INTERVAL)))
+        else:
+            # Already processed / taken by another worker
+            drop.append(msg)
+    if deferred:
+        change_message_visibility(deferred)
+    if drop:
+        get_sqs_acker().ack(drop)
+        logger.info(f"SQS Worker Deleted {len(drop)} message(s) with nothing to run: {WORKER_ID}")
+    return claimed
+
+
+def release_jobs(contact_ids):
+    """Hand jobs this worker holds back to Queued without counting a retry."""
+    if not contact_ids or not PSYCOPG2_AVAILABLE:
+        return 0
+    ids_sql = contact_id_array_sql()
+    with db_connection() as conn:
+        if not conn:
+            return 0
+        cur = conn.cursor()
+        cur.execute(f"""
+            UPDATE contact_urls
+            SET form_status = 'Queued',
+                status = 'Queued',
+                worker_id = NULL,
+                locked_at = NULL,
+                lease_expires_at = NULL,
+                updated_at = NOW()
+            WHERE id = ANY({ids_sql})
+              AND worker_id = %s
+              AND form_status = 'PROCESSING'
+        """, (list(contact_ids), WORKER_ID))
+        released = cur.rowcount
+        conn.commit()
+    for contact_id in contact_ids:
+        get_lease_manager().release(contact_id)
+    logger.info(f"Released {released} job(s) back to Queued")
+    return released
+
+
+def return_messages(messages):
+    """Make messages visible again right away (visibility 0) and stop extending them."""
+    for msg, job in messages:
+        if job is not None and _VISIBILITY_EXTENDER is not None:
+            _VISIBILITY_EXTENDER.untrack(job['id'])
+    change_message_visibility([(msg["ReceiptHandle"], 0) for msg, _ in messages])
+
+
+def job_domain(job):
+    """Host a job will hit, used as the politeness key (www. stripped)."""
+    url = job.get('contact_us_url') or job.get('form_url') or job.get('website_url') or job.get('website') or ""
+    if url and "://" not in url:
+        url = "http://" + url
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class JobScheduler:
+    """Orders claimed jobs for the executors: polite per host, fair across campaigns.
+
+    Each host has a token bucket (DOMAIN_RATE_PER_MINUTE, DOMAIN_BURST) and at most
+    DOMAIN_MAX_CONCURRENCY running jobs; a host that answered with a block page is
+    paused for DOMAIN_BLOCK_BACKOFF. Among the jobs whose host may start now,
+    `get()` picks by weighted fair queuing on campaign_name (CAMPAIGN_WEIGHTS),
+    so a flood from one campaign cannot starve the others. `put()` refuses a job
+    whose host could not start it within DOMAIN_MAX_LOCAL_WAIT, or that is not
+    due (scheduled_time) within that window, and returns the delay to defer it by
+    instead; jobs due sooner wait here and cost no browser time until then.
+    """
 
-    # Normalize scheduled_dt: if naive, treat as local time in tz_obj
-    if scheduled_dt.tzinfo is None:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._campaigns = {}
+        self._last_finish = {}
+        self._vtime = 0.0
+        self._seq = 0
+        self._domains = {}
+        self.metrics = {"dispatched": 0, "deferred": 0, "not_due": 0, "blocked": 0}
+
+    def _domain(self, host):
+        state = self._domains.get(host)
+        if state is None:
+            state = self._domains[host] = {
+                "tokens": DOMAIN_BURST, "updated": time.monotonic(), "active": 0, "queued": 0, "paused_until": 0.0,
+            }
+        return state
+
+    def _refill(self, state, now):
+        rate = DOMAIN_RATE_PER_MINUTE / 60.0
+        state["tokens"] = min(DOMAIN_BURST, state["tokens"] + (now - state["updated"]) * rate)
+        state["updated"] = now
+
+    def _prune(self, now):
+        """Forget idle hosts whose bucket is full again and campaigns with no backlog.
+
+        Such entries carry nothing a fresh one would not, and a long-running
+        worker would otherwise keep one per host and campaign it ever saw. With
+        nothing queued, virtual time jumps to the latest finish tag first.
+        """
+        for host in [h for h, state in self._domains.items() if not state["queued"] and not state["active"]]:
+            state = self._domains[host]
+            self._refill(state, now)
+            full = DOMAIN_RATE_PER_MINUTE <= 0 or state["tokens"] >= DOMAIN_BURST
+            if full and state["paused_until"] <= now:
+                del self._domains[host]
+        if not self._campaigns and self._last_finish:
+            # Nothing is backlogged: virtual time may catch up with every finish tag.
+            self._vtime = max(self._vtime, max(self._last_finish.values()))
+        for campaign in [c for c, finish in self._last_finish.items() if finish <= self._vtime]:
+            if campaign not in self._campaigns:
+                del self._last_finish[campaign]
+
+    def _wait_for(self, state, now, ahead=0):
+        """Seconds until the host could start one more job after `ahead` others."""
+        if DOMAIN_RATE_PER_MINUTE <= 0:
+            return max(0.0, state["paused_until"] - now)
+        rate = DOMAIN_RATE_PER_MINUTE / 60.0
+        missing = ahead + 1 - state["tokens"]
+        return max(state["paused_until"] - now, missing / rate if missing > 0 else 0.0)
+
+    def put(self, msg, job):
+        """Queue a claimed job, or return the seconds it should be deferred by."""
+        host = job_domain(job)
+        campaign = job.get('campaign_name') or ""
+        due_in = job_due_delay(job)
+        with self._cond:
+            now = time.monotonic()
+            self._prune(now)
+            if due_in > DOMAIN_MAX_LOCAL_WAIT:
+                self.metrics["not_due"] += 1
+                return due_in
+            state = self._domain(host)
+            self._refill(state, now)
+            # running jobs already spent their tokens; only queued ones are still ahead
+            wait = self._wait_for(state, now, ahead=state["queued"])
+            if wait > DOMAIN_MAX_LOCAL_WAIT:
+                self.metrics["deferred"] += 1
+                return wait
+            weight = max(0.01, float(CAMPAIGN_WEIGHTS.get(campaign, 1)))
+            start = max(self._vtime, self._last_finish.get(campaign, 0.0))
+            finish = start + 1.0 / weight
+            self._last_finish[campaign] = finish
+            self._seq += 1
+            self._campaigns.setdefault(campaign, []).append((finish, self._seq, start, host, now + due_in, msg, job))
+            state["queued"] += 1
+            self._cond.notify()
+        return None
+
+    def _pick(self, now):
+        best, wake = None, None
+        for campaign, items in self._campaigns.items():
+            for index, item in enumerate(items):
+                state = self._domains[item[3]]
+                self._refill(state, now)
+                if state["active"] >= DOMAIN_MAX_CONCURRENCY:
+                    continue
+                wait = max(item[4] - now, self._wait_for(state, now))
+                if wait > 0:
+                    wake = wait if wake is None else min(wake, wait)
+                    continue
+                if best is None or item[:2] < best[2][:2]:
+                    best = (campaign, index, item)
+                break
+        return best, wake
+
+    def get(self, timeout=None):
+        """Block until a job may start and return (msg, job); None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                best, wake = self._pick(now)
+                if best is not None:
+                    campaign, index, (finish, _, start, host, _, msg, job) = best
+                    del self._campaigns[campaign][index]
+                    if not self._campaigns[campaign]:
+                        del self._campaigns[campaign]
+                    state = self._domains[host]
+                    state["tokens"] -= 1
+                    state["queued"] -= 1
+                    state["active"] += 1
+                    self._vtime = max(self._vtime, start)
+                    self.metrics["dispatched"] += 1
+                    return msg, job
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        return None
+                    wake = remaining if wake is None else min(wake, remaining)
+                self._cond.wait(wake)
+
+    def done(self, job, result=None):
+        """Release the job's host slot; a block page pauses the host."""
+        with self._cond:
+            state = self._domain(job_domain(job))
+            state["active"] = max(0, state["active"] - 1)
+            if isinstance(result, dict) and result.get('blocked'):
+                state["paused_until"] = time.monotonic() + DOMAIN_BLOCK_BACKOFF
+                self.metrics["blocked"] += 1
+                logger.warning(f"{job_domain(job)} blocked us; pausing it for {DOMAIN_BLOCK_BACKOFF:.0f}s")
+            self._cond.notify_all()
+
+    def drain(self):
+        """Remove and return every queued (msg, job)."""
+        with self._cond:
+            items = [(item[5], item[6]) for items in self._campaigns.values() for item in items]
+            for items in self._campaigns.values():
+                for item in items:
+                    self._domains[item[3]]["queued"] -= 1
+            self._campaigns = {}
+            return items
+
+
+class LaneMetrics:
+    """Job count, throughput and latency (mean, p50, p95 over the last `window` jobs) for one executor lane."""
+
+    def __init__(self, name, window=500):
+        import collections
+        self.name = name
+        self._latencies = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.counts = {"jobs": 0, "succeeded": 0}
+
+    def record(self, seconds, result=None):
+        with self._lock:
+            self._latencies.append(seconds)
+            self.counts["jobs"] += 1
+            if isinstance(result, dict) and result.get('success'):
+                self.counts["succeeded"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counts = dict(self.counts)
+        elapsed = max(1e-6, time.monotonic() - self._started)
+        snap = {"lane": self.name, **counts, "jobs_per_min": round(counts["jobs"] * 60 / elapsed, 2)}
+        if latencies:
+            snap.update(
+                latency_mean_s=round(sum(latencies) / len(latencies), 2),
+                latency_p50_s=round(latencies[len(latencies) // 2], 2),
+                latency_p95_s=round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+            )
+        return snap
+
+
+class CaptchaLane:
+    """Queue, browser pool and solver budget for jobs that hit a captcha.
+
+    Captcha jobs take minutes, the rest seconds, so run_worker gives them their
+    own CAPTCHA_LANE_CONCURRENCY executors and DriverPool instead of letting them
+    tie up the main lane's browsers. A main-lane job that finds a reCAPTCHA on
+    its page hands itself off (see captcha_lane_handoff) and the host is
+    remembered for CAPTCHA_HOST_TTL, so that host's next jobs come here directly.
+    `submit()` defers a job back to the queue when CAPTCHA_LANE_BUFFER jobs are
+    already waiting or when CAPTCHA_SOLVES_PER_HOUR jobs started in the last hour.
+    Once `drain()` has run it refuses new jobs, so late hand-offs go back to the queue.
+    """
+
+    def __init__(self, concurrency=CAPTCHA_LANE_CONCURRENCY, buffer=CAPTCHA_LANE_BUFFER,
+                 solves_per_hour=CAPTCHA_SOLVES_PER_HOUR):
+        import collections
+        self.concurrency = max(1, concurrency)
+        self.buffer = max(0, buffer)
+        self.solves_per_hour = solves_per_hour
+        self.pool = DriverPool(size=self.concurrency)
+        self._queue = queue.Queue()
+        self._hosts = collections.OrderedDict()  # host -> monotonic time its captcha was last seen
+        self._solve_starts = collections.deque()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.latency = LaneMetrics("captcha")
+        self.metrics = {"handed_off": 0, "routed": 0, "lane_full": 0, "over_budget": 0}
+
+    def expects_captcha(self, job):
+        host = job_domain(job)
+        with self._lock:
+            seen = self._hosts.get(host)
+            if seen is not None and time.monotonic() - seen > CAPTCHA_HOST_TTL:
+                del self._hosts[host]
+                seen = None
+            return seen is not None
+
+    def note_captcha_host(self, job):
+        with self._lock:
+            self._hosts[job_domain(job)] = time.monotonic()
+            self._hosts.move_to_end(job_domain(job))
+            while len(self._hosts) > 1000:
+                self._hosts.popitem(last=False)
+
+    def _budget_wait(self, now):
+        """Seconds until the hourly solver budget allows another job to start (0 if it does now)."""
+        if self.solves_per_hour <= 0:
+            return 0
+        while self._solve_starts and now - self._solve_starts[0] >= 3600:
+            self._solve_starts.popleft()
+        if len(self._solve_starts) < self.solves_per_hour:
+            return 0
+        return 3600 - (now - self._solve_starts[0])
+
+    def submit(self, msg, job, handed_off=False):
+        """Queue a claimed job for the lane; return the delay it was deferred by instead, or None."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("captcha lane is drained")
+            self.metrics["handed_off" if handed_off else "routed"] += 1
+            if self._queue.qsize() < self.concurrency + self.buffer:
+                self._queue.put((msg, job))
+                return None
+            self.metrics["lane_full"] += 1
+        delay = CAPTCHA_LANE_RETRY_DELAY
+        defer_job(msg, job, delay)
+        return delay
+
+    def get(self):
+        """Next job allowed by the solver budget; over-budget jobs are deferred until it allows them."""
+        while True:
+            msg, job = self._queue.get()
+            with self._lock:
+                now = time.monotonic()
+                wait = self._budget_wait(now)
+                if not wait:
+                    self._solve_starts.append(now)
+                    return msg, job
+                self.metrics["over_budget"] += 1
+            logger.info(f"Captcha solver budget ({self.solves_per_hour}/h) used up; deferring {job['id']} by {wait:.0f}s")
+            try:
+                defer_job(msg, job, wait)
+            except Exception as e:
+                logger.error(f"Could not defer {job['id']}: {e}")
+
+    def drain(self):
+        """Close the lane to new jobs; remove and return every queued (msg, job)."""
+        items = []
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    return items
+
+
+_CAPTCHA_LANE = None
+
+
+def captcha_lane_handoff(job):
+    """True if the calling main-lane job should leave its captcha to the captcha lane."""
+    if _CAPTCHA_LANE is None or getattr(_JOB_CONTEXT, 'lane', None) != 'main':
+        return False
+    _CAPTCHA_LANE.note_captcha_host(job)
+    return True
+
+
+def job_driver_pool():
+    """DriverPool of the lane the calling executor belongs to."""
+    return getattr(_JOB_CONTEXT, 'driver_pool', None) or get_driver_pool()
+
+
+def defer_job(msg, job, delay):
+    """Hand a claimed job back to Queued and have its message come back after `delay` seconds.
+
+    Delays up to SQS's 900s DelaySeconds limit re-send the message and delete the
+    original, so parking doesn't add to its receive count (and redrive policy).
+    Longer delays hide the original for up to SQS_MAX_VISIBILITY; the job is
+    checked again when it reappears.
+    """
+    release_jobs([job['id']])
+    if _VISIBILITY_EXTENDER is not None:
+        _VISIBILITY_EXTENDER.untrack(job['id'])
+    delay = int(max(1, delay))
+    if delay <= 900:
         try:
-            if PYTZ_AVAILABLE and tz_obj:
-                scheduled_local = tz_obj.localize(scheduled_dt)
-            elif tz_obj:
-                scheduled_local = scheduled_dt.replace(tzinfo=tz_obj)
-            else:
-                # no tz info: assume UTC
-                scheduled_local = scheduled_dt.replace(tzinfo=timezone.utc)
-        except Exception:
-            scheduled_local = scheduled_dt.replace(tzinfo=timezone.utc)
-    else:
-        scheduled_local = scheduled_dt
+            if get_queue().send_batch([(msg["Body"], delay)]):
+                get_sqs_acker().ack([msg])
+                return
+        except Exception as e:
+            logger.warning(f"Re-enqueue of {job['id']} failed, hiding the message instead: {e}")
+    change_message_visibility([(msg["ReceiptHandle"], min(SQS_MAX_VISIBILITY, delay))])
 
-    # Compare now_in_tz (converted) with scheduled_local also converted to same tz
-    try:
-        if tz_obj and scheduled_local.tzinfo is not None:
-            scheduled_in_tz = scheduled_local.astimezone(tz_obj)
-        elif tz_obj and scheduled_local.tzinfo is None:
-            if PYTZ_AVAILABLE:
-                scheduled_in_tz = tz_obj.localize(scheduled_local.replace(tzinfo=None))
-            else:
-                scheduled_in_tz = scheduled_local.replace(tzinfo=tz_obj)
-        else:
-            scheduled_in_tz = scheduled_local
-    except Exception:
-        scheduled_in_tz = scheduled_local
 
-    # finally compare: run if now_in_tz >= scheduled_in_tz
+def retry_backoff_seconds(retry_count):
+    """Exponential backoff with jitter for the next delivery of a failed job's message."""
+    delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** max(0, (retry_count or 1) - 1)))
+    return int(min(SQS_MAX_VISIBILITY, delay + random.uniform(0, RETRY_BACKOFF_BASE)))
+
+
+def change_message_visibility(entries):
+    """Set visibility for [(receipt_handle, seconds)] with as few batch calls as possible."""
+    if not entries:
+        return
     try:
-        run = now_in_tz >= scheduled_in_tz
-        if not run:
-            logger.info(f"Job {job_row.get('id')} scheduled for {scheduled_in_tz} in tz {tz_name}; current time {now_in_tz}; skipping.")
-        return run
+        failed = get_queue().change_visibility_batch(entries)
+        if failed:
+            logger.warning(f"Queue refused {len(failed)} visibility change(s): {failed}")
     except Exception as e:
-        logger.warning(f"Comparison failed: {e}")
-        return True
-if __name__ == '__main__':
+        logger.error(f"change_visibility_batch failed: {e}")
 
 
+_JOB_CONTEXT = threading.local()
 
 
+def abandon_stalled_job(job_id):
+    """Give up a wedged job together with its message: stop its lease and its browser.
 
-    #todo for production -----------
+    Without this the lease heartbeat would keep the row PROCESSING while the
+    message is redelivered, and every delivery would find the job busy until the
+    receive count sent it to the DLQ. With the lease no longer renewed the reaper
+    puts the row back to Queued (counting a retry) within LEASE_SECONDS +
+    REAPER_INTERVAL, and quitting the browser makes the job thread unwind; the
+    abort marker keeps it from writing a status or acknowledging afterwards.
+    """
+    _ABORTED_JOBS.add(job_id)
+    if _STATUS_JOURNAL is not None:
+        _STATUS_JOURNAL.discard([job_id])
+    get_lease_manager().release(job_id)
+    for pool in live_driver_pools():
+        if pool.abort_job(job_id):
+            logger.warning(f"Quit the browser of stalled job {job_id}")
+
+
+def note_job_progress():
+    """Tell the visibility extender that the job on this thread is still moving."""
+    job_id = getattr(_JOB_CONTEXT, "job_id", None)
+    if job_id is not None and _VISIBILITY_EXTENDER is not None:
+        _VISIBILITY_EXTENDER.progress(job_id)
+
+
+class VisibilityExtender:
+    """Keeps claimed messages invisible while their jobs are buffered or progressing.
+
+    Messages are received with a short VISIBILITY_TIMEOUT. Every
+    VISIBILITY_EXTEND_INTERVAL seconds, messages whose visibility would run out
+    before the next pass are pushed out by another VISIBILITY_TIMEOUT in one
+    batch call. A started job that reports no progress (note_job_progress) for
+    JOB_STALL_SECONDS is no longer extended, so a wedged or crashed worker gives
+    its message back within about a minute.
+    """
 
-    logger.info(f"SQS Worker started: {WORKER_ID}")
+    def __init__(self, interval=VISIBILITY_EXTEND_INTERVAL):
+        self.interval = max(1.0, interval)
+        self._tracked = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.metrics = {"extended": 0, "stalled": 0}
+        self._thread = threading.Thread(target=self._run, name="sqs-visibility", daemon=True)
+        self._thread.start()
+
+    def track(self, msg, job_id):
+        now = time.monotonic()
+        with self._lock:
+            self._tracked[str(job_id)] = {
+                "job_id": job_id,
+                "receipt": msg["ReceiptHandle"],
+                "visible_at": now + VISIBILITY_TIMEOUT,
+                "started": False,
+                "progress_at": now,
+            }
 
-    # recover_stuck_jobs()
-    logger.info(f"Going for sqs message - - - - ")
-    Job_Main_global=''
+    def start(self, job_id):
+        with self._lock:
+            entry = self._tracked.get(str(job_id))
+            if entry:
+                entry["started"] = True
+                entry["progress_at"] = time.monotonic()
+
+    def progress(self, job_id):
+        with self._lock:
+            entry = self._tracked.get(str(job_id))
+            if entry:
+                entry["progress_at"] = time.monotonic()
+
+    def untrack(self, job_id):
+        with self._lock:
+            return self._tracked.pop(str(job_id), None)
+
+    def pause(self, job_id):
+        """Keep extending a job that is waiting for another executor, without stall detection."""
+        with self._lock:
+            entry = self._tracked.get(str(job_id))
+            if entry:
+                entry["started"] = False
+
+    def extend_due(self):
+        now = time.monotonic()
+        due, stalled = [], []
+        with self._lock:
+            for job_id, entry in list(self._tracked.items()):
+                if entry["started"] and now - entry["progress_at"] > JOB_STALL_SECONDS:
+                    logger.warning(f"Job {job_id} made no progress for {JOB_STALL_SECONDS}s; letting its message go")
+                    del self._tracked[job_id]
+                    self.metrics["stalled"] += 1
+                    stalled.append(entry["job_id"])
+                    continue
+                if entry["visible_at"] - now <= self.interval * 2:
+                    entry["visible_at"] = now + VISIBILITY_TIMEOUT
+                    due.append((entry["receipt"], VISIBILITY_TIMEOUT))
+        for job_id in stalled:
+            abandon_stalled_job(job_id)
+        if due:
+            change_message_visibility(due)
+            self.metrics["extended"] += len(due)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.extend_due()
+            except Exception as e:
+                logger.error(f"Visibility extension failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+
+_VISIBILITY_EXTENDER = None
+_VISIBILITY_EXTENDER_LOCK = threading.Lock()
+
+
+def get_visibility_extender():
+    global _VISIBILITY_EXTENDER
+    with _VISIBILITY_EXTENDER_LOCK:
+        if _VISIBILITY_EXTENDER is None:
+            _VISIBILITY_EXTENDER = VisibilityExtender()
+        return _VISIBILITY_EXTENDER
+
+
+def run_claimed_job(msg, job):
+    """Run a job claimed by claim_sqs_messages and acknowledge its message."""
+    _JOB_CONTEXT.job_id = job['id']
+    get_visibility_extender().start(job['id'])
+    result = None
     try:
-        running=False
-        while not running:
-            # job = try_lock_job('15d64445-c8b7-4639-994d-865844fbcce9')
+        scraped = get_or_scrape_form_url(job)
+        note_job_progress()
+        form_url = scraped or job.get('contact_us_url') or job.get('form_url') or job.get('website_url')
+
+        form_data = {
+            'id': job.get('id'),
+            'contact_id': job.get('id'),
+            'form_url': form_url,
+            'full_name': job.get('full_name'),
+            'first_name': job.get('first_name'),
+            'last_name': job.get('last_name'),
+            'company_name': job.get('company_name'),
+            'email_address': job.get('email_address'),
+            'phone_number': job.get('phone_number'),
+            'website_url': job.get('website_url'),
+            'personalized_message': job.get('personalized_message'),
+            'campaign_name': job.get('campaign_name')
+        }
+
+        result = submit_contact_form_old(form_data, job.get('personalized_message'), job)
+        if result and result.get('handoff'):
+            # Still ours: the lease and message stay held until the other lane runs it.
+            get_visibility_extender().pause(job['id'])
+            return result
+        if job['id'] in _ABORTED_JOBS:
+            # Given up on while it ran; the row and message were already handed back.
+            return result
+        # The final status must be on disk before the message is gone.
+        get_status_journal().flush([job['id']], raise_errors=True)
+        get_visibility_extender().untrack(job['id'])
+        get_sqs_acker().ack([msg])
+        return result
+
+    except Exception as e:
+        logger.error(f"Job failed {job['id']}: {e}")
+        get_visibility_extender().untrack(job['id'])
+        try:
+            outcome = mark_failed(job['id'], str(e))
+        except Exception as db_error:
+            logger.error(f"mark_failed failed for {job['id']}: {db_error}")
+            outcome = None
+        if outcome and outcome[0] == 'FAILED':
+            get_sqs_acker().ack([msg])
+        elif outcome:
+            # Retryable: bring the message back after a backoff instead of waiting out its visibility.
+            change_message_visibility([(msg["ReceiptHandle"], retry_backoff_seconds(outcome[1]))])
+    finally:
+        _JOB_CONTEXT.job_id = None
+        if not (result and result.get('handoff')):
+            get_lease_manager().release(job['id'])
+
+
+def process_sqs_message(msg):
+    """Lock, run and acknowledge the job referenced by a single SQS message."""
+    for claimed_msg, job in claim_sqs_messages([msg]):
+        run_claimed_job(claimed_msg, job)
+
+
+def run_worker(concurrency=WORKER_CONCURRENCY, drain_timeout=DRAIN_TIMEOUT):
+    """Feed up to `concurrency` job executors from a single batched SQS receive loop.
+
+    Each receive asks for as many messages (max 10) as there are free executor
+    and prefetch-buffer slots, claims them in one statement and hands the claimed
+    jobs to a JobScheduler, which defers jobs for hosts that are over their rate
+    and decides which buffered job starts next. Each executor runs one job at a
+    time on its own leased browser session, so the driver pool should be at least
+    as large as `concurrency`. Jobs that meet a captcha move to a CaptchaLane with
+    its own CAPTCHA_LANE_CONCURRENCY executors and browsers.
+
+    Returns once SHUTDOWN is set and the worker has drained (see drain below).
+    """
+    concurrency = max(1, concurrency)
+    capacity = concurrency + (PREFETCH_BUFFER or concurrency)
+    free_slots = threading.BoundedSemaphore(capacity)
+    scheduler = JobScheduler()
+    active = {}
+    active_cond = threading.Condition()
+    global _CAPTCHA_LANE
+    captcha_lane = _CAPTCHA_LANE = CaptchaLane() if CAPTCHA_LANE_CONCURRENCY > 0 else None
+    main_latency = LaneMetrics("main")
+
+    def hand_back(msg, job):
+        """Return a job that was not started yet instead of starting new work."""
+        try:
+            release_jobs([job['id']])
+            return_messages([(msg, job)])
+        except Exception as e:
+            logger.error(f"Could not hand back {job['id']}: {e}")
+
+    def to_captcha_lane(msg, job, handed_off):
+        if SHUTDOWN:
+            # The lane may already be drained; nothing would hand this job back.
+            hand_back(msg, job)
+            return
+        try:
+            delay = captcha_lane.submit(msg, job, handed_off=handed_off)
+            if delay is not None:
+                logger.info(f"Captcha lane full; deferring {job['id']} by {delay}s")
+        except Exception as e:
+            logger.error(f"Could not move {job['id']} to the captcha lane: {e}")
+            hand_back(msg, job)
+
+    def run_tracked(msg, job, metrics):
+        with active_cond:
+            active[job['id']] = msg
+        started = time.monotonic()
+        result = None
+        try:
+            result = run_claimed_job(msg, job)
+        except Exception as e:
+            logger.info(f"Something went wrong -- - - - {e}")
+        finally:
+            with active_cond:
+                active.pop(job['id'], None)
+                active_cond.notify_all()
+            if not (result and result.get('handoff')):
+                metrics.record(time.monotonic() - started, result)
+        return result
+
+    def executor():
+        _JOB_CONTEXT.lane = 'main'
+        while True:
+            msg, job = scheduler.get()
+            if SHUTDOWN:
+                hand_back(msg, job)
+                scheduler.done(job)
+                free_slots.release()
+                continue
+            if captcha_lane is not None and captcha_lane.expects_captcha(job):
+                # Known captcha host: skip the main lane's browser entirely.
+                scheduler.done(job)
+                free_slots.release()
+                to_captcha_lane(msg, job, handed_off=False)
+                continue
+            result = None
             try:
-                logger.info(f"Check for new sqs message - - - - ")
+                result = run_tracked(msg, job, main_latency)
+            finally:
+                scheduler.done(job, result)
+                free_slots.release()
+            if result and result.get('handoff') == 'captcha':
+                to_captcha_lane(msg, job, handed_off=True)
+
+    def captcha_executor():
+        _JOB_CONTEXT.lane = 'captcha'
+        _JOB_CONTEXT.driver_pool = captcha_lane.pool
+        while True:
+            msg, job = captcha_lane.get()
+            if SHUTDOWN:
+                hand_back(msg, job)
+                continue
+            run_tracked(msg, job, captcha_lane.latency)
+
+    def log_lane_metrics():
+        logger.info(f"Lane metrics: {main_latency.snapshot()}")
+        if captcha_lane is not None:
+            logger.info(f"Lane metrics: {captcha_lane.latency.snapshot()} {captcha_lane.metrics}")
+
+    def drain():
+        """Stop taking work, give in-flight jobs until the deadline, hand back the rest."""
+        deadline = time.monotonic() + drain_timeout
+        unstarted = scheduler.drain() + (captcha_lane.drain() if captcha_lane is not None else [])
+        logger.info(f"Scheduler totals: {scheduler.metrics}")
+        log_lane_metrics()
+        if unstarted:
+            release_jobs([job['id'] for _, job in unstarted])
+            return_messages(unstarted)
+        logger.info(f"Draining: returned {len(unstarted)} unstarted job(s), waiting on {len(active)} in flight")
+
+        with active_cond:
+            while active and time.monotonic() < deadline:
+                active_cond.wait(deadline - time.monotonic())
+            aborted = dict(active)
+        if aborted:
+            logger.warning(f"Drain deadline passed; aborting {len(aborted)} job(s): {list(aborted)}")
+            _ABORTED_JOBS.update(aborted)
+            if _STATUS_JOURNAL is not None:
+                _STATUS_JOURNAL.discard(list(aborted))
+            release_jobs(list(aborted))
+            return_messages([(msg, {'id': job_id}) for job_id, msg in aborted.items()])
+            if _DRIVER_POOL is not None:
+                # Quitting their browsers makes the stuck jobs fail fast.
+                _DRIVER_POOL.close(abort_leased=True)
+            if captcha_lane is not None:
+                captcha_lane.pool.close(abort_leased=True)
+        elif captcha_lane is not None:
+            captcha_lane.pool.close()
+
+    for i in range(concurrency):
+        threading.Thread(target=executor, name=f"job-executor-{i}", daemon=True).start()
+    if captcha_lane is not None:
+        for i in range(captcha_lane.concurrency):
+            threading.Thread(target=captcha_executor, name=f"captcha-executor-{i}", daemon=True).start()
+
+    logger.info(f"Worker running {concurrency} concurrent job executor(s), buffering up to {capacity - concurrency}")
+    if captcha_lane is not None:
+        logger.info(f"Captcha lane running {captcha_lane.concurrency} executor(s), budget {CAPTCHA_SOLVES_PER_HOUR}/h")
+    metrics_due = time.monotonic() + LANE_METRICS_INTERVAL
+    while not SHUTDOWN:
+        if time.monotonic() >= metrics_due:
+            log_lane_metrics()
+            metrics_due = time.monotonic() + LANE_METRICS_INTERVAL
+        # Only pull messages once there is room for them, so nothing sits
+        # received-but-unbuffered while its visibility timeout runs down.
+        if not free_slots.acquire(timeout=1):
+            continue
+        wanted = 1
+        while wanted < SQS_RECEIVE_BATCH and free_slots.acquire(blocking=False):
+            wanted += 1
+        try:
+            logger.info(f"Check for new sqs message - - - - ")
+            messages = get_queue().receive(wanted, SQS_WAIT_SECONDS, VISIBILITY_TIMEOUT)
+        except Exception as e:
+            for _ in range(wanted):
+                free_slots.release()
+            logger.info(f"Something went wrong -- - - - {e}")
+            time.sleep(5)
+            continue
 
-                resp = sqs.receive_message(
-                    QueueUrl=QUEUE_URL,
-                    MaxNumberOfMessages=1,
-                    WaitTimeSeconds=20,
-                    VisibilityTimeout=VISIBILITY_TIMEOUT
-                )
-                #for tests
-                # resp={}
-                # msg={}
-                # resp["Messages"][0]="1"
-                # msg["ReceiptHandle"]="11"
-                # msg["MessageId"]="11"
-                logger.info(f"SQS Worker started and details: {resp}")
+        claimed = []
+        if SHUTDOWN and messages:
+            # Arrived during the last long poll; nobody here will run them.
+            return_messages([(msg, None) for msg in messages])
+            messages = []
+        try:
+            # An empty long poll already waited SQS_WAIT_SECONDS; poll again straight away.
+            claimed = claim_sqs_messages(messages)
+        except Exception as e:
+            logger.error(f"Claiming received messages failed: {e}")
+        for _ in range(wanted - len(claimed)):
+            free_slots.release()
+        for msg, job in claimed:
+            delay = scheduler.put(msg, job)
+            if delay is not None:
+                logger.info(f"Deferring {job['id']} by {delay:.0f}s (not due yet or {job_domain(job)} rate limited)")
                 try:
-                    logger.info(f"SQS Worker started and details: {resp.text}")
-                except:
-                    pass
+                    defer_job(msg, job, delay)
+                except Exception as e:
+                    logger.error(f"Could not defer {job['id']}: {e}")
+                free_slots.release()
 
-                if "Messages" not in resp:
-                    logger.info(f"Messages is not there: waiting for new message")
-                    time.sleep(5)
-                    continue
-                    # job = try_lock_job("temp12553")
-                    # sqs.send_message(
-                    #     QueueUrl=QUEUE_URL,
-                    #     MessageBody=json.dumps({"job_id": str(job["id"])})
-                    # )
-                    # time.sleep(2)
-                    # resp = sqs.receive_message(
-                    #     QueueUrl=QUEUE_URL,
-                    #     MaxNumberOfMessages=1,
-                    #     WaitTimeSeconds=20,
-                    #     VisibilityTimeout=VISIBILITY_TIMEOUT
-                    # )
+    drain()
 
 
+def benchmark_launch_profiles(url=None, runs=3, profiles=None):
+    """Measure launch time, first navigation time and browser RSS for each launch profile.
 
-                msg = resp["Messages"][0]
-                receipt = msg["ReceiptHandle"]
-                message_id = msg.get("MessageId")
+    Usage: python worker.py bench-profiles [url] [runs]
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    url = url or os.getenv("BENCH_URL", "https://example.com")
+    results = {}
+    for name in profiles or LAUNCH_PROFILES:
+        samples = []
+        for _ in range(runs):
+            chrome_options = _setup_chrome_options(name)
+            chrome_options.binary_location = CHROME_BINARY
+            started = time.perf_counter()
+            driver = webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=chrome_options)
+            launched = time.perf_counter()
+            try:
+                apply_resource_blocking(driver)
+                nav_started = time.perf_counter()
+                driver.get(url)
+                wait_for_ready_state(driver, timeout=30, state="interactive")
+                navigated = time.perf_counter()
+                samples.append({
+                    "launch_s": launched - started,
+                    "first_nav_s": navigated - nav_started,
+                    "rss_mb": process_tree_rss(driver.service.process.pid) / 1024 / 1024,
+                })
+            finally:
+                driver.quit()
+        results[name] = {k: round(sum(x[k] for x in samples) / len(samples), 3) for k in samples[0]}
+        logger.info(f"Profile {name}: {results[name]}")
+
+    print(f"{'profile':<10}{'launch_s':>10}{'first_nav_s':>13}{'rss_mb':>10}")
+    for name, r in results.items():
+        print(f"{name:<10}{r['launch_s']:>10.3f}{r['first_nav_s']:>13.3f}{r['rss_mb']:>10.1f}")
+    return results
 
-                try:
-                    body = json.loads(msg["Body"])
-                    contact_id = body["job_id"]
-                    logger.info(f"SQS Worker Processing for ID: {contact_id}")
-                    # body = ""
-                    # contact_id =""
-                except Exception:
-                    sqs.delete_message(QueueUrl=QUEUE_URL, ReceiptHandle=receipt)
-                    logger.info(f"SQS Worker Deleted: {WORKER_ID}")
-                    continue
 
+STARTUP_IMPORT_BUDGET = float(os.getenv("STARTUP_IMPORT_BUDGET", 0.5))  # seconds
+STARTUP_FIRST_RECEIVE_BUDGET = float(os.getenv("STARTUP_FIRST_RECEIVE_BUDGET", 20))  # seconds, import included
 
-                job = try_lock_job(contact_id)
-                Job_Main_global=job
-                if job:
-                    update_aws_job_metadata(
-                        job['id'],
-                        message_id=message_id,
-                        receipt_handle=receipt,
-                        status="PROCESSING",
-                        started=True
-                    )
 
-                # Already processed / taken by another worker
-                if not job:
-                    sqs.delete_message(QueueUrl=QUEUE_URL, ReceiptHandle=receipt)
-                    continue
+def start_worker_services():
+    """Warm the pools and start the background threads a worker needs before its first receive."""
+    if PSYCOPG2_AVAILABLE:
+        get_db_pool().warm()
+        check_migrations()
+    if SELENIUM_AVAILABLE:
+        get_driver_pool().warm()
+        get_driver_pool().start_watchdog()
+
+    if PSYCOPG2_AVAILABLE:
+        recover_stuck_jobs()
+        get_lease_manager().start()
+
+
+def stop_worker_services():
+    if _SCREENSHOT_WRITER is not None:
+        _SCREENSHOT_WRITER.flush()
+    if _DRIVER_POOL is not None:
+        _DRIVER_POOL.close()
+    if _STATUS_JOURNAL is not None:
+        _STATUS_JOURNAL.close()
+    if _VISIBILITY_EXTENDER is not None:
+        _VISIBILITY_EXTENDER.stop()
+    if _SQS_ACKER is not None:
+        _SQS_ACKER.close()
+    if _LEASE_MANAGER is not None:
+        _LEASE_MANAGER.stop()
+    if _DB_POOL is not None:
+        _DB_POOL.closeall()
+
+
+def benchmark_startup(runs=5, import_budget=STARTUP_IMPORT_BUDGET, first_receive_budget=STARTUP_FIRST_RECEIVE_BUDGET):
+    """Report module import time and time-to-first-receive; return False if either is over budget.
+
+    Import time is the median over `runs` fresh interpreters. Time to first receive
+    adds starting the worker services here and one non-blocking receive with
+    visibility 0, so no message is taken from the queue.
+
+    Usage: python worker.py bench-startup [runs]
+    """
+    import statistics
+    import subprocess
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    module_name = os.path.splitext(os.path.basename(__file__))[0]
+    probe = (
+        "import sys, time; sys.path.insert(0, %r); t = time.perf_counter(); "
+        "import %s; print(time.perf_counter() - t)" % (module_dir, module_name)
+    )
+    samples = []
+    for _ in range(max(1, runs)):
+        out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    import_s = statistics.median(samples)
 
-                try:
-                    scraped = get_or_scrape_form_url(job)
-                    form_url = scraped or job.get('contact_us_url') or job.get('form_url') or job.get('website_url')
-
-                    form_data = {
-                        'id': job.get('id'),
-                        'contact_id': job.get('id'),
-                        'form_url': form_url,
-                        'full_name': job.get('full_name'),
-                        'first_name': job.get('first_name'),
-                        'last_name': job.get('last_name'),
-                        'company_name': job.get('company_name'),
-                        'email_address': job.get('email_address'),
-                        'phone_number': job.get('phone_number'),
-                        'website_url': job.get('website_url'),
-                        'personalized_message': job.get('personalized_message'),
-                        'campaign_name': job.get('campaign_name')
-                    }
-
-                    submit_contact_form_old(form_data, job.get('personalized_message'),job)
-
-                    # mark_done(job['id'])
-                    # update_aws_job_metadata(
-                    #     job['id'],
-                    #     status="DONE",
-                    #     completed=True
-                    # )
-                    sqs.delete_message(QueueUrl=QUEUE_URL, ReceiptHandle=receipt)
+    started = time.perf_counter()
+    try:
+        start_worker_services()
+        get_queue().receive(1, 0, 0)
+        first_receive_s = import_s + time.perf_counter() - started
+    finally:
+        stop_worker_services()
+
+    ok = import_s <= import_budget and first_receive_s <= first_receive_budget
+    report = {
+        "import_s": round(import_s, 4),
+        "import_budget_s": import_budget,
+        "first_receive_s": round(first_receive_s, 4),
+        "first_receive_budget_s": first_receive_budget,
+        "within_budget": ok,
+    }
+    logger.info(f"Startup benchmark: {json.dumps(report)}")
+    print(json.dumps(report, indent=2))
+    return ok
 
-                except Exception as e:
-                    logger.error(f"Job failed {job['id']}: {e}")
-                    mark_failed(job['id'], str(e))
-                    # ❌ Do NOT delete message → SQS retry
-            except Exception as e:
-                mark_failed(Job_Main_global['id'], str(e))
-                logger.info(f"Something went wrong -- - - - {e}")
-        logger.info("Worker exiting cleanly")
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    command = argv[0] if argv else "run"
+
+    if command == "bench-profiles":
+        benchmark_launch_profiles(
+            url=argv[1] if len(argv) > 1 else None,
+            runs=int(argv[2]) if len(argv) > 2 else 3
+        )
+        return 0
+    if command == "bench-startup":
+        return 0 if benchmark_startup(runs=int(argv[1]) if len(argv) > 1 else 5) else 1
+    if command == "mock-captcha-solver":
+        server, url = start_mock_captcha_solver(
+            port=int(argv[1]) if len(argv) > 1 else 8765,
+            delay=float(argv[2]) if len(argv) > 2 else 3.0
+        )
+        logger.info(f"Mock captcha solver listening on {url} (set CAPTCHA_SOLVER_URL={url})")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return 0
+    if command == "migrate":
+        # python worker.py migrate [name ...]  -- once per deploy, before the workers start
+        run_migrations(argv[1:] or None)
+        return 0
+    if command == "enqueue":
+        # python worker.py enqueue <job_id> [<job_id> ...]  (e.g. QUEUE_BACKEND=sqlite for local load runs)
+        logger.info(f"Enqueued {len(enqueue_jobs(argv[1:]))} job(s) on {get_queue().url}")
+        return 0
+    if command != "run":
+        logger.error(f"Unknown command {command!r}; expected run, migrate, enqueue, mock-captcha-solver, bench-profiles or bench-startup")
+        return 2
+
+    #todo for production -----------
+
+    install_signal_handlers()
+    logger.info(f"SQS Worker started: {WORKER_ID}")
+    start_worker_services()
+    logger.info(f"Going for sqs message - - - - ")
+    try:
+        run_worker(WORKER_CONCURRENCY)
+        logger.info("Worker drained, exiting cleanly")
         # sys.exit(0)
     except Exception as e:
         logger.info(f"some thing wrong {e}")
+    finally:
+        stop_worker_services()
+    return 0
 
     # #todo Debug - - ----------------
     # logger.info(f"SQS Worker started: {WORKER_ID}")
@@ -2400,3 +5717,7 @@ if __name__ == '__main__':
     #     # sys.exit(0)
     # except Exception as e:
     #     logger.info(f"some thing wrong {e}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())